@@ -1,145 +1,309 @@
 """
-Scraper for EPL data from fbref.com
+Scraper for EPL data from fbref.com (any competition / season of COMPETITIONS; several of them through a crawl queue)
 """
 
-import undetected_chromedriver as uc
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import time
-import random
 import numpy as np
 import logging
 from urllib.parse import urljoin
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import queue
+import re
 import os
+import json
+import hashlib
+from stat_schema import STAT_DEFINITIONS, CORE_COLUMNS
+from player_store import PlayerStatStore, COLUMN_INDEX, as_store_frame
+from player_data import write_results_parquet, parquet_path_for, widen_float32
+from run_metrics import RunMetrics
+from crawl_scheduler import CrawlScheduler, CircuitOpenError, parse_retry_after
+from crawl_queue import CrawlQueue, partition_output_path, CURRENT_SEASON
+from data_paths import data_path
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
 
+HTML_COMMENT_RE = re.compile(r'<!--(.*?)-->', re.DOTALL)
+THROTTLED_TITLE_RE = re.compile(r'\b429\b|too many requests', re.IGNORECASE)
+STATS_TABLE_RE = re.compile(r'<table[^>]+id="stats_')
+# fetch_page_html's answer to a conditional GET when the server says the page did not change (HTTP 304).
+NOT_MODIFIED = object()
+
+try:
+    import lxml  # noqa: F401
+    PAGE_PARSER = 'lxml'
+except ImportError:
+    PAGE_PARSER = 'html.parser'
+# Everything the scraper reads: stat/league tables, and the h1/title holding the club name.
+PAGE_STRAINER = SoupStrainer(['table', 'h1', 'title'])
+
+# competition -> (fbref competition id, name in its URLs); the id also suffixes the stat table ids (stats_standard_9).
+COMPETITIONS = {
+    'premier-league': (9, 'Premier-League'), 'championship': (10, 'Championship'), 'la-liga': (12, 'La-Liga'),
+    'serie-a': (11, 'Serie-A'), 'bundesliga': (20, 'Bundesliga'), 'ligue-1': (13, 'Ligue-1'),
+}
+STAT_TABLE_CATEGORIES = ['standard', 'shooting', 'passing', 'gca', 'defense', 'possession', 'misc', 'keeper']
+SEASON_RE = re.compile(r'^(\d{4})-(\d{4})$')
+
+def check_season(season):
+    """'2023-2024' style season, or None for the current one ('current' is accepted too)."""
+    if season in (None, '', CURRENT_SEASON): return None
+    m = SEASON_RE.match(season)
+    if not m or int(m.group(2)) != int(m.group(1)) + 1: raise ValueError(f"Season must look like 2023-2024, got {season!r}")
+    return season
+
+def league_path(competition, season=None):
+    if competition not in COMPETITIONS: raise ValueError(f"Unknown competition {competition!r} (choose from {list(COMPETITIONS)})")
+    comp_id, name = COMPETITIONS[competition]
+    season = check_season(season)
+    return f"/en/comps/{comp_id}/{season}/{season}-{name}-Stats" if season else f"/en/comps/{comp_id}/{name}-Stats"
+
+def table_identifiers(competition):
+    comp_id = COMPETITIONS[competition][0]
+    return {cat: f'stats_{cat}_{comp_id}' for cat in STAT_TABLE_CATEGORIES}
+
+def uncomment_tables(html):
+    """fbref ships most stat tables inside HTML comments (JS reveals them); unwrap those comments only."""
+    return HTML_COMMENT_RE.sub(lambda m: m.group(1) if '<table' in m.group(1) else m.group(0), html)
+
 class FootballDataScraper:
     RootURL = "https://fbref.com"
     LeagueURL = "https://fbref.com/en/comps/9/Premier-League-Stats"
+    OutputPath = data_path('results.csv')
+    # Default pace per host: one request every 6 s, adjusted by the scheduler when the site throttles.
+    REQUESTS_PER_SECOND = 1 / 6
     
-    TABLE_IDENTIFIERS_FBREF = {
-        'standard': 'stats_standard_9', 'shooting': 'stats_shooting_9',
-        'passing': 'stats_passing_9', 'gca': 'stats_gca_9',
-        'defense': 'stats_defense_9', 'possession': 'stats_possession_9',
-        'misc': 'stats_misc_9', 'keeper': 'stats_keeper_9',
-    }
+    TABLE_IDENTIFIERS_FBREF = table_identifiers('premier-league')
 
-    STAT_DEFINITIONS = {
-        'basic': {
-            'Req_Nation': {'attr': 'nationality', 'numeric': False},
-            'Req_Position': {'attr': 'position', 'numeric': False},
-        },
-        'playing_time': {
-            'Pltime_matches_played': {'attr': 'games', 'numeric': True},
-            'Pltime_starts': {'attr': 'games_starts', 'numeric': True},
-            'Pltime_minutes': {'attr': 'minutes', 'numeric': True},
-        },
-        'performance': {
-            'Perf_goals': {'attr': 'goals', 'numeric': True}, 'Perf_assists': {'attr': 'assists', 'numeric': True},
-            'Perf_yellow_cards': {'attr': 'cards_yellow', 'numeric': True}, 'Perf_red_cards': {'attr': 'cards_red', 'numeric': True},
-        },
-        'expected': {
-            'Exp_xG': {'attr': 'xg', 'numeric': True}, 'Exp_xAG': {'attr': 'xg_assist', 'numeric': True},
-        },
-        'progression': {
-            'Prog_PrgC': {'attr': 'progressive_carries', 'numeric': True}, 'Prog_PrgP': {'attr': 'progressive_passes', 'numeric': True},
-            'Prog_PrgR': {'attr': 'progressive_passes_received', 'numeric': True},
-        },
-        'per_90': {
-            'per90_Gls': {'attr': 'goals_per90', 'numeric': True}, 'per90_Ast': {'attr': 'assists_per90', 'numeric': True},
-            'per90_xG': {'attr': 'xg_per90', 'numeric': True}, 'per90_xGA': {'attr': 'xg_assist_per90', 'numeric': True},
-        },
-        'goalkeeping': {
-            'GK_GA90': {'attr': 'gk_goals_against_per90', 'numeric': True}, 'GK_Save%': {'attr': 'gk_save_pct', 'numeric': True},
-            'GK_CS%': {'attr': 'gk_clean_sheets_pct', 'numeric': True}, 'GK_PK_Save%': {'attr': 'gk_pens_save_pct', 'numeric': True},
-        },
-        'shooting': {
-            'Shoot_SoT%': {'attr': 'shots_on_target_pct', 'numeric': True}, 'Shoot_SoT/90': {'attr': 'shots_on_target_per90', 'numeric': True},
-            'Shoot_G/Sh': {'attr': 'goals_per_shot', 'numeric': True}, 'Shoot_Dist': {'attr': 'average_shot_distance', 'numeric': True},
-        },
-        'passing': {
-            'Pass_Cmp': {'attr': 'passes_completed', 'numeric': True}, 'Pass_Cmp%': {'attr': 'passes_pct', 'numeric': True},
-            'Pass_TotDist': {'attr': 'passes_total_distance', 'numeric': True}, 'Pass_cpt_short': {'attr': 'passes_pct_short', 'numeric': True},
-            'Pass_cpt_medium': {'attr': 'passes_pct_medium', 'numeric': True}, 'Pass_cpt_long': {'attr': 'passes_pct_long', 'numeric': True},
-            'Pass_KP': {'attr': 'assisted_shots', 'numeric': True}, 'Pass_1/3': {'attr': 'passes_into_final_third', 'numeric': True},
-            'Pass_PPA': {'attr': 'passes_into_penalty_area', 'numeric': True}, 'Pass_CrsPA': {'attr': 'crosses_into_penalty_area', 'numeric': True},
-            'Pass_PrgP': {'attr': 'progressive_passes', 'numeric': True}
-        },
-        'goal_shot_creation': {
-            'GnS_SCA': {'attr': 'sca', 'numeric': True}, 'GnS_SCA90': {'attr': 'sca_per90', 'numeric': True},
-            'GnS_GCA': {'attr': 'gca', 'numeric': True}, 'GnS_GCA90': {'attr': 'gca_per90', 'numeric': True},
-        },
-        'defensive': {
-            'Defen_Tkl': {'attr': 'tackles', 'numeric': True}, 'Defen_TklW': {'attr': 'tackles_won', 'numeric': True},
-            'Defen_Att': {'attr': 'challenges_tackles', 'numeric': True}, 'Defen_Lost': {'attr': 'challenges_lost_pct', 'numeric': True}, # Hoặc challenges_lost
-            'Defen_Blocks': {'attr': 'blocks', 'numeric': True}, 'Defen_Sh': {'attr': 'blocked_shots', 'numeric': True},
-            'Defen_Pass': {'attr': 'blocked_passes', 'numeric': True}, 'Defen_Int': {'attr': 'interceptions', 'numeric': True},
-        },
-        'possession': {
-            'Poss_touches': {'attr': 'touches', 'numeric': True}, 'Poss_Def_Pen': {'attr': 'touches_def_pen_area', 'numeric': True},
-            'Poss_Def_3rd': {'attr': 'touches_def_3rd', 'numeric': True}, 'Poss_Mid_3rd': {'attr': 'touches_mid_3rd', 'numeric': True},
-            'Poss_Att_3rd': {'attr': 'touches_att_3rd', 'numeric': True}, 'Poss_Att_Pen': {'attr': 'touches_att_pen_area', 'numeric': True},
-            'Poss_Att': {'attr': 'touches_att_3rd', 'numeric': True}, 'Poss_Succ%': {'attr': 'take_ons_won_pct', 'numeric': True},
-            'Poss_Tkld%': {'attr': 'take_ons_tackled_pct', 'numeric': True}, 'Poss_Carries': {'attr': 'carries', 'numeric': True},
-            'Poss_PrgDist': {'attr': 'carries_progressive_distance', 'numeric': True}, 'Poss_PrgC': {'attr': 'progressive_carries', 'numeric': True}, 
-            'Poss_1/3': {'attr': 'carries_into_final_third', 'numeric': True }, 'Poss_CPA': {'attr': 'carries_into_penalty_area', 'numeric': True}, 
-            'Poss_Mis': {'attr': 'miscontrols', 'numeric': True}, 'Poss_Dis': {'attr': 'dispossessed', 'numeric': True}, 
-            'Poss_Rec': {'attr': 'passes_received', 'numeric': True}, 'Poss_PrgR': {'attr': 'progressive_passes_received', 'numeric': True}
-        },
-        'miscellaneous': {
-            'Misc_Fls': {'attr': 'fouls', 'numeric': True}, 'Misc_Fld': {'attr': 'fouled', 'numeric': True},
-            'Misc_Off': {'attr': 'offsides', 'numeric': True}, 'Misc_Crs': {'attr': 'crosses', 'numeric': True},
-            'Misc_Recov': {'attr': 'ball_recoveries', 'numeric': True}, 'Misc_Won': {'attr': 'aerials_won', 'numeric': True},
-            'Misc_Lost': {'attr': 'aerials_lost', 'numeric': True}, 'Misc_Won%': {'attr': 'aerials_won_pct', 'numeric': True},
-        }
-    }
+    STAT_DEFINITIONS = STAT_DEFINITIONS
+    # (PlayerStatStore columns, data-stats) of the numeric fields of each stats group, so row extraction does not walk
+    # the nested definitions.
+    STAT_FIELDS = {group: (np.array([COLUMN_INDEX[key] for key, d in defs.items() if d['numeric']], dtype=np.intp),
+                           [d['attr'] for d in defs.values() if d['numeric']]) for group, defs in STAT_DEFINITIONS.items()}
     TABLE_CATEGORY_TO_STATS_GROUPS = {
         'standard': ['basic', 'playing_time', 'performance', 'per_90', 'expected', 'progression'],
         'keeper': ['goalkeeping'], 'shooting': ['shooting'], 'passing': ['passing'],
         'gca': ['goal_shot_creation'], 'defense': ['defensive'], 'possession': ['possession'], 'misc': ['miscellaneous']
     }
 
-    def __init__(self):
+    HTTP_HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml', 'Accept-Language': 'en-US,en;q=0.9',
+    }
+
+    def __init__(self, workers=1, max_rps=None, league_url=None, root_url=None, output_path=None, delay_scale=1.0, backend='browser',
+                 cache=None, offline=False, metrics=None, profile_parsing=False, scheduler=None, competition='premier-league', season=None,
+                 parse_workers=0, parse_backlog=None):
+        """
+        competition / season: a key of COMPETITIONS and a '2023-2024' style season (None = current); they give the
+            league page (unless league_url is set) and the ids of the stat tables.
+        backend: 'browser' renders every page in undetected Chrome; 'http' fetches raw HTML over a pooled keep-alive
+            session and only falls back to a browser for pages whose stat tables need JavaScript.
+        workers: number of headless browsers crawling team pages concurrently (1 = sequential).
+        max_rps: requests per second per host, shared by all workers (default REQUESTS_PER_SECOND / delay_scale).
+        delay_scale: scales the politeness: the default rate is divided by it and retry backoffs multiplied by it
+            (0 = no pacing and immediate retries, e.g. against a local stand-in).
+        cache: optional page_cache.PageCache consulted before, and filled after, every network fetch.
+        offline: replay the whole run from cache (expired entries included) without opening any connection.
+        metrics: run_metrics.RunMetrics collecting the timing spans and counters of the run (a new one by default);
+            execute_scraping writes its report next to the output.
+        profile_parsing: cProfile the page parsing and table compilation (saved with the metrics report).
+        scheduler: crawl_scheduler.CrawlScheduler pacing every network request (built from max_rps/delay_scale).
+        parse_workers: parser processes the squad pages are handed to (parse_pipeline): the workers only fetch, and
+            the next fetch overlaps the parsing of the last page (0 = parse in the worker that fetched the page).
+            Parsing in these processes is not covered by profile_parsing.
+        parse_backlog: fetched squad pages allowed to wait for a parser before the fetchers block (default: 2 per
+            parser process).
+        """
+        if offline and cache is None: raise ValueError("Offline mode needs a page cache.")
+        if backend not in ('browser', 'http'): raise ValueError(f"Unknown backend: {backend}")
         self.Collected_data = []
         self.browser = None
-        self.Init_browser()
+        self.backend = backend
+        self.session = None
+        self.workers = max(1, int(workers))
+        self.parse_workers, self.parse_backlog = max(0, int(parse_workers)), parse_backlog
+        self._parse_pool = None
+        self.delay_scale = 0 if offline else delay_scale
+        self.cache = cache
+        self.offline = offline
+        self.metrics = metrics or RunMetrics(profile=profile_parsing)
+        rate = max_rps or (self.REQUESTS_PER_SECOND / self.delay_scale if self.delay_scale > 0 else None)
+        self.scheduler = scheduler or CrawlScheduler(rate=rate, backoff_base=2.0 * self.delay_scale, metrics=self.metrics)
+        if root_url: self.RootURL = root_url
+        self.competition, self.season = competition, check_season(season)
+        self.TABLE_IDENTIFIERS_FBREF = table_identifiers(competition)
+        self.LeagueURL = league_url or urljoin(self.RootURL, league_path(competition, self.season))
+        self.output_path = output_path or self.OutputPath
+        self._local = threading.local()
+        self._spare_browsers = queue.Queue()
+        self._worker_browsers = []
+        self._browsers_lock = threading.Lock()
+        self.team_fingerprints = {}
+        self._response_validators, self._not_modified = {}, set()
+        if offline: logger.info("Offline mode: pages are replayed from the page cache.")
+        elif backend == 'http': self.Init_session()
+        else: self.Init_browser()
 
-    def Init_browser(self):
+    def Init_session(self):
+        self.session = requests.Session()
+        self.session.headers.update(self.HTTP_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, self.workers))
+        self.session.mount('https://', adapter); self.session.mount('http://', adapter)
+        logger.info("HTTP session initialized.")
+
+    def _new_browser(self):
+        import undetected_chromedriver as uc  # only the browser backend needs Chrome and Selenium
         opts = uc.ChromeOptions()
         opts.add_argument('--headless=new')
         opts.add_argument("--no-sandbox")
         opts.add_argument("--disable-dev-shm-usage")
+        browser = uc.Chrome(options=opts)
+        browser.set_window_size(1920, 1080)
+        return browser
+
+    def Init_browser(self):
         try:
-            self.browser = uc.Chrome(options=opts)
-            self.browser.set_window_size(1920, 1080)
+            self.browser = self._new_browser()
             logger.info("Browser initialized.")
         except Exception as e:
             logger.error(f"Browser initialization failed: {e}", exc_info=True); raise
 
+    def _current_browser(self):
+        return getattr(self._local, 'browser', None) or self.browser
+
+    def _acquire(self, url):
+        """Wait for the scheduler's go for url; False when its host's circuit is open."""
+        try:
+            self.scheduler.acquire(url)
+            self._local.requests_sent = getattr(self._local, 'requests_sent', 0) + 1
+            return True
+        except CircuitOpenError as e:
+            logger.error(f"Skipping {url}: {e}")
+            # A queue job that sent nothing because of it is deferred, not failed (_run_queue_job).
+            self._local.skipped_until = time.time() + self.scheduler.cooldown_remaining(url)
+            return False
+
+    def _failed(self, url, attempt, max_attempts, retry_after=None, throttled=False):
+        """Report a failed attempt to the scheduler and back off when another attempt follows."""
+        if attempt < max_attempts - 1:
+            self.metrics.count('retries', url=url)
+            self.scheduler.backoff(url, attempt, retry_after, throttled)
+        else: self.scheduler.failure(url, attempt, retry_after, throttled)
+
     def fetch_page_content(self, url, max_attempts=3):
-        if not self.browser: return None
+        html = self.fetch_page_html(url, max_attempts)
+        if not html: return None
+        with self.metrics.span('parse', url), self.metrics.profiled():
+            return self.parse_page(html)
+
+    @staticmethod
+    def parse_page(html):
+        return BeautifulSoup(uncomment_tables(html), PAGE_PARSER, parse_only=PAGE_STRAINER)
+
+    def fetch_page_html(self, url, max_attempts=3, validators=None):
+        """
+        HTML of url (None when it cannot be fetched). validators ({'etag', 'last_modified'} of an earlier fetch,
+        http backend only) make the request conditional: NOT_MODIFIED is returned when the server answers 304.
+        """
+        if self.cache:
+            with self.metrics.span('cache_lookup', url):
+                html = self.cache.get(url, allow_expired=self.offline)
+            if html is not None:
+                logger.debug(f"Page cache hit: {url}"); self.metrics.count('cache_hits', url=url); return html
+        if self.offline:
+            logger.error(f"{url} is not in the page cache (offline mode)."); return None
+        with self.metrics.span('fetch', url, backend=self.backend):
+            html = self._fetch_over_http(url, max_attempts, validators) if self.backend == 'http' else self._fetch_in_browser(url, max_attempts)
+        if html is NOT_MODIFIED:
+            self.metrics.count('not_modified', url=url); self._not_modified.add(url); return html
+        if html:
+            self.metrics.count('pages_fetched', url=url)
+            self.metrics.count('bytes_fetched', len(html.encode('utf-8')), url=url)
+            if self.cache: self.cache.put(url, html)
+        else: self.metrics.count('failed_fetches', url=url)
+        return html
+
+    def _fetch_over_http(self, url, max_attempts=3, validators=None):
+        headers = {}
+        if validators and validators.get('etag'): headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'): headers['If-Modified-Since'] = validators['last_modified']
+        attempt, pauses = 0, 0
+        while attempt < max_attempts:
+            if not self._acquire(url): return None
+            try:
+                logger.debug(f"Fetching {url} over HTTP (Attempt {attempt+1})")
+                with self.metrics.span('http_get', url, attempt=attempt + 1):
+                    resp = self.session.get(url, timeout=20, headers=headers or None)
+                if resp.status_code == 304 and headers: self.scheduler.success(url); return NOT_MODIFIED
+                retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                if resp.status_code == 429 or (resp.status_code == 503 and retry_after is not None):
+                    logger.warning(f"{url} answered {resp.status_code} (Retry-After: {retry_after}), slowing down.")
+                    if retry_after is not None and pauses < max_attempts:
+                        # A pause the host asked for, not a failure of the page: it does not use up an attempt.
+                        pauses += 1; self.metrics.count('retries', url=url)
+                        self.scheduler.backoff(url, attempt, retry_after, throttled=True); continue
+                    self._failed(url, attempt, max_attempts, retry_after, throttled=True); attempt += 1
+                    continue
+                if resp.status_code in (403, 503):
+                    logger.info(f"{url} answered {resp.status_code} (JS challenge?), using browser.")
+                    return self._fetch_in_browser(url, max_attempts)
+                resp.raise_for_status()
+                html = resp.text
+                self.scheduler.success(url)
+                received = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+                self._response_validators[url] = {k: v for k, v in received.items() if v}
+                if not STATS_TABLE_RE.search(html):
+                    logger.info(f"No stats_ tables in raw HTML of {url}, using browser.")
+                    return self._fetch_in_browser(url, max_attempts)
+                return html
+            except requests.RequestException as e:
+                logger.warning(f"HTTP fetch of {url} failed (attempt {attempt+1}/{max_attempts}): {e}")
+                self._failed(url, attempt, max_attempts); attempt += 1
+        logger.error(f"Failed to fetch {url} after {max_attempts} attempts.")
+        return None
+
+    def _fetch_in_browser(self, url, max_attempts=3):
+        browser = self._current_browser()
+        if not browser and self.backend == 'http':
+            try: browser = self._local.browser = self._checkout_browser()
+            except Exception as e: logger.error(f"Fallback browser initialization failed: {e}"); return None
+        if not browser: return None
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         for attempt in range(max_attempts):
+            if not self._acquire(url): return None
             try:
                 logger.debug(f"Fetching {url} (Attempt {attempt+1})")
-                self.browser.get(url)
-                time.sleep(random.uniform(3, 5))
-                WebDriverWait(self.browser, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table[id^='stats_']")))
-                time.sleep(random.uniform(1, 2))
-                return BeautifulSoup(self.browser.page_source, 'html.parser')
+                with self.metrics.span('page_load', url, attempt=attempt + 1):
+                    browser.get(url)
+                if THROTTLED_TITLE_RE.search(browser.title or ''):
+                    logger.warning(f"{url} served a rate-limit page, slowing down.")
+                    self._failed(url, attempt, max_attempts, throttled=True)
+                    continue
+                # The wait returns as soon as the JS has revealed a stats table, no fixed render sleep.
+                with self.metrics.span('table_wait', url):
+                    WebDriverWait(browser, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table[id^='stats_']")))
+                with self.metrics.span('page_source', url):
+                    html = browser.page_source
+                self.scheduler.success(url)
+                return html
             except Exception as e:
-                if attempt < max_attempts - 1: 
-                    time.sleep(random.uniform(5, 8))
+                logger.warning(f"Browser fetch of {url} failed (attempt {attempt+1}/{max_attempts}): {type(e).__name__}: {e}")
+                self._failed(url, attempt, max_attempts)
         logger.error(f"Failed to fetch {url} after {max_attempts} attempts.")
         return None
 
-    def gather_team_urls(self):
-        logger.info(f"Gathering team URLs from: {self.LeagueURL}")
-        page = self.fetch_page_content(self.LeagueURL)
+    def gather_team_urls(self, league_url=None):
+        league_url = league_url or self.LeagueURL
+        logger.info(f"Gathering team URLs from: {league_url}")
+        page = self.fetch_page_content(league_url)
         if not page: return []
         urls = set()
 
@@ -151,40 +315,65 @@ class FootballDataScraper:
             if '/history/' not in a.get('href', ''): 
                 urls.add(urljoin(self.RootURL, a['href']))
         logger.info(f"Found {len(urls)} team URLs.")
-        return list(urls)
+        return sorted(urls)
 
-    def extract_statistic(self, row, stat_name, is_numeric=False):
-        cell = row.select_one(f'td[data-stat="{stat_name}"], th[data-stat="{stat_name}"]')
-        if not cell or not cell.text.strip() or cell.text.strip() == '-': 
+    @staticmethod
+    def _cell_value(text, is_numeric=False):
+        if not text or text == '-': 
             return "N/a"
-        val = cell.text.strip()
         if is_numeric:
+            num = text.replace(',', '').replace('%', '')
             try: 
-                return float(val.replace(',', '').replace('%', '')) if val.replace(',', '').replace('%', '') else "N/a"
+                return float(num) if num else "N/a"
             except ValueError: 
                 return "N/a"
-        return val
+        return text
+
+    @staticmethod
+    def _cell_number(text):
+        """_cell_value of a numeric cell as a float, NaN where it gives "N/a"."""
+        if not text or text == '-': return np.nan
+        num = text.replace(',', '').replace('%', '')
+        try: return float(num) if num else np.nan
+        except ValueError: return np.nan
+
+    def extract_statistic(self, row, stat_name, is_numeric=False):
+        cell = row.select_one(f'td[data-stat="{stat_name}"], th[data-stat="{stat_name}"]')
+        return self._cell_value(cell.text.strip() if cell else None, is_numeric)
+
+    @staticmethod
+    def index_row_cells(row):
+        """data-stat -> stripped text of the first td/th cell carrying it, collected in a single walk over the row."""
+        cells = {}
+        for cell in row.children:
+            if cell.name not in ('td', 'th'): continue
+            stat = cell.get('data-stat')
+            if stat and stat not in cells: cells[stat] = cell.get_text().strip()
+        return cells
 
-    def _apply_stat_extraction(self, row, p_data, stat_group_name):
+    def _apply_stat_extraction(self, cells, store, i, stat_group_name):
         if stat_group_name == 'basic': 
-            p_data['Req_Nation'] = self.extract_statistic(row, self.STAT_DEFINITIONS['basic']['Req_Nation']['attr'], False)
-            p_data['Req_Position'] = self.extract_statistic(row, self.STAT_DEFINITIONS['basic']['Req_Position']['attr'], False)
-            age_str = self.extract_statistic(row, 'age')
-            if isinstance(age_str, str) and '-' in age_str: 
-                p_data['Req_Age'] = int(age_str.split('-')[0]) if age_str.split('-')[0].isdigit() else "N/a"
-            elif age_str != "N/a" and age_str.isdigit(): 
-                p_data['Req_Age'] = int(age_str)
+            for col in ('Req_Nation', 'Req_Position'):
+                text = self._cell_value(cells.get(self.STAT_DEFINITIONS['basic'][col]['attr']))
+                store.set_text(i, col, None if text == "N/a" else text)
+            age_str = self._cell_value(cells.get('age'))
+            if '-' in age_str: 
+                store.set(i, 'Req_Age', int(age_str.split('-')[0]) if age_str.split('-')[0].isdigit() else np.nan)
+            elif age_str.isdigit(): 
+                store.set(i, 'Req_Age', int(age_str))
             else: 
-                p_data['Req_Age'] = "N/a"
+                store.set(i, 'Req_Age', np.nan)
             return 
         
-        for key, defs in self.STAT_DEFINITIONS.get(stat_group_name, {}).items():
-            p_data[key] = self.extract_statistic(row, defs['attr'], defs['numeric'])
+        if stat_group_name not in self.STAT_FIELDS: return
+        columns, attrs = self.STAT_FIELDS[stat_group_name]
+        number = self._cell_number
+        store.write(i, columns, [number(cells.get(attr)) for attr in attrs])
 
-    def locate_stat_tables(self, page_content):
+    def locate_stat_tables(self, page_content, table_ids=None):
         table_map = {}
         all_found = {tbl.get('id'): tbl for tbl in page_content.find_all('table', id=True) if tbl.get('id','').startswith('stats_')}
-        for cat, expected_id_pattern in self.TABLE_IDENTIFIERS_FBREF.items():
+        for cat, expected_id_pattern in (table_ids or self.TABLE_IDENTIFIERS_FBREF).items():
             if expected_id_pattern in all_found:
                 table_map[cat] = all_found[expected_id_pattern]
             else: 
@@ -195,98 +384,524 @@ class FootballDataScraper:
             logger.warning("Could not locate any specific stat tables via predefined IDs.")
         return table_map
 
-    def compile_player_stats(self, table, cat_name, club):
-        records = []
+    def compile_player_stats(self, table, cat_name, club, store):
+        """Write the players of one stat table into a PlayerStatStore (rows merged by player); returns how many there were."""
+        n_rows = 0
         tbody = table.find('tbody')
-        if not tbody: return []
+        if not tbody: return 0
         groups = self.TABLE_CATEGORY_TO_STATS_GROUPS.get(cat_name, [])
-        if not groups: return []
+        if not groups: return 0
 
         for r_idx, row in enumerate(tbody.find_all('tr', class_=lambda x: x != 'thead' and x != 'spacer' and not (x and 'hidden' in x))):
-            p_cell = row.select_one('th[data-stat="player"], td[data-stat="player"]')
-            if not p_cell or not p_cell.text.strip() or p_cell.text.strip().lower() in ["squad total", "opponent total", "player"]: continue
-            p_name = p_cell.text.strip()
-            p_data = {'player': p_name, 'team': club}
+            cells = self.index_row_cells(row)
+            p_name = cells.get('player')
+            if not p_name or p_name.lower() in ["squad total", "opponent total", "player"]: continue
             try:
-                for group in groups: self._apply_stat_extraction(row, p_data, group)
-                records.append(p_data)
+                i = store.row(p_name, club)
+                for group in groups: self._apply_stat_extraction(cells, store, i, group)
+                n_rows += 1
             except Exception as e: logger.error(f"Err processing {p_name} ({club}) in {cat_name}: {e}", exc_info=True)
-        return records
+        return n_rows
 
-    def process_team_data(self, url):
-        logger.info(f"Processing team: {url}")
-        page = self.fetch_page_content(url)
-        if not page: return []
+    @staticmethod
+    def team_fingerprint(tables):
+        """Content hash of a squad's stat tables; it changes only when one of the tables does."""
+        digest = hashlib.sha256()
+        for cat_name in sorted(tables): digest.update(str(tables[cat_name]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def parse_team_page(self, html, url, table_ids=None, previous_fingerprint=None):
+        """
+        Parse a squad page into {'club', 'fingerprint', 'store' (PlayerStatStore), 'rows' (players per stat table)}.
+        store is None when the tables' fingerprint equals previous_fingerprint (the tables are then not compiled),
+        an empty store when the page has no stat tables (fingerprint None).
+        """
+        with self.metrics.span('parse', url), self.metrics.profiled():
+            page = self.parse_page(html)
         name_el = page.select_one('h1[itemprop="name"] span')
         club = name_el.text.strip().split(" Stats")[0] if name_el and name_el.text.strip() else page.title.text.split(" Stats")[0].split(" | ")[0]
+
+        with self.metrics.span('locate_tables', url):
+            tables = self.locate_stat_tables(page, table_ids)
+        if not tables: return {'club': club, 'fingerprint': None, 'store': PlayerStatStore(), 'rows': {}}
+        fingerprint = self.team_fingerprint(tables)
+        if fingerprint == previous_fingerprint: return {'club': club, 'fingerprint': fingerprint, 'store': None, 'rows': {}}
+
+        store, rows = PlayerStatStore(), {}
+        order = ['standard'] + [c for c in STAT_TABLE_CATEGORIES if c != 'standard' and c in tables]
+        for cat_name in order:
+            if cat_name not in tables: continue
+            with self.metrics.span('compile', url, table=cat_name), self.metrics.profiled():
+                rows[cat_name] = self.compile_player_stats(tables[cat_name], cat_name, club, store)
+        return {'club': club, 'fingerprint': fingerprint, 'store': store, 'rows': rows}
+
+    def _settle_team(self, url, team):
+        """The PlayerStatStore of a parse_team_page result (None for an unchanged squad); records its fingerprint and rows."""
+        if team is None: return PlayerStatStore()
+        club = team['club']
         logger.info(f"Club: {club}")
+        if team['fingerprint'] is None: logger.warning(f"No tables for {club} ({url})"); return PlayerStatStore()
+        validators = self._response_validators.pop(url, {})  # kept for the conditional GET of the next run
+        if team['store'] is None:
+            logger.info(f"{club} unchanged since last run: page fetched, parsing skipped.")
+            self.team_fingerprints[url].update(validators); return None
+        self.team_fingerprints[url] = {'club': club, 'fingerprint': team['fingerprint'], 'scraped_at': time.time(), **validators}
+        for cat_name, n_rows in team['rows'].items(): self.metrics.rows(cat_name, n_rows, url)
+        return team['store']
+
+    def _previous_fingerprint(self, url, skip_unchanged):
+        return self.team_fingerprints.get(url, {}).get('fingerprint') if skip_unchanged else None
+
+    def _previous_validators(self, url, skip_unchanged):
+        """ETag / Last-Modified the previous run got for url, for a conditional GET (http backend only)."""
+        if not skip_unchanged or self.backend != 'http': return None
+        entry = self.team_fingerprints.get(url, {})
+        return {k: entry[k] for k in ('etag', 'last_modified') if entry.get(k)} or None
+
+    def _skip_not_modified(self, url):
+        logger.info(f"{self.team_fingerprints[url]['club']} not modified since last run (HTTP 304), skipping.")
+        return None
+
+    def process_team_data(self, url, skip_unchanged=False, table_ids=None):
+        """PlayerStatStore of the players of one squad page. With skip_unchanged, returns None for a squad unchanged
+        since the run that recorded team_fingerprints: either the server answered the conditional GET with 304 (no
+        page downloaded), or the page was fetched and its tables' fingerprint matched (only the parsing skipped).
+        table_ids: stat table ids of the squad's competition (default: the scraper's own)."""
+        logger.info(f"Processing team: {url}")
+        html = self.fetch_page_html(url, validators=self._previous_validators(url, skip_unchanged))
+        if html is NOT_MODIFIED: return self._skip_not_modified(url)
+        if not html: return PlayerStatStore()
+        previous = self._previous_fingerprint(url, skip_unchanged)
+        if self._parse_pool is None: return self._settle_team(url, self.parse_team_page(html, url, table_ids, previous))
+        # Parsed in a parser process: this thread (and the GIL) is free for the other workers' fetches meanwhile.
+        team, metrics = self._parse_pool.submit(parse_squad_page, html.encode('utf-8'), url, table_ids or self.TABLE_IDENTIFIERS_FBREF, previous).result()
+        self.metrics.merge(metrics)
+        return self._settle_team(url, team)
+
+    @classmethod
+    def page_parser(cls):
+        """A scraper that only parses pages (no session, browser, cache or scheduler): the parser processes' one."""
+        parser = cls.__new__(cls)
+        parser.metrics = RunMetrics()
+        return parser
+
+    def _checkout_browser(self):
+        # The main browser is handed to the first worker, the others get a fresh one.
+        try: return self._spare_browsers.get_nowait()
+        except queue.Empty: pass
+        browser = self._new_browser()
+        with self._browsers_lock: self._worker_browsers.append(browser)
+        logger.info(f"Worker browser initialized ({threading.current_thread().name}).")
+        return browser
+
+    def _ensure_worker_browser(self):
+        if self.backend == 'browser' and not self.offline and getattr(self._local, 'browser', None) is None:
+            try: self._local.browser = self._checkout_browser()
+            except Exception as e:
+                logger.error(f"Worker browser initialization failed: {e}"); return False
+        return True
+
+    def _process_in_worker(self, url, skip_unchanged=False):
+        if not self._ensure_worker_browser(): logger.error(f"Skipping {url}."); return PlayerStatStore()
+        return self.process_team_data(url, skip_unchanged)
+
+    def _fetch_for_parser(self, url, skip_unchanged=False):
+        """Fetch side of the parse pipeline: the parse_squad_page arguments of a squad, None when it could not be fetched
+        or was not modified (recorded in _not_modified)."""
+        if not self._ensure_worker_browser(): logger.error(f"Skipping {url}."); return None
+        logger.info(f"Processing team: {url}")
+        html = self.fetch_page_html(url, validators=self._previous_validators(url, skip_unchanged))
+        if not html or html is NOT_MODIFIED: return None
+        return html.encode('utf-8'), url, self.TABLE_IDENTIFIERS_FBREF, self._previous_fingerprint(url, skip_unchanged)
+
+    def _iter_pipelined(self, team_urls, skip_unchanged=False):
+        from parse_pipeline import fetch_parse_pipeline
+        logger.info(f"Crawling {len(team_urls)} teams with {min(self.workers, len(team_urls))} {self.backend} fetchers and "
+                    f"{self.parse_workers} parser processes.")
+        if self.browser: self._spare_browsers.put(self.browser)
+        fetch = lambda url: self._fetch_for_parser(url, skip_unchanged)
+        for url, parsed in fetch_parse_pipeline(team_urls, fetch, parse_squad_page, fetchers=self.workers, parsers=self.parse_workers,
+                                                queue_size=self.parse_backlog):
+            if parsed is None: yield url, self._skip_not_modified(url) if url in self._not_modified else PlayerStatStore(); continue
+            team, metrics = parsed
+            self.metrics.merge(metrics)
+            yield url, self._settle_team(url, team)
+
+    def iter_team_data(self, team_urls, skip_unchanged=False):
+        """Yield (url, PlayerStatStore) for each team as soon as it is processed; completion order when workers > 1
+        or parse_workers > 0."""
+        if self.parse_workers and team_urls:
+            yield from self._iter_pipelined(team_urls, skip_unchanged)
+            return
+        if self.workers == 1 or len(team_urls) < 2:
+            for url in team_urls:
+                yield url, self.process_team_data(url, skip_unchanged)
+            return
+
+        pool_size = min(self.workers, len(team_urls))
+        logger.info(f"Crawling {len(team_urls)} teams with {pool_size} {self.backend} workers.")
+        if self.browser: self._spare_browsers.put(self.browser)
+        with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='team-worker') as pool:
+            futures = {pool.submit(self._process_in_worker, url, skip_unchanged): url for url in team_urls}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures: future.cancel()  # a failed team stops the teams not started yet
+
+    def crawl_teams(self, team_urls, skip_unchanged=False):
+        """Run process_team_data over team_urls; one store, rows in team_urls order whatever the finish order."""
+        by_url = dict(self.iter_team_data(team_urls, skip_unchanged))
+        return PlayerStatStore.concat(by_url[url] for url in team_urls)
+
+    def close(self):
+        for browser in [self.browser] + self._worker_browsers:
+            try:
+                if browser: browser.quit()
+            except Exception as e: logger.debug(f"Browser quit failed: {e}")
+        self.browser, self._worker_browsers = None, []
+        if self.session: self.session.close(); self.session = None
+
+    @property
+    def fingerprints_path(self):
+        return os.path.splitext(self.output_path)[0] + '.fingerprints.json'
+
+    def load_previous_run(self):
+        """Existing results and per-team fingerprints, or (None, {}) when there is no usable previous run."""
+        if not os.path.exists(self.output_path) or not os.path.exists(self.fingerprints_path): return None, {}
+        try:
+            with open(self.fingerprints_path, encoding='utf-8') as f: fingerprints = json.load(f)
+            previous = pd.read_csv(self.output_path, encoding='utf-8-sig', na_values=['N/a'])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Previous run unreadable, doing a full scrape: {e}"); return None, {}
+        return previous, fingerprints
+
+    def build_results_frame(self, df):
+        """Numeric conversion, the 90-minute filter, the player sort and the column order of results.csv.
+        Frames of a PlayerStatStore are typed already; only text ("N/a") columns go through the conversion."""
+        text_cols = [col for col in df.columns if df[col].dtype == 'object' and col != 'player']
+        if text_cols: df[text_cols] = df[text_cols].mask(df[text_cols].isin(["N/a", ""]))
+        num_cols = ['Req_Age'] + [col for group in self.STAT_DEFINITIONS.values() for col,p in group.items() if p.get('numeric')]
+        for col in list(set(num_cols)): 
+            if col in df.columns and df[col].dtype == 'object': df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        tables = self.locate_stat_tables(page)
-        if not tables: logger.warning(f"No tables for {club} ({url})"); return []
+        if 'Pltime_minutes' in df.columns and pd.api.types.is_numeric_dtype(df['Pltime_minutes']):
+            df.dropna(subset=['Pltime_minutes'], inplace=True)
+            df = df[df['Pltime_minutes'] > 90].copy()
+            logger.info(f"Filtered by minutes > 90. New shape: {df.shape}")
         
-        merged_data = {}
-        order = ['standard'] + [c for c in self.TABLE_IDENTIFIERS_FBREF if c != 'standard' and c in tables]
-        for cat_name in order:
-            if cat_name not in tables: continue
-            logger.debug(f"Compiling '{cat_name}' for {club}")
-            for p_stats in self.compile_player_stats(tables[cat_name], cat_name, club):
-                p_name = p_stats.get('player')
-                if p_name: merged_data.setdefault(p_name, {}).update(p_stats)
-        return list(merged_data.values())
+        if 'player' in df.columns:
+            df['player'] = df['player'].astype(str)
+            df.sort_values(by='player', inplace=True, ignore_index=True, key=lambda c: c.str.lower())
+
+        ordered = [c for c in CORE_COLUMNS if c in df.columns] + sorted([c for c in df.columns if c not in CORE_COLUMNS])
+        return df if list(df.columns) == ordered else df[ordered]
+
+    @staticmethod
+    def upsert_players(previous, fresh):
+        """Rows of fresh replace the previous rows with the same (player, team); all other previous rows are kept."""
+        if previous is None or previous.empty: return fresh
+        # float32 stats are widened through their decimal form, so they do not pick up float32 digits next to the CSV's values.
+        fresh = widen_float32(fresh)
+        combined = pd.concat([previous.astype(object), fresh.astype(object)], ignore_index=True)
+        return combined.drop_duplicates(subset=['player', 'team'], keep='last')
+
+    @property
+    def partial_path(self):
+        return os.path.splitext(self.output_path)[0] + '.partial.jsonl'
+
+    @property
+    def metrics_path(self):
+        return os.path.splitext(self.output_path)[0] + '.metrics.json'
+
+    @property
+    def checkpoint_path(self):
+        return os.path.splitext(self.output_path)[0] + '.checkpoint.json'
+
+    def load_checkpoint(self):
+        """Team URLs finished by an interrupted run (their rows are in the partial output)."""
+        if not os.path.exists(self.checkpoint_path) or not os.path.exists(self.partial_path): return set()
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f: return set(json.load(f)['done'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Checkpoint unreadable, starting over: {e}"); return set()
+
+    def _clear_partial_output(self):
+        for path in (self.partial_path, self.checkpoint_path):
+            if os.path.exists(path): os.remove(path)
+
+    def _save_checkpoint(self, done):
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f: json.dump({'output': self.output_path, 'done': sorted(done)}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def stream_teams(self, team_urls, skip_unchanged=False, resume=True):
+        """
+        Append each team's rows to the partial output as soon as it is processed and record the team in the
+        checkpoint, so at most one team's rows are held in memory and a crash loses nothing already written.
+        Only teams that were fetched and parsed (players found, or unchanged) are checkpointed; the others are
+        returned, and a resumed run tries them again.
+        """
+        done = self.load_checkpoint() if resume else set()
+        resumed = done & set(team_urls)
+        if resumed: logger.info(f"Resuming: {len(resumed)} of {len(team_urls)} teams already in {self.partial_path}.")
+        else: done = set(); self._clear_partial_output()
+        os.makedirs(os.path.dirname(self.partial_path) or '.', exist_ok=True)
+        todo = [url for url in team_urls if url not in done]
+        missing = []
+        with open(self.partial_path, 'a', encoding='utf-8') as partial:
+            for url, rows in self.iter_team_data(todo, skip_unchanged):
+                if rows is not None and not rows: missing.append(url); continue  # fetch failed, circuit open or no tables
+                partial.write(json.dumps({'url': url, 'fingerprint': self.team_fingerprints.get(url), 'rows': rows.to_json() if rows is not None else None}) + '\n')
+                partial.flush(); os.fsync(partial.fileno())
+                done.add(url)
+                self._save_checkpoint(done)
+        return missing
+
+    def read_partial_output(self, team_urls):
+        """PlayerStatStore of every checkpointed team, rows in team_urls order; also restores their fingerprints."""
+        done, by_url = self.load_checkpoint(), {}
+        with open(self.partial_path, encoding='utf-8') as partial:
+            for line in partial:
+                try: team = json.loads(line)
+                except ValueError: continue  # torn last line of a crashed run
+                if team['url'] not in done: continue
+                by_url[team['url']] = team['rows']
+                if team.get('fingerprint'): self.team_fingerprints[team['url']] = team['fingerprint']
+        return PlayerStatStore.concat(PlayerStatStore.from_json(by_url[url]) for url in team_urls if by_url.get(url))
 
-    def execute_scraping(self):
+    @staticmethod
+    def write_results(df, out_path):
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        df.to_csv(out_path, index=False, encoding='utf-8-sig', na_rep='N/a')
+        if write_results_parquet(df, parquet_path_for(out_path)): logger.info(f"Typed copy saved to {parquet_path_for(out_path)}")
+
+    def execute_scraping(self, incremental=False, resume=True):
+        """
+        incremental: re-process only the squads whose stat tables changed since the last run and upsert
+            their players into the existing results, keyed by (player, team). Over http, squad pages are requested
+            with the ETag / Last-Modified of the last run (kept in the fingerprints file) and not downloaded when
+            the server answers 304; otherwise (browser backend, servers without validators) every page is still
+            fetched and only the parsing of the unchanged ones is skipped.
+        resume: continue from the checkpoint of an interrupted run instead of starting over.
+        """
         logger.info("--- Starting scraping ---")
-        all_data = []
+        all_data = PlayerStatStore()
         try:
-            team_urls = self.gather_team_urls()
+            previous = None
+            if incremental:
+                previous, self.team_fingerprints = self.load_previous_run()
+                if previous is None: logger.info("No previous run found, scraping every team.")
+                elif self.backend != 'http' or self.offline:
+                    logger.info("Incremental run: every squad page is still fetched, only unchanged ones are not parsed.")
+
+            with self.metrics.span('gather_team_urls'):
+                team_urls = self.gather_team_urls()
             if not team_urls: logger.error("No team URLs. Terminating."); return None
             
-            for i, url in enumerate(team_urls):
-                all_data.extend(self.process_team_data(url))
-                if i < len(team_urls) - 1: time.sleep(random.uniform(3, 6))
+            with self.metrics.span('crawl_teams'):
+                missing = self.stream_teams(team_urls, skip_unchanged=previous is not None, resume=resume)
+            if missing:
+                # Writing now would drop these teams for good: keep the checkpoint, a rerun fetches only them.
+                logger.error(f"{len(missing)} of {len(team_urls)} teams could not be scraped ({', '.join(missing[:5])}{', ...' if len(missing) > 5 else ''}); "
+                             f"output not written, run again to retry them (the {len(team_urls) - len(missing)} others are kept).")
+                return None
+            with self.metrics.span('read_partial_output'):
+                all_data = self.read_partial_output(team_urls)
 
             if not all_data: 
+                if previous is not None:
+                    logger.info("No team changed since the last run.")
+                    return as_store_frame(self.build_results_frame(previous))
                 logger.warning("No data collected.")
                 return pd.DataFrame()
-            df = pd.DataFrame(all_data).replace(["N/a", "", None], np.nan)
-            logger.info(f"Initial df shape: {df.shape}")
+            with self.metrics.span('assemble_frame'):
+                df = all_data.to_frame()
+                logger.info(f"Initial df shape: {df.shape}")
+                if previous is not None:
+                    df = self.upsert_players(previous, df)
+                    logger.info(f"Upserted {len(all_data)} rows into the previous {len(previous)}.")
+                df = self.build_results_frame(df)
 
-            num_cols = ['Req_Age'] + [col for group in self.STAT_DEFINITIONS.values() for col,p in group.items() if p.get('numeric')]
-            for col in list(set(num_cols)): 
-                if col in df.columns and df[col].dtype == 'object': df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            if 'Pltime_minutes' in df.columns and pd.api.types.is_numeric_dtype(df['Pltime_minutes']):
-                df.dropna(subset=['Pltime_minutes'], inplace=True)
-                df = df[df['Pltime_minutes'] > 90].copy()
-                logger.info(f"Filtered by minutes > 90. New shape: {df.shape}")
-            
-            if 'player' in df.columns:
-                df['player'] = df['player'].astype(str)
-                df.sort_values(by='player', inplace=True, ignore_index=True, key=lambda c: c.str.lower())
+            out_path = self.output_path
+            with self.metrics.span('write_output'):
+                self.write_results(df, out_path)
+                with open(self.fingerprints_path, 'w', encoding='utf-8') as f: json.dump(self.team_fingerprints, f, indent=1)
+            self._clear_partial_output()
+            logger.info(f"Data saved to {out_path}")
+            # Upserted rows went through float64/object to be written as before; callers get a full run's dtypes.
+            return as_store_frame(df) if previous is not None else df
+        except Exception as e: logger.error(f"Scraping execution error: {e}", exc_info=True); return None
+        finally:
+            if self.browser or self._worker_browsers: logger.info("--- Terminating browser ---")
+            self.close()
+            self.write_metrics_report()
 
-            core = ['player','team','Req_Nation','Req_Position','Req_Age','Pltime_matches_played','Pltime_starts','Pltime_minutes']
-            ordered = [c for c in core if c in df.columns] + sorted([c for c in df.columns if c not in core])
-            df = df[ordered]
+    def _run_queue_job(self, crawl_queue, job):
+        self._local.requests_sent, self._local.skipped_until = 0, None
+        try:
+            if job['kind'] == 'league':
+                urls = self.gather_team_urls(job['url'])
+                if not urls: raise RuntimeError("no team URLs")
+                added = crawl_queue.add_teams(job['competition'], job['season'], urls)
+                logger.info(f"{job['competition']} {job['season']}: {added} squads queued ({len(urls)} listed).")
+                crawl_queue.complete(job)
+            else:
+                rows = self.process_team_data(job['url'], table_ids=table_identifiers(job['competition']))
+                if not rows: raise RuntimeError("no player rows")
+                crawl_queue.complete(job, rows.to_json())
+            self.metrics.count('jobs_done')
+        except Exception as e:
+            if self._local.skipped_until is not None and not self._local.requests_sent:
+                # Never tried (the host's circuit is open): not an attempt, claimed again once the cooldown is over.
+                crawl_queue.defer(job, self._local.skipped_until, e)
+                self.metrics.count('jobs_deferred')
+                logger.info(f"{job['url']} deferred by {self._local.skipped_until - time.time():.1f}s: its host is paused.")
+                return
+            status = crawl_queue.fail(job, e)
+            self.metrics.count('jobs_failed' if status == 'failed' else 'jobs_retried')
+            logger.warning(f"{job['url']} failed (attempt {job['attempts']}): {e}" + (", giving up." if status == 'failed' else ", queued again."))
 
-            out_dir = os.path.join(os.path.expanduser("~"), "Desktop", "EPL_Data_Output") 
-            os.makedirs(out_dir, exist_ok=True)
+    def _write_finished_partitions(self, crawl_queue, out_dir):
+        """Write every partition whose squads are all settled; one partition's rows in memory at a time."""
+        while True:
+            part = crawl_queue.claim_finished_partition()
+            if part is None: return
+            competition, season = part
+            out_path = partition_output_path(out_dir, competition, season)
+            try:
+                with self.metrics.span('write_partition', competition=competition, season=season):
+                    store = PlayerStatStore.concat(PlayerStatStore.from_json(rows) for rows in crawl_queue.partition_rows(competition, season))
+                    if not store:
+                        logger.error(f"{competition} {season}: no squad could be scraped."); crawl_queue.release_partition(competition, season, 'failed'); continue
+                    df = self.build_results_frame(store.to_frame())
+                    self.write_results(df, out_path)
+                crawl_queue.finish_partition(competition, season, out_path, len(df))
+                logger.info(f"{competition} {season}: {len(df)} players saved to {out_path}")
+            except Exception as e:
+                logger.error(f"Writing {competition} {season} failed: {e}", exc_info=True)
+                crawl_queue.release_partition(competition, season, 'failed')
 
-            out_path = os.path.join(out_dir, r'C:\Users\Hungdever\Desktop\My_study\EPL\data\results.csv')
-            df.to_csv(out_path, index=False, encoding='utf-8-sig', na_rep='N/a')
-            logger.info(f"Data saved to {out_path}")
-            return df
-        except Exception as e: logger.error(f"Scraping execution error: {e}", exc_info=True); return None
+    def _queue_worker(self, crawl_queue, out_dir):
+        if not self._ensure_worker_browser(): return
+        worker = threading.current_thread().name
+        while True:
+            job = crawl_queue.claim(worker)
+            if job is None:
+                self._write_finished_partitions(crawl_queue, out_dir)
+                if not crawl_queue.active(): return
+                time.sleep(0.5)  # other workers are still on jobs that may queue more squads
+                continue
+            self._run_queue_job(crawl_queue, job)
+            self._write_finished_partitions(crawl_queue, out_dir)
+
+    def crawl_partitions(self, crawl_queue, partitions, out_dir):
+        """
+        Crawl (competition, season) partitions through a crawl_queue.CrawlQueue: league pages and squads are jobs the
+        workers pull from the queue, each squad's rows are stored in it as soon as they are parsed, and a partition is
+        written to partition_output_path(out_dir, competition, season) once all its squads are settled. Running it
+        again on the same queue resumes where an interrupted run stopped. Returns crawl_queue.progress().
+        """
+        logger.info(f"--- Starting crawl of {len(partitions)} partitions ---")
+        try:
+            recovered = crawl_queue.recover()
+            if recovered: logger.info(f"Resuming: {recovered} interrupted jobs queued again.")
+            for competition, season in partitions:
+                if not crawl_queue.add_partition(competition, season, urljoin(self.RootURL, league_path(competition, season))):
+                    logger.info(f"{competition} {season or CURRENT_SEASON} already in the queue.")
+            if self.parse_workers:
+                from parse_pipeline import parse_pool
+                self._parse_pool = parse_pool(self.parse_workers)
+            if self.workers == 1:
+                self._queue_worker(crawl_queue, out_dir)
+            else:
+                if self.browser: self._spare_browsers.put(self.browser)
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='queue-worker') as pool:
+                    for future in [pool.submit(self._queue_worker, crawl_queue, out_dir) for _ in range(self.workers)]: future.result()
+            progress = crawl_queue.progress()
+            for p in progress:
+                logger.info(f"{p['competition']} {p['season']}: {p['status']}, {p['teams_done']} squads done, "
+                            f"{p['teams_pending']} pending, {p['teams_failed']} failed, {p['rows'] or 0} players")
+            return progress
         finally:
-            if self.browser: logger.info("--- Terminating browser ---"); self.browser.quit()
+            if self._parse_pool: self._parse_pool.shutdown(cancel_futures=True); self._parse_pool = None
+            self.close()
+            self.write_metrics_report(os.path.join(out_dir, 'crawl.metrics.json'))
+
+    def write_metrics_report(self, path=None):
+        try:
+            path = self.metrics.write_report(path or self.metrics_path)
+            logger.info(self.metrics.format_summary())
+            logger.info(f"Run metrics saved to {path}")
+        except (OSError, ValueError) as e: logger.warning(f"Could not write the run metrics: {e}")
+
+_page_parser = None
+
+def parse_squad_page(html, url, table_ids, previous_fingerprint=None):
+    """
+    Parser-process side of the fetch/parse pipeline: FootballDataScraper.parse_team_page of a squad page's UTF-8
+    bytes. Returns (the team record, the export() of the parse's metrics).
+    """
+    global _page_parser
+    if _page_parser is None: _page_parser = FootballDataScraper.page_parser()
+    _page_parser.metrics = RunMetrics()
+    team = _page_parser.parse_team_page(html.decode('utf-8'), url, table_ids, previous_fingerprint)
+    return team, _page_parser.metrics.export()
+
+def main(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__)
+    parser.add_argument('--workers', type=int, default=1, help="Number of concurrent browser workers.")
+    parser.add_argument('--max-rps', type=float, default=None, help="Requests per second per host (default: one every 6 s).")
+    parser.add_argument('--backend', choices=['browser', 'http'], default='browser', help="Page fetch backend.")
+    parser.add_argument('--cache-dir', default=None, help="Directory of the on-disk page cache (enables caching).")
+    parser.add_argument('--cache-ttl', type=float, default=24, help="Hours a cached page stays fresh.")
+    parser.add_argument('--cache-max-mb', type=float, default=512, help="Size budget of the page cache.")
+    parser.add_argument('--offline', action='store_true', help="Replay the run from the page cache, no network access.")
+    parser.add_argument('--incremental', action='store_true', help="Only re-process teams whose pages changed since the last run.")
+    parser.add_argument('--no-resume', action='store_true', help="Ignore the checkpoint of an interrupted run and start over.")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Parser processes the squad pages are handed to, so fetching and parsing overlap (0 = parse in the fetching worker, -1 = one per core).")
+    parser.add_argument('--parse-backlog', type=int, default=None, help="Fetched pages that may wait for a parser before fetching pauses (default: 2 per parser).")
+    parser.add_argument('--profile-parsing', action='store_true', help="cProfile page parsing and table compilation (saved next to the metrics report).")
+    parser.add_argument('--competition', default='premier-league', help=f"Comma separated competitions: {', '.join(COMPETITIONS)}.")
+    parser.add_argument('--season', default=CURRENT_SEASON, help="Comma separated seasons like 2023-2024 ('current' = this season).")
+    parser.add_argument('--queue', default=None, help="SQLite crawl queue; implied by several competitions/seasons, rerun to resume.")
+    parser.add_argument('--out-dir', default=None, help="Directory of the per-partition results (<competition>/<season>/results.csv).")
+    parser.add_argument('--retry-failed', action='store_true', help="Queue the jobs that failed in earlier runs again.")
+    args = parser.parse_args(argv)
+
+    competitions = [c for c in args.competition.split(',') if c]
+    try: seasons = [check_season(s) for s in args.season.split(',') if s]
+    except ValueError as e: parser.error(str(e))
+    unknown = [c for c in competitions if c not in COMPETITIONS]
+    if unknown: parser.error(f"unknown competitions: {unknown} (choose from {list(COMPETITIONS)})")
+    partitions = [(c, s) for c in competitions for s in seasons]
+    out_dir = args.out_dir or os.path.dirname(FootballDataScraper.OutputPath)
+
+    cache = None
+    if args.cache_dir or args.offline:
+        from page_cache import PageCache
+        cache_dir = args.cache_dir or os.path.join(os.path.dirname(FootballDataScraper.OutputPath), 'page_cache')
+        cache = PageCache(cache_dir, ttl=args.cache_ttl * 3600, max_bytes=int(args.cache_max_mb * 1024 * 1024))
 
-if __name__ == "__main__":
     logger.info("========= Start Scraper =========")
     s_time = time.time()
-    scraper = FootballDataScraper()
-    if scraper.browser: 
-        scraper.execute_scraping()
-    else: 
+    competition, season = partitions[0]
+    scraper = FootballDataScraper(workers=args.workers, max_rps=args.max_rps, backend=args.backend, cache=cache, offline=args.offline,
+                                  profile_parsing=args.profile_parsing, competition=competition, season=season,
+                                  parse_workers=(os.cpu_count() or 1) if args.parse_workers < 0 else args.parse_workers, parse_backlog=args.parse_backlog,
+                                  output_path=None if partitions == [('premier-league', None)] else partition_output_path(out_dir, competition, season))
+    if not (scraper.browser or scraper.session or scraper.offline):
         logger.error("Browser init failed.")
+    elif args.queue or len(partitions) > 1:
+        with CrawlQueue(args.queue or os.path.join(out_dir, 'crawl_queue.sqlite')) as crawl_queue:
+            if args.retry_failed: logger.info(f"{crawl_queue.retry_failed()} failed jobs queued again.")
+            scraper.crawl_partitions(crawl_queue, partitions, out_dir)
+    else:
+        scraper.execute_scraping(incremental=args.incremental, resume=not args.no_resume)
     logger.info(f"Total time: {time.time() - s_time:.2f}s. ========= End Scraper =========")
 
+if __name__ == "__main__":
+    main()
+
     # Made by Hung-dev-guy </Hng/>
\ No newline at end of file
@@ -1,13 +1,102 @@
 import time
 import csv
-import random
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-
-def scrape_all_players_to_csv(base_url="https://www.footballtransfers.com/en/players/uk-premier-league", filename=r"C:\Users\Hungdever\Desktop\My_study\EPL\data\ETV_list.csv"):
+import json
+import re
+import os
+import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
+from crawl_scheduler import CrawlScheduler, CircuitOpenError, parse_retry_after
+from data_paths import data_path
+from valuation_data import parse_etv_series
+
+try:
+    import lxml  # noqa: F401
+    PAGE_PARSER = 'lxml'
+except ImportError:
+    PAGE_PARSER = 'html.parser'
+
+CSV_HEADER = ['Player Name', 'ETV', 'ETV_numeric']
+# Default pace: one page every 5 s, slowed down by the scheduler when the site pushes back.
+PAGES_PER_SECOND = 1 / 5
+THROTTLED_TITLE_RE = re.compile(r'\b429\b|too many requests', re.IGNORECASE)
+
+# All [name, ETV text] pairs of the player table in one WebDriver call.
+EXTRACT_ROWS_JS = """
+return Array.from(document.querySelectorAll('#player-table-body > tr')).map(function (tr) {
+  var name = tr.querySelector('td.td-player span.d-none');
+  var cells = tr.querySelectorAll(':scope > td');
+  return name && cells.length ? [name.textContent.trim(), cells[cells.length - 1].textContent.trim()] : null;
+}).filter(function (row) { return row && row[0]; });
+"""
+
+def document_response(driver):
+    """
+    (status, headers with lower-case names) of the last page the browser loaded, from its performance log
+    (Network.responseReceived of the document); (None, {}) when the log is not available.
+    """
+    try: entries = driver.get_log('performance')
+    except Exception: return None, {}
+    status, headers = None, {}
+    for entry in entries:
+        message = json.loads(entry['message']).get('message', {})
+        if message.get('method') != 'Network.responseReceived' or message.get('params', {}).get('type') != 'Document': continue
+        response = message['params'].get('response', {})
+        status, headers = response.get('status'), {k.lower(): v for k, v in response.get('headers', {}).items()}
+    return status, headers
+
+def with_numeric_etv(rows):
+    """[name, etv] rows + the ETV in millions of euros (valuation_data.parse_etv_series), None when not a value."""
+    values = parse_etv_series(pd.Series([etv for _, etv in rows], dtype=object)).tolist()
+    return [[name, etv, None if pd.isna(value) else value] for (name, etv), value in zip(rows, values)]
+
+def parse_player_rows(html):
+    """[name, etv, etv_numeric] rows of tbody#player-table-body in a page, or None when the table is missing."""
+    player_table_body = BeautifulSoup(html, PAGE_PARSER, parse_only=SoupStrainer(id='player-table-body')).find(id='player-table-body')
+    if player_table_body is None:
+        return None
+    rows = []
+    for row in player_table_body.find_all('tr', recursive=False):
+        name_element = row.select_one('td.td-player span.d-none')
+        cells = row.find_all('td', recursive=False)
+        if name_element is None or not cells:
+            continue
+        player_name = name_element.get_text().strip()
+        if player_name:
+            rows.append([player_name, cells[-1].get_text().strip()])
+    return with_numeric_etv(rows)
+
+def extract_rows_by_element(player_table_body):
+    """The per-row extraction: four WebDriver round trips per <tr>. Kept for comparison (extraction='elements')."""
+    from selenium.common.exceptions import NoSuchElementException
+    from selenium.webdriver.common.by import By
+    rows = []
+    for row in player_table_body.find_elements(By.TAG_NAME, "tr"):
+        try:
+            name_element = row.find_element(By.CSS_SELECTOR, "td.td-player span.d-none")
+            player_name = name_element.get_attribute('textContent').strip()
+            etv_element = row.find_element(By.XPATH, "./td[last()]")
+            player_etv = etv_element.get_attribute('textContent').strip()
+            if player_name:
+                rows.append([player_name, player_etv])
+        except NoSuchElementException:
+            continue
+    return with_numeric_etv(rows)
+
+def extract_player_rows(driver, player_table_body, extraction='page_source'):
+    """
+    Rows of the loaded page. 'page_source': one page_source transfer parsed locally; 'script': one execute_script
+    call returning all rows; 'elements': per-row element lookups.
+    """
+    if extraction == 'page_source':
+        return parse_player_rows(driver.page_source) or []
+    if extraction == 'script':
+        return with_numeric_etv(driver.execute_script(EXTRACT_ROWS_JS) or [])
+    if extraction == 'elements':
+        return extract_rows_by_element(player_table_body)
+    raise ValueError(f"Unknown extraction mode: {extraction}")
+
+def new_driver():
+    import undetected_chromedriver as uc
     options = uc.ChromeOptions()
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
@@ -15,15 +104,50 @@ def scrape_all_players_to_csv(base_url="https://www.footballtransfers.com/en/pla
     options.add_argument('--allow-running-insecure-content')
     options.add_argument('--disable-gpu')
     options.add_argument('log-level=3')
+    # The status and Retry-After of each page load are read from the performance log (Selenium does not expose them).
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return uc.Chrome(options=options, use_subprocess=False)
 
+def scrape_all_players_to_csv(base_url="https://www.footballtransfers.com/en/players/uk-premier-league", filename=None,
+                              cache=None, offline=False, extraction='page_source', scheduler=None, max_attempts=3):
+    """
+    cache: optional page_cache.PageCache; fresh cached pages are parsed instead of loaded in the browser.
+    offline: replay every page from the cache (expired ones included) without starting a browser.
+    extraction: how rows are read from a loaded page, see extract_player_rows.
+    scheduler: crawl_scheduler.CrawlScheduler pacing the page loads (PAGES_PER_SECOND by default), with backoff
+        and up to max_attempts loads of a page that fails.
+    Rows are appended to <filename>.partial page by page and the file replaces <filename> once the crawl ends
+    (default: ETV_list.csv in the data directory).
+    """
+    filename = filename or data_path('ETV_list.csv')
+    if offline and cache is None:
+        raise ValueError("Offline mode needs a page cache.")
+    scheduler = scheduler or CrawlScheduler(rate=PAGES_PER_SECOND)
     driver = None
     player_data = []
     page_number = 1
+    partial_path = filename + '.partial'
+    csvfile = None
 
     try:
-        print("Initializing undetected_chromedriver...")
-        driver = uc.Chrome(options=options, use_subprocess=False)
-        print("Undetected_chromedriver driver initialized.")
+        csvfile = open(partial_path, 'w', newline='', encoding='utf-8')
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+
+        def add_page(rows):
+            writer.writerows(rows)
+            csvfile.flush()
+            player_data.extend(rows)
+
+        if not offline:
+            # Only a live crawl needs Chrome and Selenium; offline replay runs without them installed.
+            from selenium.common.exceptions import TimeoutException
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support import expected_conditions as EC
+            from selenium.webdriver.support.ui import WebDriverWait
+            print("Initializing undetected_chromedriver...")
+            driver = new_driver()
+            print("Undetected_chromedriver driver initialized.")
 
         while True:
             if page_number == 1:
@@ -32,75 +156,108 @@ def scrape_all_players_to_csv(base_url="https://www.footballtransfers.com/en/pla
                 current_url = f"{base_url}/{page_number}"
 
             print(f"\n--- Processing page {page_number}: {current_url} ---")
-            try:
-                driver.get(current_url)
-            except Exception as e:
-                print(f"  Error accessing URL for page {page_number}: {e}. Stop!.")
-                break 
+            cached_html = cache.get(current_url, allow_expired=offline) if cache else None
+            if cached_html is not None or offline:
+                cached_rows = parse_player_rows(cached_html) if cached_html is not None else None
+                if not cached_rows:
+                    print(f"  Page {page_number}: not in the page cache, stop.")
+                    break
+                add_page(cached_rows)
+                print(f"  Page {page_number}: Added {len(cached_rows)} players from the page cache.")
+                page_number += 1
+                continue
+
+            loaded = False
+            for attempt in range(max_attempts):
+                try:
+                    scheduler.acquire(current_url)
+                    driver.get(current_url)
+                    status, headers = document_response(driver)
+                    retry_after = parse_retry_after(headers.get('retry-after'))
+                    if status == 429 or (status == 503 and retry_after is not None) or THROTTLED_TITLE_RE.search(driver.title or ''):
+                        print(f"  Page {page_number}: the site answered {status or 'a rate-limit page'} (Retry-After: {retry_after}), slowing down.")
+                        if attempt < max_attempts - 1: scheduler.backoff(current_url, attempt, retry_after, throttled=True)
+                        else: scheduler.failure(current_url, attempt, retry_after, throttled=True)
+                        continue
+                    loaded = True
+                    break
+                except CircuitOpenError as e:
+                    print(f"  Page {page_number}: {e}")
+                    break
+                except Exception as e:
+                    print(f"  Error accessing URL for page {page_number} (attempt {attempt + 1}/{max_attempts}): {e}")
+                    if attempt < max_attempts - 1: scheduler.backoff(current_url, attempt)
+                    else: scheduler.failure(current_url, attempt)
+            if not loaded:
+                print("  Stop!.")
+                break
 
             try:
                 player_table_body = WebDriverWait(driver, 30).until(
                     EC.presence_of_element_located((By.ID, "player-table-body"))
                 )
-                player_rows = player_table_body.find_elements(By.TAG_NAME, "tr")
-                print(f"  Page {page_number}: Found {len(player_rows)} player rows.")
-
-                if not player_rows:
-                    print(f"  Page {page_number}: No rows (tr) found in tbody.")
-                    break
-
-                rows_processed_on_page = 0
-                for i, row in enumerate(player_rows):
-                    try:
-                        name_element = row.find_element(By.CSS_SELECTOR, "td.td-player span.d-none")
-                        player_name = name_element.get_attribute('textContent').strip()
-                        etv_element = row.find_element(By.XPATH, "./td[last()]")
-                        player_etv = etv_element.get_attribute('textContent').strip()
-                        if player_name:
-                            player_data.append([player_name, player_etv])
-                            rows_processed_on_page += 1
-                    except NoSuchElementException:
-                        continue
-                    except Exception as e:
-                        print(f"    Error processing row {i+1} on page {page_number}: {e}")
-
-                print(f"  Page {page_number}: Processed and added {rows_processed_on_page} players.")
-
             except TimeoutException:
                 print(f"  Page {page_number}: Could not find tbody#player-table-body, may have reached the last page")
                 break 
 
+            start = time.perf_counter()
+            # The page source doubles as the cache entry, so it is only transferred once.
+            html = driver.page_source if extraction == 'page_source' or cache else None
+            if extraction == 'page_source': rows = parse_player_rows(html) or []
+            else: rows = extract_player_rows(driver, player_table_body, extraction)
+            print(f"  Page {page_number}: Extracted {len(rows)} players in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+            if not rows:
+                print(f"  Page {page_number}: No rows (tr) found in tbody.")
+                break
+            scheduler.success(current_url)
+            if cache:
+                cache.put(current_url, html)
+            add_page(rows)
+
             page_number += 1
-            sleep_duration = random.uniform(4.0, 8.0)
-            time.sleep(sleep_duration)
 
-        print("\n--- Start to write data to CSV file ---")
+        csvfile.close()
+        print("\n--- Finish writing data to CSV file ---")
         if player_data:
-            try:
-                with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(['Player Name', 'ETV']) # Write header
-                    writer.writerows(player_data) # Write all collected data
-                print(f"\nSuccessfully wrote a total of {len(player_data)} players from {page_number-1} pages to file '{filename}'")
-                return player_data
-            except IOError as e:
-                print(f"\nError: Could not write to CSV file '{filename}'. Error: {e}")
-                return None
+            os.replace(partial_path, filename)
+            print(f"\nSuccessfully wrote a total of {len(player_data)} players from {page_number-1} pages to file '{filename}'")
+            return player_data
         else:
+            os.remove(partial_path)
             print("\nNo player data was collected to write to the file.")
             return None
 
     except Exception as e:
         print(f"Error: {e}")
+        if player_data: print(f"Rows scraped so far are kept in '{partial_path}'.")
         return None
     finally:
+        if csvfile and not csvfile.closed:
+            csvfile.close()
         if driver:
             print("Close browser")
             driver.quit()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Scrape estimated transfer values from footballtransfers.com")
+    parser.add_argument('--cache-dir', default=None, help="Directory of the on-disk page cache (enables caching).")
+    parser.add_argument('--cache-ttl', type=float, default=24, help="Hours a cached page stays fresh.")
+    parser.add_argument('--offline', action='store_true', help="Replay the pages from the page cache, no network access.")
+    parser.add_argument('--extraction', choices=['page_source', 'script', 'elements'], default='page_source',
+                        help="Read each page's rows from one page_source parse, one script call, or per-row element lookups.")
+    parser.add_argument('--rate', type=float, default=PAGES_PER_SECOND, help="Page loads per second (default: one every 5 s).")
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache_dir or args.offline:
+        from page_cache import PageCache
+        cache = PageCache(args.cache_dir or data_path('page_cache'), ttl=args.cache_ttl * 3600)
+
     print("--- Start scraping process ---")
-    scraped_data_list = scrape_all_players_to_csv(base_url="https://www.footballtransfers.com/en/players/uk-premier-league") 
+    scraped_data_list = scrape_all_players_to_csv(base_url="https://www.footballtransfers.com/en/players/uk-premier-league", cache=cache, offline=args.offline, extraction=args.extraction,
+                                                  scheduler=CrawlScheduler(rate=args.rate))
 
     if scraped_data_list is not None:
         print(f"\nCompleted! A total of {len(scraped_data_list)} records were processed.")
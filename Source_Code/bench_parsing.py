@@ -0,0 +1,122 @@
+"""
+Microbenchmark of the squad-page parsing hot path: the previous per-stat CSS select extraction over a full
+html.parser tree versus the single-pass row index over the strained stats tables, and the memory the extracted
+players take: the merged row dicts of the previous extraction versus the PlayerStatStore written by the current one.
+Runs on saved team pages (a directory of .html files or a page cache) or on generated stand-in pages.
+"""
+import argparse
+import gc
+import glob
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from EX1 import FootballDataScraper, uncomment_tables
+from page_cache import PageCache
+from player_store import PlayerStatStore
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def legacy_team_records(scraper, html):
+    """The extraction as it was before the row index: full html.parser tree, one select_one per stat per row."""
+    page = BeautifulSoup(uncomment_tables(html), 'html.parser')
+    name_el = page.select_one('h1[itemprop="name"] span')
+    club = name_el.text.strip().split(" Stats")[0] if name_el and name_el.text.strip() else page.title.text.split(" Stats")[0].split(" | ")[0]
+    tables = scraper.locate_stat_tables(page)
+    merged = {}
+    for cat_name in ['standard'] + [c for c in scraper.TABLE_IDENTIFIERS_FBREF if c != 'standard' and c in tables]:
+        if cat_name not in tables: continue
+        tbody = tables[cat_name].find('tbody')
+        for row in tbody.find_all('tr', class_=lambda x: x != 'thead' and x != 'spacer' and not (x and 'hidden' in x)):
+            p_cell = row.select_one('th[data-stat="player"], td[data-stat="player"]')
+            if not p_cell or not p_cell.text.strip() or p_cell.text.strip().lower() in ["squad total", "opponent total", "player"]: continue
+            p_data = {'player': p_cell.text.strip(), 'team': club}
+            for group in scraper.TABLE_CATEGORY_TO_STATS_GROUPS[cat_name]:
+                if group == 'basic':
+                    p_data['Req_Nation'] = scraper.extract_statistic(row, 'nationality')
+                    p_data['Req_Position'] = scraper.extract_statistic(row, 'position')
+                    age_str = scraper.extract_statistic(row, 'age')
+                    if '-' in age_str: p_data['Req_Age'] = int(age_str.split('-')[0]) if age_str.split('-')[0].isdigit() else "N/a"
+                    elif age_str != "N/a" and age_str.isdigit(): p_data['Req_Age'] = int(age_str)
+                    else: p_data['Req_Age'] = "N/a"
+                    continue
+                for key, defs in scraper.STAT_DEFINITIONS[group].items():
+                    p_data[key] = scraper.extract_statistic(row, defs['attr'], defs['numeric'])
+            merged.setdefault(p_data['player'], {}).update(p_data)
+    return list(merged.values())
+
+
+def load_pages(pages_dir=None, cache_dir=None, n_teams=5):
+    if pages_dir:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+            with open(path, encoding='utf-8') as f: pages['file://' + os.path.abspath(path)] = f.read()
+        return pages
+    if cache_dir:
+        cache = PageCache(cache_dir, ttl=None, max_bytes=None)
+        return {url: cache.get(url) for url in cache.index if '/squads/' in url}
+    from standin_site import StandinSite
+    site = StandinSite(n_teams=n_teams)
+    return {'http://standin' + path: html for path, html in site.pages.items() if '/squads/' in path}
+
+
+def retained_bytes(build):
+    """Bytes held by build()'s result: what is freed when it is dropped (caches filled on the way do not count)."""
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()  # the parse trees are cyclic garbage by now
+        held = tracemalloc.get_traced_memory()[0]
+        del result
+        gc.collect()
+        return held - tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def run(pages, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(tmp, ttl=None, max_bytes=None)
+        for url, html in pages.items(): cache.put(url, html)
+        scraper = FootballDataScraper(cache=cache, offline=True)
+
+        timings = {'legacy': float('inf'), 'row_index': float('inf')}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            legacy = [legacy_team_records(scraper, html) for html in pages.values()]
+            timings['legacy'] = min(timings['legacy'], time.perf_counter() - start)
+            start = time.perf_counter()
+            current = [scraper.process_team_data(url) for url in pages]
+            timings['row_index'] = min(timings['row_index'], time.perf_counter() - start)
+        identical = all(PlayerStatStore.from_rows(old).to_frame().equals(new.to_frame()) for old, new in zip(legacy, current))
+
+        htmls, urls = list(pages.values()), list(pages)
+        memory = {'row_dicts': retained_bytes(lambda: [legacy_team_records(scraper, html) for html in htmls]),
+                  'store': retained_bytes(lambda: PlayerStatStore.concat(scraper.process_team_data(url) for url in urls))}
+        memory['players'] = sum(len(rows) for rows in current)
+    return timings, identical, memory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages-dir', help="Directory of saved fbref squad pages (*.html).")
+    parser.add_argument('--cache-dir', help="Page cache directory to take squad pages from.")
+    parser.add_argument('--teams', type=int, default=5, help="Number of generated stand-in pages when no pages are given.")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir, args.cache_dir, args.teams)
+    timings, identical, memory = run(pages, args.repeat)
+    n = len(pages)
+    print(f"{n} team pages, records identical: {identical}")
+    for name, seconds in timings.items():
+        print(f"  {name:>10}: {seconds:.3f}s total, {seconds / n * 1000:.1f} ms/page")
+    print(f"  speedup: x{timings['legacy'] / timings['row_index']:.1f}")
+    print(f"{memory['players']} players held in memory:")
+    for name in ('row_dicts', 'store'):
+        print(f"  {name:>10}: {memory[name] / 1024:.0f} KiB, {memory[name] / memory['players']:.0f} bytes/player")
@@ -0,0 +1,201 @@
+"""
+Timings of the pipeline stages on synthetic data (synthetic_data.py), fully offline:
+    compile_player_stats  EX1 row extraction over every stat table of the generated squad pages
+    team_aggregation      EX2_p2 median/mean/std per team (team_stats.summarize)
+    top3_ranking          EX2-p1 top/bottom 3 per statistic (rankings.rank_stats)
+    kmeans_sweep          EX3 elbow + silhouette sweep (cluster_sweep.sweep_k)
+    name_matching         EX4-p1 matching of the scraped names to ETV_list.csv (name_matching.NameMatcher)
+    model_cv              EX4-p2 5-fold cross-validation of the default models (model_search.cross_validate_models)
+
+Each stage runs --repeat times after its (untimed) setup; the JSON results hold the best and median time, the rows
+processed and the environment. With --baseline, a stage slower than the baseline by more than --max-slowdown (and
+by more than --min-seconds, to ignore noise on very short stages) is reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import generate, team_page_paths
+
+
+def _compile_stage(data, options):
+    from EX1 import FootballDataScraper
+    from page_cache import PageCache
+    from player_store import PlayerStatStore
+    with tempfile.TemporaryDirectory() as tmp:
+        scraper = FootballDataScraper(cache=PageCache(tmp, ttl=None, max_bytes=None), offline=True)
+    parsed = []
+    for path in team_page_paths(data):
+        with open(path, encoding='utf-8') as f: page = scraper.parse_page(f.read())
+        parsed.append((os.path.basename(path)[:-len('-Stats.html')], scraper.locate_stat_tables(page)))
+
+    def run():
+        for club, tables in parsed:
+            store = PlayerStatStore()
+            for cat, table in tables.items(): scraper.compile_player_stats(table, cat, club, store)
+    return run, sum(len(table.find_all('tr')) for _, tables in parsed for table in tables.values())
+
+
+def _results(data):
+    from player_data import load_results
+    return load_results(data['results'], float_dtype='float64')
+
+
+def _aggregation_stage(data, options):
+    from team_stats import summarize
+    df = _results(data)
+    return lambda: summarize(df), len(df)
+
+
+def _ranking_stage(data, options):
+    from rankings import rank_stats
+    df = _results(data)
+    return lambda: rank_stats(df, k=3).to_text(), len(df)
+
+
+def _kmeans_stage(data, options):
+    from sklearn.preprocessing import StandardScaler
+    from cluster_sweep import sweep_k
+    df = _results(data)
+    X = df.iloc[:, 4:]
+    X = X[X['Pltime_matches_played'].notna() & (X['Pltime_matches_played'] != 0)].astype('float64').fillna(0)
+    X = StandardScaler().fit_transform(X)
+    k_range = range(1, options['k_max'] + 1)
+    return lambda: sweep_k(X, k_range, silhouette='auto', n_init=options['n_init'], random_state=0, n_jobs=options['n_jobs']), len(X)
+
+
+def _matching_stage(data, options):
+    from name_matching import NameMatcher
+    targets = pd.read_csv(data['etv'])['Player Name'].tolist()
+    queries = _results(data)['player'].tolist()
+    return lambda: NameMatcher(targets).match(queries), len(queries)
+
+
+def _model_cv_stage(data, options):
+    from etv_pipeline import build_preprocessor
+    from model_search import cross_validate_models, default_models
+    etv = pd.read_csv(data['etv'])[['Player Name', 'ETV_numeric']]
+    merged = pd.merge(etv, _results(data), left_on='Player Name', right_on='player', how='inner').dropna(subset=['ETV_numeric'])
+    X, y = merged.drop(columns=['Player Name', 'player', 'ETV_numeric']), merged['ETV_numeric']
+    categorical = [c for c in X.columns if not pd.api.types.is_numeric_dtype(X[c])]
+    preprocessor = build_preprocessor([c for c in X.columns if c not in categorical], categorical)
+    return lambda: cross_validate_models(default_models(), X, y, cv=5, preprocessor=preprocessor, n_jobs=options['n_jobs']), len(X)
+
+
+# name -> setup(data, options) returning (run, rows): run() is what gets timed, rows the input rows it processes.
+STAGES = {
+    'compile_player_stats': _compile_stage,
+    'team_aggregation': _aggregation_stage,
+    'top3_ranking': _ranking_stage,
+    'kmeans_sweep': _kmeans_stage,
+    'name_matching': _matching_stage,
+    'model_cv': _model_cv_stage,
+}
+
+
+def environment():
+    env = {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+           'numpy': np.__version__, 'pandas': pd.__version__}
+    try:
+        import sklearn
+        env['sklearn'] = sklearn.__version__
+    except ImportError: pass
+    try:
+        env['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): env['commit'] = None
+    return env
+
+
+def run_suite(data_dir, scale=1, seed=0, stages=None, repeat=3, k_max=10, n_init=3, n_jobs=-1):
+    """Generate (or reuse) the dataset in data_dir and time each stage; returns the results dict."""
+    start = time.perf_counter()
+    data = generate(data_dir, scale, seed)
+    generate_seconds = time.perf_counter() - start
+    options = {'k_max': k_max, 'n_init': n_init, 'n_jobs': n_jobs}
+    results = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'scale': scale, 'seed': seed, 'players': data['players'],
+               'teams': data['teams'], 'options': options, 'environment': environment(),
+               'generate_seconds': round(generate_seconds, 3), 'stages': {}}
+    for name in stages or STAGES:
+        run, rows = STAGES[name](data, options)
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - t)
+        best = min(timings)
+        results['stages'][name] = {'best_seconds': best, 'median_seconds': statistics.median(timings), 'repeat': repeat,
+                                   'rows': int(rows), 'rows_per_second': rows / best if best else None}
+    return results
+
+
+def compare(results, baseline, max_slowdown=0.25, min_seconds=0.05):
+    """Stages slower than in baseline by more than max_slowdown (relative) and min_seconds (absolute)."""
+    if (baseline.get('scale'), baseline.get('seed')) != (results['scale'], results['seed']):
+        raise ValueError(f"Baseline is for scale {baseline.get('scale')} seed {baseline.get('seed')}, "
+                         f"this run for scale {results['scale']} seed {results['seed']}.")
+    regressions = []
+    for name, current in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if not before: continue
+        slower = current['best_seconds'] - before['best_seconds']
+        if slower > max(before['best_seconds'] * max_slowdown, min_seconds):
+            regressions.append({'stage': name, 'baseline_seconds': before['best_seconds'], 'seconds': current['best_seconds'],
+                                'ratio': current['best_seconds'] / before['best_seconds']})
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = [f"scale {results['scale']}x: {results['players']} players, {results['teams']} teams "
+             f"(data ready in {results['generate_seconds']:.1f}s)"]
+    for name, s in results['stages'].items():
+        line = f"  {name:>20}: best {s['best_seconds']:8.3f}s  median {s['median_seconds']:8.3f}s  {s['rows_per_second'] or 0:10.0f} rows/s"
+        before = (baseline or {}).get('stages', {}).get(name)
+        if before: line += f"  x{s['best_seconds'] / before['best_seconds']:.2f} vs baseline"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help="Multiple of one season's players (1, 10, 100...).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=None, help="Where the synthetic dataset is generated (reused across runs).")
+    parser.add_argument('--stages', default=','.join(STAGES), help="Comma separated stages to run.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--k-max', type=int, default=10, help="KMeans sweep over k = 1..k_max.")
+    parser.add_argument('--n-init', type=int, default=3)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--output', default=None, help="Write the JSON results here.")
+    parser.add_argument('--baseline', default=None, help="JSON results of an earlier run to check for regressions.")
+    parser.add_argument('--max-slowdown', type=float, default=0.25, help="Allowed relative slowdown per stage.")
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="Slowdowns below this many seconds are ignored.")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(',') if s]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown: parser.error(f"unknown stages: {unknown} (choose from {list(STAGES)})")
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), 'epl_bench', f'scale{args.scale}_seed{args.seed}')
+
+    results = run_suite(data_dir, args.scale, args.seed, stages, args.repeat, args.k_max, args.n_init, args.n_jobs)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f: baseline = json.load(f)
+    print(format_results(results, baseline))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f: json.dump(results, f, indent=1)
+        print(f"Results written to {args.output}")
+    if baseline:
+        regressions = compare(results, baseline, args.max_slowdown, args.min_seconds)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']}: {r['seconds']:.3f}s vs {r['baseline_seconds']:.3f}s (x{r['ratio']:.2f})")
+        raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,140 @@
+"""
+Per-page extraction time of the footballtransfers scraper on stand-in pages: per-row element lookups versus one
+page_source parse versus one script call.
+
+Without --live the pages are driven through a stand-in WebDriver: every WebDriver command (find_element,
+get_attribute, page_source, execute_script...) costs one HTTP round trip to the local stand-in server, as each
+command is one HTTP request to chromedriver, and the DOM work is done with BeautifulSoup. --live loads the stand-in
+pages in a real Chrome instead.
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from standin_site import StandinServer, StandinSite
+
+_spec = importlib.util.spec_from_file_location('scrape_data', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'EX4-p1-scrape_data.py'))
+scrape_data = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scrape_data)
+
+
+class _RoundTrip:
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.conn.request('GET', '/__webdriver_command')
+        self.conn.getresponse().read()
+
+
+class StandinElement:
+    def __init__(self, node, rpc):
+        self.node, self.rpc = node, rpc
+
+    def find_elements(self, by, value):
+        self.rpc()
+        if by == By.TAG_NAME: return [StandinElement(n, self.rpc) for n in self.node.find_all(value)]
+        raise ValueError(f"unsupported locator for the stand-in driver: {by!r} {value!r}")
+
+    def find_element(self, by, value):
+        self.rpc()
+        if by == By.CSS_SELECTOR: node = self.node.select_one(value)
+        elif by == By.XPATH and value == './td[last()]':
+            cells = self.node.find_all('td', recursive=False)
+            node = cells[-1] if cells else None
+        else: raise ValueError(f"unsupported locator for the stand-in driver: {by!r} {value!r}")
+        if node is None: raise NoSuchElementException(value)
+        return StandinElement(node, self.rpc)
+
+    def get_attribute(self, name):
+        self.rpc()
+        return self.node.get_text() if name == 'textContent' else self.node.get(name)
+
+
+class StandinDriver:
+    """The WebDriver calls the scraper makes, answered from a parsed page, one HTTP round trip each."""
+
+    def __init__(self, server):
+        host, port = server.httpd.server_address
+        self.rpc = _RoundTrip(host, port)
+        self.server, self.dom, self._html = server, None, None
+
+    def get(self, url):
+        self.rpc()
+        self._html = self.server.site.pages[url[len(self.server.root_url):]]
+        self.dom = BeautifulSoup(self._html, 'lxml')
+
+    @property
+    def page_source(self):
+        self.rpc()
+        return self._html
+
+    def find_element(self, by, value):
+        self.rpc()
+        return StandinElement(self.dom.find(id=value), self.rpc)
+
+    def execute_script(self, script):
+        self.rpc()
+        rows = []
+        for tr in self.dom.find(id='player-table-body').find_all('tr', recursive=False):
+            name, cells = tr.select_one('td.td-player span.d-none'), tr.find_all('td', recursive=False)
+            if name and cells and name.get_text().strip(): rows.append([name.get_text().strip(), cells[-1].get_text().strip()])
+        return rows
+
+    def quit(self):
+        self.rpc.conn.close()
+
+
+def _live_driver():
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    return uc.Chrome(options=options, use_subprocess=False)
+
+
+def run(pages=5, players_per_page=25, live=False, modes=('elements', 'page_source', 'script')):
+    site = StandinSite(n_teams=0, transfer_pages=pages, players_per_transfer_page=players_per_page)
+    urls = [path for path in site.pages if path.startswith('/en/players/')]
+    results = {}
+    with StandinServer(site) as server:
+        driver = _live_driver() if live else StandinDriver(server)
+        try:
+            for mode in modes:
+                timings, rows, calls = [], [], 0
+                for path in urls:
+                    driver.get(server.root_url + path)
+                    body = driver.find_element(By.ID, 'player-table-body')
+                    before = driver.rpc.calls if not live else 0
+                    start = time.perf_counter()
+                    page_rows = scrape_data.extract_player_rows(driver, body, mode)
+                    timings.append(time.perf_counter() - start)
+                    calls += (driver.rpc.calls - before) if not live else 0
+                    rows.extend(page_rows)
+                results[mode] = {'median_ms': statistics.median(timings) * 1000, 'rows': rows, 'calls_per_page': calls / len(urls)}
+        finally:
+            driver.quit()
+    expected = scrape_data.with_numeric_etv([[name, etv] for name, _, _, etv in site.transfer_rows])
+    return results, {mode: r['rows'] == expected for mode, r in results.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--players', type=int, default=25, help="Players per page.")
+    parser.add_argument('--live', action='store_true', help="Use a real (headless) Chrome instead of the stand-in driver.")
+    args = parser.parse_args()
+
+    results, correct = run(args.pages, args.players, args.live)
+    for mode, r in results.items():
+        calls = '' if args.live else f", {r['calls_per_page']:.0f} WebDriver calls/page"
+        print(f"{mode:>12}: {r['median_ms']:8.1f} ms/page{calls}, rows match the fixture: {correct[mode]}")
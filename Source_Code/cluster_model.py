@@ -0,0 +1,209 @@
+"""
+Player archetypes (EX3's K-means clusters) fitted out of core and kept: StandardScaler, IncrementalPCA and
+MiniBatchKMeans all learn from chunks of the results tables (partial_fit), so the player set never has to be in
+memory at once, and the fitted state is saved with joblib.
+
+    python cluster_model.py fit [results.csv ...] [--partitions OUT_DIR] [--k 4] [--components 10] [--chunksize 50000]
+    python cluster_model.py assign new_players.csv [--output labelled.csv]
+
+assign labels players against the stored centroids without refitting anything: the scaling and the projection are
+folded into one affine map, so it is a matrix product and a nearest-centroid search. A fit over refreshed data
+starts K-means from the previous model's centroids and then matches the new clusters to the previous ones (Hungarian
+assignment on the distances between their centres, in the previous model's space), so an archetype keeps its label
+from one daily refresh to the next.
+"""
+import argparse
+import datetime
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+from player_data import stat_features
+
+
+def rebatch(frames, size):
+    """Arrays of size to 2 * size - 1 rows from a stream of frames (the last one is whatever is left)."""
+    pending, n = [], 0
+    for frame in frames:
+        pending.append(frame); n += len(frame)
+        if n < 2 * size: continue
+        rows = np.concatenate(pending)
+        cut = (len(rows) // size - 1) * size  # leaves size to 2 * size - 1 rows pending
+        for start in range(0, cut, size): yield rows[start:start + size]
+        pending, n = [rows[cut:]], len(rows) - cut
+    if n: yield np.concatenate(pending)
+
+
+class ArchetypeModel:
+    def __init__(self, k=4, n_components=None, batch_size=1024, n_epochs=3, random_state=0):
+        """
+        n_components: IncrementalPCA components before K-means (None: cluster the standardized stats, as EX3 does).
+        batch_size: rows per partial_fit; n_epochs: passes of MiniBatchKMeans over the data.
+        """
+        self.k, self.n_components, self.batch_size, self.n_epochs, self.random_state = k, n_components, batch_size, n_epochs, random_state
+
+    def _features(self, chunk):
+        X = stat_features(chunk)
+        return X if list(X.columns) == self.columns else X.reindex(columns=self.columns, fill_value=0)
+
+    def _batches(self, chunks, transform=True):
+        features = (self._features(chunk) for chunk in chunks())
+        for batch in rebatch((X.to_numpy() for X in features if len(X)), self.batch_size):
+            yield self._project(batch) if transform else batch
+
+    def fit(self, chunks, previous=None):
+        """
+        Fit on chunks, a callable returning a new iterator over frames of results rows on every call (it is called
+        2 + n_epochs times, 3 + n_epochs with a PCA). previous: the model of the last refresh, whose centroids start
+        K-means and whose labels the matching clusters keep.
+        """
+        first = next(iter(chunks()))
+        self.columns = list(stat_features(first).columns)
+        self.scaler = StandardScaler()
+        for batch in self._batches(chunks, transform=False): self.scaler.partial_fit(batch)
+        self.pca = None
+        if self.n_components:
+            pca = IncrementalPCA(self.n_components)
+            for batch in self._batches(chunks, transform=False): pca.partial_fit(self.scaler.transform(batch))
+            self.pca = pca
+        self._prepare_projection()
+
+        init = 'k-means++'
+        if previous is not None and previous.k == self.k and previous.columns == self.columns: init = self._project(previous.stat_centers)
+        kmeans = MiniBatchKMeans(self.k, init=init, n_init=1 if isinstance(init, np.ndarray) else 3, batch_size=self.batch_size,
+                                 random_state=self.random_state)
+        for _ in range(self.n_epochs):
+            for batch in self._batches(chunks): kmeans.partial_fit(batch)
+        self.centroids = kmeans.cluster_centers_.astype(np.float64)
+        self.stat_centers = self._unproject(self.centroids)
+        self.labels = self._match_labels(previous)
+
+        sizes, inertia = np.zeros(len(self.centroids), dtype=np.int64), 0.0
+        for batch in self._batches(chunks):
+            nearest, dist = self._nearest(batch)
+            sizes += np.bincount(nearest, minlength=len(self.centroids)); inertia += float(dist.sum())
+        self.sizes = dict(zip(self.labels.tolist(), sizes.tolist()))
+        self.inertia = inertia
+        self.fitted_at = datetime.datetime.now().isoformat(timespec='seconds')
+        return self
+
+    def _prepare_projection(self):
+        # x -> ((x - mean) / scale - pca_mean) @ components.T as x @ A + b; without a PCA, just the scaling.
+        mean, scale = self.scaler.mean_, self.scaler.scale_
+        if self.pca is None:
+            self._A, self._b = np.diag(1 / scale), -mean / scale
+        else:
+            components = self.pca.components_
+            self._A = (components / scale).T
+            self._b = -(mean / scale + self.pca.mean_) @ components.T
+
+    def _project(self, X):
+        return np.asarray(X, dtype=np.float64) @ self._A + self._b
+
+    def _unproject(self, P):
+        """Points of the clustering space back in stat units."""
+        Z = self.pca.inverse_transform(P) if self.pca is not None else P
+        return self.scaler.inverse_transform(Z)
+
+    def _nearest(self, P):
+        """Index of and squared distance to the nearest centroid of each projected row."""
+        dist = (P * P).sum(axis=1)[:, None] - 2 * P @ self.centroids.T + (self.centroids * self.centroids).sum(axis=1)[None, :]
+        nearest = dist.argmin(axis=1)
+        return nearest, np.maximum(dist[np.arange(len(P)), nearest], 0)
+
+    def _match_labels(self, previous):
+        """Label of each centroid: the label of the previous model's cluster it matches, new labels for the others."""
+        if previous is None or previous.columns != self.columns: return np.arange(len(self.centroids))
+        # Both sets of centres compared in the previous model's space, one new cluster per previous one at most.
+        old, new = previous._project(previous.stat_centers), previous._project(self.stat_centers)
+        cost = ((new[:, None, :] - old[None, :, :]) ** 2).sum(axis=2)
+        rows, cols = linear_sum_assignment(cost)
+        labels = np.full(len(self.centroids), -1)
+        labels[rows] = previous.labels[cols]
+        unmatched = labels < 0
+        labels[unmatched] = previous.labels.max() + 1 + np.arange(unmatched.sum())
+        return labels
+
+    def assign(self, df):
+        """Archetype label of every row of df (-1 for players without a match played, who are not clustered)."""
+        labels = pd.Series(-1, index=df.index, name='archetype')
+        X = self._features(df)
+        if len(X): labels[X.index] = self.labels[self._nearest(self._project(X.to_numpy()))[0]]
+        return labels
+
+    def centers(self):
+        """Centre of each archetype in stat units, one row per label."""
+        return pd.DataFrame(self.stat_centers, columns=self.columns, index=pd.Index(self.labels, name='archetype')).sort_index()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        state = {key: value for key, value in self.__dict__.items() if not key.startswith('_')}
+        joblib.dump({'model': state, 'sklearn_version': sklearn.__version__}, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        bundle = joblib.load(path)
+        if bundle.get('sklearn_version') != sklearn.__version__:
+            import logging
+            logging.getLogger().warning(f"{path} was saved with scikit-learn {bundle.get('sklearn_version')}, running {sklearn.__version__}.")
+        model = cls.__new__(cls)
+        model.__dict__.update(bundle['model'])
+        model._prepare_projection()
+        return model
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from player_data import iter_result_chunks, load_results
+
+    parser = argparse.ArgumentParser(prog=prog, description="Fit, keep and apply the player archetypes (EX3 K-means) out of core.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('fit', 'assign'):
+        sub.add_parser(name).add_argument('--model', default=data_path('archetypes.joblib'))
+    fit_p, assign_p = sub.choices['fit'], sub.choices['assign']
+    fit_p.add_argument('results', nargs='*', help="results.csv files (default: the data directory's, unless --partitions is given).")
+    fit_p.add_argument('--partitions', default=None, help="Output directory of a crawl queue: every competition/season it wrote.")
+    fit_p.add_argument('--k', type=int, default=4)
+    fit_p.add_argument('--components', type=int, default=None, help="IncrementalPCA components before K-means (default: none).")
+    fit_p.add_argument('--chunksize', type=int, default=50_000, help="Rows read from the CSVs at a time.")
+    fit_p.add_argument('--batch-size', type=int, default=1024)
+    fit_p.add_argument('--epochs', type=int, default=3)
+    fit_p.add_argument('--fresh', action='store_true', help="Ignore the saved model: new labels, K-means++ start.")
+    assign_p.add_argument('input', help="Players to label (results.csv columns).")
+    assign_p.add_argument('--output', default=None, help="Write the input with an archetype column here.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'fit':
+        paths = args.results or ([] if args.partitions else [data_path('results.csv')])
+        previous = ArchetypeModel.load(args.model) if os.path.exists(args.model) and not args.fresh else None
+        model = ArchetypeModel(args.k, args.components, args.batch_size, args.epochs)
+        model.fit(lambda: iter_result_chunks(paths, args.partitions, args.chunksize), previous)
+        model.save(args.model)
+        print(f"{sum(model.sizes.values())} players in {len(model.sizes)} archetypes, fitted in {time.perf_counter() - start:.1f}s"
+              + (f" (labels matched to the model of {previous.fitted_at})" if previous is not None else ""))
+        for label, size in sorted(model.sizes.items()): print(f"  archetype {label}: {size} players")
+        print(f"Inertia {model.inertia:.1f}; model saved to {args.model}")
+        return
+
+    model = ArchetypeModel.load(args.model)
+    df = load_results(args.input)
+    loaded = time.perf_counter()
+    df['archetype'] = model.assign(df)
+    elapsed = time.perf_counter() - loaded
+    if args.output: df.to_csv(args.output, index=False, encoding='utf-8-sig', na_rep='N/a'); print(f"Wrote {len(df)} labelled players to {args.output}")
+    else: print(df[[c for c in ('player', 'team', 'Req_Position', 'archetype') if c in df.columns]].to_string(index=False))
+    print(f"{len(df)} players assigned in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
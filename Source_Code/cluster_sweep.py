@@ -0,0 +1,91 @@
+"""
+Model selection for the number of K-means clusters: every k is fitted once and gives both its WCSS (elbow) and
+its silhouette score.
+
+The pairwise distances the silhouette needs are computed once and shared by all k (over the full set when it is
+small enough, otherwise over a fixed random sample), and the values of k are fitted in parallel with joblib.
+For large inputs, minibatch=True fits MiniBatchKMeans instead of KMeans.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import pairwise_distances, silhouette_score
+from threadpoolctl import threadpool_limits
+
+MAX_EXACT_SILHOUETTE = 8000   # n x n float64 distances: 8000 rows is ~0.5 GB
+
+
+def _fit_one(X, k, distances, sample, n_init, random_state, minibatch, batch_size):
+    start = time.perf_counter()
+    # Each job runs single-threaded; the parallelism comes from fitting several k at once.
+    with threadpool_limits(limits=1):
+        if minibatch: model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, n_init=n_init, random_state=random_state)
+        else: model = KMeans(n_clusters=k, init='k-means++', n_init=n_init, random_state=random_state)
+        labels = model.fit_predict(X)
+    score = np.nan
+    if distances is not None:
+        sample_labels = labels if sample is None else labels[sample]
+        if 1 < len(np.unique(sample_labels)) < len(sample_labels):
+            score = silhouette_score(distances, sample_labels, metric='precomputed')
+    return {'k': k, 'wcss': model.inertia_, 'silhouette': score, 'n_iter': model.n_iter_, 'fit_seconds': time.perf_counter() - start}
+
+
+def sweep_k(X, k_range=range(1, 41), silhouette='auto', sample_size=3000, n_init=10, random_state=0,
+            n_jobs=-1, minibatch=False, batch_size=1024):
+    """
+    WCSS and silhouette score for each k in k_range, as a frame indexed by k.
+    silhouette: 'exact' (distance matrix of all rows), 'sample' (of sample_size random rows, the same rows for
+        every k), 'auto' (exact up to MAX_EXACT_SILHOUETTE rows) or None to skip it. k=1 has no silhouette (NaN).
+    n_jobs: parallel fits, joblib convention (-1 = all cores).
+    """
+    X = np.asarray(X, dtype='float64')
+    if silhouette == 'auto': silhouette = 'exact' if len(X) <= MAX_EXACT_SILHOUETTE else 'sample'
+    sample, distances = None, None
+    if silhouette == 'sample' and len(X) > sample_size:
+        sample = np.sort(np.random.default_rng(random_state).choice(len(X), sample_size, replace=False))
+        distances = pairwise_distances(X[sample], n_jobs=n_jobs)
+    elif silhouette in ('exact', 'sample'):
+        distances = pairwise_distances(X, n_jobs=n_jobs)
+    elif silhouette is not None:
+        raise ValueError(f"Unknown silhouette mode: {silhouette}")
+
+    # Largest k first: they take longest, so the pool finishes with the short fits.
+    ks = sorted(k_range, reverse=True)
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_one)(X, k, distances, sample, n_init, random_state, minibatch, batch_size) for k in ks)
+    return pd.DataFrame(rows).set_index('k').sort_index()
+
+
+def best_k(sweep):
+    """k with the highest silhouette score."""
+    return int(sweep['silhouette'].idxmax())
+
+
+def main(argv=None, prog=None):
+    from sklearn.preprocessing import StandardScaler
+    from data_paths import data_path
+    from player_data import load_results, stat_features
+
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__)
+    parser.add_argument('csv_path', nargs='?', default=data_path('results.csv'), help="results.csv written by EX1.")
+    parser.add_argument('--k-max', type=int, default=40)
+    parser.add_argument('--silhouette', default='auto', choices=['auto', 'exact', 'sample'])
+    parser.add_argument('--sample-size', type=int, default=3000)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--minibatch', action='store_true')
+    args = parser.parse_args(argv)
+
+    X = stat_features(load_results(args.csv_path))
+    start = time.perf_counter()
+    sweep = sweep_k(StandardScaler().fit_transform(X), range(1, args.k_max + 1), args.silhouette, args.sample_size,
+                    n_jobs=args.n_jobs, minibatch=args.minibatch)
+    print(sweep.round(4).to_string())
+    print(f"\nBest k by silhouette: {best_k(sweep)}  ({len(X)} players, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Durable work queue of a multi-league crawl, in one SQLite file:
+- partitions: one (competition, season) each, crawled from its league page and written to its own results.csv;
+- jobs: one per URL (the league page of a partition, then one per squad it lists); a URL is queued once whatever
+  the partition or the run that finds it again;
+- team_rows: the player rows of each finished squad (JSON, e.g. PlayerStatStore.to_json(), zlib-compressed), stored
+  in the same transaction that marks its job done, and dropped once the partition's results file is written with
+  none of its squads failed (otherwise they are kept, so a retry of the failed squads rewrites the whole partition).
+Workers (threads of one process) claim pending jobs one at a time, so at most one squad per worker and one
+partition at a time are held in memory. A job that could not be tried (its host paused by the crawl scheduler) is
+deferred: queued again for later without using up an attempt. A restarted run puts the jobs left running back in the queue and carries on;
+finished jobs and written partitions are never redone.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS partitions (
+    competition TEXT NOT NULL, season TEXT NOT NULL, league_url TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'crawling',
+    rows INTEGER, output TEXT, updated REAL, PRIMARY KEY (competition, season));
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, competition TEXT NOT NULL, season TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, error TEXT, updated REAL, not_before REAL);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, kind, id);
+CREATE INDEX IF NOT EXISTS jobs_by_partition ON jobs (competition, season, status);
+CREATE TABLE IF NOT EXISTS team_rows (job_id INTEGER PRIMARY KEY REFERENCES jobs (id), data BLOB NOT NULL);
+"""
+CURRENT_SEASON = 'current'
+
+
+def partition_output_path(out_dir, competition, season=None):
+    return os.path.join(out_dir, competition, season or CURRENT_SEASON, 'results.csv')
+
+
+class CrawlQueue:
+    def __init__(self, path, max_attempts=3):
+        """max_attempts: claims of a job before it is left 'failed' (retry_failed() queues those again)."""
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if 'not_before' not in {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}:
+            conn.execute('ALTER TABLE jobs ADD COLUMN not_before REAL')  # queues created before deferrals existed
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._lock: self._connections.append(conn)
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK'); raise
+        conn.execute('COMMIT')
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections: conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_partition(self, competition, season, league_url):
+        """Queue a partition and its league page; False when it is already known (crawling or done)."""
+        season = season or CURRENT_SEASON
+        with self._transaction() as conn:
+            added = conn.execute('INSERT OR IGNORE INTO partitions (competition, season, league_url, updated) VALUES (?, ?, ?, ?)',
+                                 (competition, season, league_url, time.time())).rowcount
+            if added: self._insert_job(conn, league_url, 'league', competition, season)
+        return bool(added)
+
+    @staticmethod
+    def _insert_job(conn, url, kind, competition, season):
+        return conn.execute('INSERT OR IGNORE INTO jobs (url, kind, competition, season, updated) VALUES (?, ?, ?, ?, ?)',
+                            (url, kind, competition, season, time.time())).rowcount
+
+    def add_teams(self, competition, season, urls):
+        """Queue the squad pages of a partition; returns how many were new (URLs already queued are skipped)."""
+        with self._transaction() as conn:
+            return sum(self._insert_job(conn, url, 'team', competition, season or CURRENT_SEASON) for url in urls)
+
+    def recover(self):
+        """After a crash: jobs left running go back to pending, partitions left half-written back to crawling."""
+        with self._transaction() as conn:
+            jobs = conn.execute("UPDATE jobs SET status = 'pending', worker = NULL WHERE status = 'running'").rowcount
+            conn.execute("UPDATE partitions SET status = 'crawling' WHERE status = 'writing'")
+        return jobs
+
+    def retry_failed(self):
+        """Queue the failed jobs again; their partitions, written or not, go back to crawling and are rewritten."""
+        with self._transaction() as conn:
+            # A written partition is reopened only if the rows of its finished squads are still stored: a queue file
+            # from before they were kept has dropped them, and rewriting would lose those squads.
+            conn.execute("UPDATE partitions SET status = 'crawling', updated = ? WHERE status IN ('failed', 'done') AND EXISTS "
+                         "(SELECT 1 FROM jobs j WHERE j.competition = partitions.competition AND j.season = partitions.season "
+                         "AND j.status = 'failed') AND (status = 'failed' OR NOT EXISTS (SELECT 1 FROM jobs j WHERE "
+                         "j.competition = partitions.competition AND j.season = partitions.season AND j.kind = 'team' "
+                         "AND j.status = 'done' AND j.id NOT IN (SELECT job_id FROM team_rows)))", (time.time(),))
+            jobs = conn.execute("UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, not_before = NULL WHERE status = 'failed'").rowcount
+        return jobs
+
+    def claim(self, worker):
+        """The next pending job (league pages first, so squads get queued early) marked running, or None; deferred
+        jobs are skipped until their time."""
+        with self._transaction() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE status = 'pending' AND (not_before IS NULL OR not_before <= ?) "
+                               "ORDER BY kind = 'team', id LIMIT 1", (time.time(),)).fetchone()
+            if job is None: return None
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                         (worker, time.time(), job['id']))
+        return dict(job, attempts=job['attempts'] + 1)
+
+    def complete(self, job, rows=None):
+        with self._transaction() as conn:
+            if rows is not None:
+                conn.execute('INSERT OR REPLACE INTO team_rows (job_id, data) VALUES (?, ?)',
+                             (job['id'], zlib.compress(json.dumps(rows).encode('utf-8'))))
+            conn.execute("UPDATE jobs SET status = 'done', error = NULL, updated = ? WHERE id = ?", (time.time(), job['id']))
+
+    def fail(self, job, error):
+        """Back to pending, or 'failed' once max_attempts claims are used up; returns the new status."""
+        status = 'failed' if job['attempts'] >= self.max_attempts else 'pending'
+        with self._transaction() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, worker = NULL, updated = ? WHERE id = ?',
+                         (status, str(error), time.time(), job['id']))
+            if status == 'failed' and job['kind'] == 'league':
+                conn.execute("UPDATE partitions SET status = 'failed', updated = ? WHERE competition = ? AND season = ?",
+                             (time.time(), job['competition'], job['season']))
+        return status
+
+    def defer(self, job, until, reason=None):
+        """Back to pending without counting the claim as an attempt, not to be claimed before `until` (epoch seconds)."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), not_before = ?, error = ?, worker = NULL, "
+                         "updated = ? WHERE id = ?", (until, None if reason is None else str(reason), time.time(), job['id']))
+
+    def active(self):
+        """Jobs pending or running: while there are some, more work may still appear."""
+        return self._conn().execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+
+    def claim_finished_partition(self):
+        """
+        A crawling partition whose league page and squads are all settled (done or failed), marked 'writing' so a
+        single worker writes it; None when there is none.
+        """
+        with self._transaction() as conn:
+            part = conn.execute(
+                "SELECT p.competition, p.season FROM partitions p WHERE p.status = 'crawling' AND EXISTS "
+                "(SELECT 1 FROM jobs j WHERE j.competition = p.competition AND j.season = p.season AND j.kind = 'league' AND j.status = 'done') "
+                "AND NOT EXISTS (SELECT 1 FROM jobs j WHERE j.competition = p.competition AND j.season = p.season "
+                "AND j.status IN ('pending', 'running')) LIMIT 1").fetchone()
+            if part is None: return None
+            conn.execute("UPDATE partitions SET status = 'writing', updated = ? WHERE competition = ? AND season = ?",
+                         (time.time(), part['competition'], part['season']))
+        return part['competition'], part['season']
+
+    def partition_rows(self, competition, season):
+        """The stored rows of each finished squad of a partition (as given to complete()), in URL order."""
+        cursor = self._conn().execute(
+            "SELECT r.data FROM team_rows r JOIN jobs j ON j.id = r.job_id WHERE j.competition = ? AND j.season = ? "
+            "AND j.status = 'done' ORDER BY j.url", (competition, season or CURRENT_SEASON))
+        for (data,) in cursor:
+            yield json.loads(zlib.decompress(data))
+
+    def finish_partition(self, competition, season, output, rows):
+        """Record the written results file and drop the partition's stored rows, unless some of its squads failed
+        (retry_failed() would then need them to write the partition again)."""
+        season = season or CURRENT_SEASON
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM team_rows WHERE job_id IN (SELECT id FROM jobs WHERE competition = ? AND season = ?) AND NOT EXISTS "
+                         "(SELECT 1 FROM jobs WHERE competition = ? AND season = ? AND status = 'failed')",
+                         (competition, season, competition, season))
+            conn.execute("UPDATE partitions SET status = 'done', output = ?, rows = ?, updated = ? WHERE competition = ? AND season = ?",
+                         (output, rows, time.time(), competition, season))
+
+    def release_partition(self, competition, season, status='crawling'):
+        with self._transaction() as conn:
+            conn.execute('UPDATE partitions SET status = ?, updated = ? WHERE competition = ? AND season = ?',
+                         (status, time.time(), competition, season or CURRENT_SEASON))
+
+    def progress(self):
+        """One dict per partition: its status, output, rows, and squads done / pending / failed."""
+        conn = self._conn()
+        counts = {}
+        for row in conn.execute("SELECT competition, season, status, COUNT(*) FROM jobs WHERE kind = 'team' GROUP BY 1, 2, 3"):
+            counts.setdefault((row[0], row[1]), {})[row[2]] = row[3]
+        result = []
+        for p in conn.execute('SELECT * FROM partitions ORDER BY competition, season'):
+            c = counts.get((p['competition'], p['season']), {})
+            result.append({'competition': p['competition'], 'season': p['season'], 'status': p['status'], 'rows': p['rows'],
+                           'output': p['output'], 'teams_done': c.get('done', 0),
+                           'teams_pending': c.get('pending', 0) + c.get('running', 0), 'teams_failed': c.get('failed', 0)})
+        return result
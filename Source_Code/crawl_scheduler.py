@@ -0,0 +1,180 @@
+"""
+Per-host request scheduling for the crawlers, shared by all their workers:
+- a token bucket per host (rate requests/s, bursts of up to `burst`), so a healthy host is crawled as fast as the
+  configured rate allows and no faster;
+- 429 / Retry-After: the host is paused for the time the server asks (the backoff delay without Retry-After). Only
+  when it throttles again within `throttle_window` seconds of the previous pause is its rate halved (an unpaced
+  host starts from half the rate it was being crawled at); successes then raise it back additively, up to the rate
+  it had before the cuts, and an unpaced host goes back to unpaced;
+- exponential backoff with full jitter between the attempts of a failing URL;
+- a circuit breaker: after `failure_threshold` consecutive failures the host is skipped (CircuitOpenError) for
+  `cooldown` seconds, then a single probe request decides whether it closes again.
+"""
+import collections
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class CircuitOpenError(Exception):
+    """The host failed too often recently; requests to it are refused until its cooldown ends."""
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None when absent or invalid."""
+    if value is None: return None
+    value = str(value).strip()
+    if value.isdigit(): return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+
+class _HostState:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.updated = now
+        self.not_before = 0.0
+        self.failures = 0
+        self.successes = 0
+        self.open_until = None
+        self.probing = False
+        self.last_throttled = None  # start of the last pause asked by the host
+        self.good_rate = None  # rate before the cuts, while the host is slowed down
+        self.was_unpaced = False
+        self.sent = collections.deque()  # send times over the last throttle window, while unpaced
+
+
+class CrawlScheduler:
+    def __init__(self, rate=None, burst=1, backoff_base=2.0, backoff_max=60.0, failure_threshold=5, cooldown=120.0,
+                 recovery_successes=5, throttle_window=30.0, metrics=None, clock=time.monotonic, sleep=time.sleep, rng=None):
+        """
+        rate: requests per second per host (None = no limit; backoff, Retry-After and the breaker still apply).
+        backoff_base: the n-th retry of a URL waits a uniform random time in [0, min(backoff_max, base * 2**n)].
+        failure_threshold / cooldown: consecutive failures that open the circuit, and how long it stays open.
+        recovery_successes: successes in a row after which a slowed down host's rate goes back up one step.
+        throttle_window: a host throttling again within this many seconds of its last pause gets its rate halved.
+        metrics: optional run_metrics.RunMetrics receiving the time slept and the throttle/breaker counters.
+        """
+        self.rate, self.burst = rate, max(1, burst)
+        self.backoff_base, self.backoff_max = backoff_base, backoff_max
+        self.failure_threshold, self.cooldown = failure_threshold, cooldown
+        self.recovery_successes = recovery_successes
+        self.throttle_window = throttle_window
+        self.metrics = metrics
+        self.clock, self._sleep = clock, sleep
+        self.rng = rng or random.Random()
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url):
+        return urlsplit(url).netloc.lower()
+
+    def _state(self, host, now):
+        state = self._hosts.get(host)
+        if state is None: state = self._hosts[host] = _HostState(self.rate, self.burst, now)
+        return state
+
+    def _count(self, name):
+        if self.metrics: self.metrics.count(name)
+
+    def acquire(self, url):
+        """Block until a request to url's host may be sent; returns the seconds waited. Raises CircuitOpenError."""
+        host, waited = self.host_of(url), 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                state = self._state(host, now)
+                if state.open_until is not None:
+                    if now < state.open_until or state.probing:
+                        self._count('circuit_rejections')
+                        raise CircuitOpenError(f"{host} failed {state.failures} times in a row, paused until the cooldown ends.")
+                    state.probing = True  # half-open: this request is the probe
+                wait = state.not_before - now
+                if state.rate:
+                    state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                    state.updated = now
+                    wait = max(wait, (1 - state.tokens) / state.rate)
+                if wait <= 0:
+                    if state.rate: state.tokens -= 1
+                    else: self._record_send(state, now)
+                    break
+                if state.probing: state.probing = False
+            self._sleep(wait)
+            waited += wait
+        if waited and self.metrics: self.metrics.slept(waited, 'rate_limit')
+        return waited
+
+    def success(self, url):
+        with self._lock:
+            state = self._state(self.host_of(url), self.clock())
+            state.failures, state.open_until, state.probing = 0, None, False
+            state.successes += 1
+            if state.good_rate is not None and state.successes >= self.recovery_successes:
+                state.rate, state.successes = state.rate + state.good_rate / 8, 0
+                if state.rate >= state.good_rate:
+                    state.rate, state.good_rate = None if state.was_unpaced else state.good_rate, None
+
+    def _record_send(self, state, now):
+        state.sent.append(now)
+        while state.sent and state.sent[0] < now - self.throttle_window: state.sent.popleft()
+
+    def _slow_down(self, state, now):
+        """Halve the host's rate; an unpaced host starts from half the rate its requests were sent at."""
+        if state.good_rate is None:
+            state.was_unpaced = not state.rate
+            if state.was_unpaced:
+                sent_rate = len(state.sent) / max(now - state.sent[0], 1.0) if state.sent else 1.0
+                state.rate, state.tokens, state.updated = sent_rate, 0.0, now
+            state.good_rate = state.rate
+        state.rate = max(state.good_rate / 16, state.rate / 2)
+        self._count('rate_reduced')
+
+    def failure(self, url, attempt=0, retry_after=None, throttled=False):
+        """
+        Record a failed request (throttled: the server answered 429/503 asking to slow down). Returns the delay
+        before the next attempt: the Retry-After when given, otherwise the jittered exponential backoff.
+        """
+        with self._lock:
+            now = self.clock()
+            state = self._state(self.host_of(url), now)
+            state.successes, state.probing = 0, False
+            delay = self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)) if self.backoff_base else 0.0
+            if throttled:
+                if retry_after is not None: delay = retry_after
+                if now >= state.not_before:  # not a request sent before the pause already asked for
+                    if state.last_throttled is not None and now - state.last_throttled <= self.throttle_window: self._slow_down(state, now)
+                    state.last_throttled = now
+                state.not_before = max(state.not_before, now + delay)
+                self._count('throttled')
+            else:
+                state.failures += 1
+                if state.failures >= self.failure_threshold:
+                    state.open_until = now + self.cooldown
+                    self._count('circuit_opened')
+        return delay
+
+    def backoff(self, url, attempt=0, retry_after=None, throttled=False):
+        """failure() and sleep for the returned delay."""
+        delay = self.failure(url, attempt, retry_after, throttled)
+        if delay > 0:
+            self._sleep(delay)
+            if self.metrics: self.metrics.slept(delay, 'retry_backoff')
+        return delay
+
+    def cooldown_remaining(self, url):
+        """Seconds before the open circuit of url's host lets a probe through (0 when it is closed)."""
+        with self._lock:
+            state = self._hosts.get(self.host_of(url))
+            if state is None or state.open_until is None: return 0.0
+            return max(0.0, state.open_until - self.clock())
+
+    def host_rate(self, url):
+        state = self._hosts.get(self.host_of(url))
+        return state.rate if state else self.rate
@@ -0,0 +1,18 @@
+"""
+Where the pipeline's files live. Every script reads and writes under one data directory: $EPL_DATA_DIR when it is
+set (the epl command's --data-dir sets it), otherwise the repository's data/ folder, or ./data when the modules are
+installed outside the repository.
+"""
+import os
+
+DATA_DIR_ENV = 'EPL_DATA_DIR'
+REPO_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def data_dir():
+    if os.environ.get(DATA_DIR_ENV): return os.environ[DATA_DIR_ENV]
+    return REPO_DATA_DIR if os.path.isdir(REPO_DATA_DIR) else os.path.join(os.getcwd(), 'data')
+
+
+def data_path(*parts):
+    return os.path.join(data_dir(), *parts)
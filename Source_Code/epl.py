@@ -0,0 +1,121 @@
+"""
+One command for the whole pipeline:
+
+    epl [--data-dir DIR] [--timing] <command> [options]       (epl <command> --help lists its options)
+
+    scrape    fbref player tables -> results.csv                        (EX1)
+    stats     median / mean / std, all players and per team -> results2.csv   (EX2_p2)
+    top       top / bottom 3 players of every statistic -> top_3.txt   (EX2-p1)
+    hist      per-statistic histograms, all players and per team       (EX2-p3)
+    cluster   K-means elbow / silhouette sweep                         (EX3)
+    archetypes  K-means archetypes fitted out of core -> archetypes.joblib; assign labels new players
+    similar   who plays like a player: nearest neighbours in EX3's stat space -> similarity_index.joblib
+    match     scraped players -> their ETV_list.csv entry               (EX4-p1)
+    train     ETV valuation pipeline -> etv_pipeline.joblib             (EX4-p2)
+    predict   ETV predictions of the saved pipeline
+    serve     HTTP service of the saved pipeline
+    startup   time how long every command takes to start
+
+Only the module of the command being run is imported, so cheap commands like top or stats do not load Selenium,
+scikit-learn or torch. Files are read and written in the data directory: --data-dir, else $EPL_DATA_DIR, else the
+repository's data/ folder.
+"""
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+from data_paths import DATA_DIR_ENV
+
+# command -> (module with a main(argv, prog), arguments put before the user's)
+COMMANDS = {
+    'scrape': ('EX1', []),
+    'stats': ('team_stats', []),
+    'top': ('rankings', []),
+    'hist': ('histograms', []),
+    'cluster': ('cluster_sweep', []),
+    'archetypes': ('cluster_model', []),
+    'similar': ('similarity_index', []),
+    'match': ('name_matching', []),
+    'train': ('etv_pipeline', []),
+    'predict': ('etv_service', ['predict']),
+    'serve': ('etv_service', ['serve']),
+}
+# Modules whose import alone costs a noticeable share of a second or more.
+HEAVY_MODULES = ['selenium', 'undetected_chromedriver', 'sklearn', 'scipy', 'matplotlib', 'torch', 'sentence_transformers']
+
+
+def run_command(command, argv, timing=False):
+    module_name, prefix = COMMANDS[command]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if timing: print(f"[epl] {module_name} imported in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+    # With a prefix (etv_service's own subcommands), the module's parser already adds the command to its usage line.
+    return module.main(prefix + list(argv), prog='epl' if prefix else f'epl {command}')
+
+
+def heavy_modules_loaded(command):
+    """The HEAVY_MODULES a fresh interpreter has loaded once the command's module is imported."""
+    code = (f"import importlib, sys; importlib.import_module({COMMANDS[command][0]!r}); "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return [m for m in out.stdout.strip().split(',') if m]
+
+
+def startup_times(commands=None, repeat=5):
+    """
+    Best of `repeat` wall-clock times of `epl <command> --help` in a fresh interpreter (interpreter start, import
+    of the command's module, argument parsing), per command, with the bare interpreter start as reference.
+    """
+    script = os.path.abspath(__file__)
+
+    def best(cmd):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    results = {'(python)': {'seconds': best([sys.executable, '-c', 'pass']), 'heavy': []}}
+    for command in commands or COMMANDS:
+        results[command] = {'seconds': best([sys.executable, script, command, '--help']), 'heavy': heavy_modules_loaded(command)}
+    return results
+
+
+def _startup(argv):
+    parser = argparse.ArgumentParser(prog='epl startup', description=startup_times.__doc__)
+    parser.add_argument('--commands', default=','.join(COMMANDS), help="Comma separated commands to time.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None, help="Exit with status 1 if a command starts slower than this.")
+    args = parser.parse_args(argv)
+
+    commands = [c for c in args.commands.split(',') if c]
+    unknown = [c for c in commands if c not in COMMANDS]
+    if unknown: parser.error(f"unknown commands: {unknown}")
+    results = startup_times(commands, args.repeat)
+    for command, r in results.items():
+        print(f"{command:>10}: {r['seconds']:6.3f}s  {'loads ' + ', '.join(r['heavy']) if r['heavy'] else ''}")
+    slow = [c for c in commands if args.max_seconds and results[c]['seconds'] > args.max_seconds]
+    if slow: print(f"Slower than {args.max_seconds}s: {', '.join(slow)}")
+    return 1 if slow else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='epl', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=None, help=f"Data directory (default: ${DATA_DIR_ENV} or the repository's data/).")
+    parser.add_argument('--timing', action='store_true', help="Print the time spent importing the command's module.")
+    parser.add_argument('command', choices=list(COMMANDS) + ['startup'])
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    if args.data_dir: os.environ[DATA_DIR_ENV] = os.path.abspath(args.data_dir)
+    if args.command == 'startup': return _startup(args.args)
+    return run_command(args.command, args.args, args.timing)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+The EX4-p2 valuation model as one serializable scikit-learn pipeline: preprocessing, feature selection and the
+regressor, persisted with joblib together with the columns it expects, so predictions need no notebook session.
+"""
+import argparse
+import datetime
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import BaseEstimator
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.feature_selection import SelectFromModel, SelectorMixin
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+
+def to_numeric_frame(df):
+    """pd.to_numeric(errors='coerce') on the columns that are not numeric yet; typed columns pass through as is."""
+    if not isinstance(df, pd.DataFrame): return df
+    pending = [col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])]
+    if not pending: return df
+    df = df.copy()
+    for col in pending: df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def build_preprocessor(num_ft, categorical_ft):
+    """EX4-p2's preprocessor; get_feature_names_out() gives the processed column names (all-NaN columns dropped)."""
+    numeric_transformer = Pipeline(steps=[
+        ('to_numeric', FunctionTransformer(to_numeric_frame, validate=False, feature_names_out='one-to-one')),
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())
+    ])
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+    ])
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, num_ft),
+            ('cat', categorical_transformer, categorical_ft)
+        ],
+        remainder='passthrough',
+        verbose_feature_names_out=False
+    )
+
+
+def build_features(preprocessor, selector_threshold='median', random_state=42):
+    """preprocess -> SelectFromModel(random forest importances): the model input, fitted per fold when comparing models."""
+    selector = SelectFromModel(RandomForestRegressor(n_estimators=100, random_state=random_state), threshold=selector_threshold)
+    return Pipeline([('preprocess', preprocessor), ('select', selector)])
+
+
+def build_pipeline(preprocessor, model, selector_threshold='median', random_state=42):
+    """preprocess -> SelectFromModel(random forest importances) -> model, as fitted step by step in EX4-p2."""
+    return Pipeline(build_features(preprocessor, selector_threshold, random_state).steps + [('model', model)])
+
+
+class FrozenSelection(SelectorMixin, BaseEstimator):
+    """
+    The columns a fitted selector kept. SelectFromModel derives its mask from the forest's feature importances on
+    every transform (most of the time of a one-row prediction); this keeps the mask only.
+    """
+
+    def __init__(self, support=None):
+        self.support = support
+
+    def fit(self, X=None, y=None):
+        self.support_ = np.asarray(self.support, dtype=bool)
+        self.n_features_in_ = len(self.support_)
+        return self
+
+    def _get_support_mask(self):
+        return self.support_
+
+
+def freeze_selection(pipeline):
+    """Copy of a fitted pipeline with its 'select' step replaced by the FrozenSelection of its mask."""
+    steps = [(name, FrozenSelection(step.get_support()).fit() if name == 'select' and not isinstance(step, FrozenSelection) else step)
+             for name, step in pipeline.steps]
+    return Pipeline(steps)
+
+
+def save_pipeline(pipeline, path, metrics=None, freeze=True):
+    """
+    Persist a fitted pipeline with the input columns it was trained on and some provenance.
+    freeze: save the selection as its mask (freeze_selection) rather than with the forest that computed it.
+    """
+    if freeze: pipeline = freeze_selection(pipeline)
+    bundle = {
+        'pipeline': pipeline,
+        'columns': list(pipeline.feature_names_in_),
+        'model': type(pipeline.named_steps['model']).__name__,
+        'metrics': metrics or {},
+        'trained_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'sklearn_version': sklearn.__version__,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    joblib.dump(bundle, path)
+    return path
+
+
+def load_pipeline(path):
+    bundle = joblib.load(path)
+    if bundle.get('sklearn_version') != sklearn.__version__:
+        import logging
+        logging.getLogger().warning(f"{path} was saved with scikit-learn {bundle.get('sklearn_version')}, running {sklearn.__version__}.")
+    return bundle
+
+
+def align_features(frame, columns):
+    """The columns the pipeline was trained on, in order; missing ones are NaN (imputed by the pipeline)."""
+    return frame.reindex(columns=columns) if list(frame.columns) != columns else frame
+
+
+def predict_frame(bundle, frame):
+    return np.asarray(bundle['pipeline'].predict(align_features(frame, bundle['columns'])), dtype='float64')
+
+
+def train(X, y, test_size=0.2, cv=5, n_jobs=-1, search=False, random_state=42, feature_types=None):
+    """
+    EX4-p2 steps 1-5 without the plots: the default models (plus their halving_search tuned versions with search)
+    compared by cross-validated RMSE on the training split, preprocessing and feature selection fitted on each
+    fold's training part, and the best one refitted as a single pipeline. Returns (pipeline, test metrics, CV report).
+    feature_types: (numeric, categorical) column lists (default: valuation_data.schema_feature_types(X)).
+    """
+    from sklearn.base import clone
+    from sklearn.model_selection import train_test_split
+    from model_search import METRICS, cross_validate_models, default_models, default_search_spaces, halving_search
+    from valuation_data import schema_feature_types
+
+    num_ft, categorical_ft = feature_types or schema_feature_types(X)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    preprocessor = build_preprocessor(num_ft, categorical_ft)
+    features = build_features(clone(preprocessor), random_state=random_state)
+
+    models = default_models(random_state)
+    if search:
+        _, tuned = halving_search(default_search_spaces(random_state), X_train, y_train, cv=cv, preprocessor=features, n_jobs=n_jobs)
+        models.update({f"{name} (tuned)": model for name, model in tuned.items()})
+    cv_report, _ = cross_validate_models(models, X_train, y_train, cv=cv, preprocessor=features, n_jobs=n_jobs)
+    best_name = cv_report['rmse_mean'].idxmin()
+
+    pipeline = build_pipeline(clone(preprocessor), clone(models[best_name]), random_state=random_state).fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+    metrics = {'model': best_name, **{f'{name}_test': float(score(y_test, y_pred)) for name, score in METRICS.items()}}
+    return pipeline, metrics, cv_report
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from model_search import format_report
+    from valuation_data import training_set
+
+    parser = argparse.ArgumentParser(prog=prog, description="Train the ETV valuation pipeline (EX4-p2) and save it for etv_service.")
+    parser.add_argument('--results', default=data_path('results.csv'), help="results.csv written by EX1.")
+    parser.add_argument('--matches', default=data_path('EX4-p1-results-bertcos.csv'), help="Player -> ETV matches from EX4-p1.")
+    parser.add_argument('--output', default=data_path('etv_pipeline.joblib'))
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--search', action='store_true', help="Also compare successive-halving tuned versions of the models.")
+    parser.add_argument('--cache-dir', default=data_path('training_cache'), help="Prepared training sets, keyed by the input files' hashes.")
+    parser.add_argument('--no-cache', action='store_true', help="Prepare the training set without reading or writing the cache.")
+    args = parser.parse_args(argv)
+
+    data = training_set(args.results, args.matches, None if args.no_cache else args.cache_dir)
+    X, y = data['X'], data['y']
+    print(f"{len(X)} players with an ETV, {X.shape[1]} input columns" + (" (prepared set read from the cache)" if data['cached'] else ""))
+    pipeline, metrics, cv_report = train(X, y, cv=args.cv, n_jobs=args.n_jobs, search=args.search,
+                                         feature_types=(data['numeric'], data['categorical']))
+    print(format_report(cv_report))
+    print(f"Best model by CV RMSE: {metrics['model']}; test RMSE {metrics['rmse_test']:.4f}, MAE {metrics['mae_test']:.4f}, "
+          f"R2 {metrics['r2_test']:.4f}")
+    save_pipeline(pipeline, args.output, metrics)
+    print(f"Pipeline saved to {args.output}")
+
+
+if __name__ == "__main__":
+    # Run from the imported module, so the saved pipeline refers to etv_pipeline.to_numeric_frame, not __main__'s.
+    from etv_pipeline import main
+    main()
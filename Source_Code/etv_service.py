@@ -0,0 +1,235 @@
+"""
+ETV predictions from the pipeline saved by EX4-p2 (etv_pipeline.save_pipeline), loaded once per process.
+
+    python etv_service.py predict --model etv_pipeline.joblib --input results.csv --output predicted.csv
+    python etv_service.py predict --model etv_pipeline.joblib --players results.csv --player "Bukayo Saka"
+    python etv_service.py serve --model etv_pipeline.joblib --players results.csv --port 8765
+    python etv_service.py bench --model etv_pipeline.joblib --input results.csv
+
+The server answers POST /predict (a JSON record, a list of records or {"records": [...]}, stat columns as keys),
+GET /predict?player=<name> (needs --players; the whole table is predicted in one batch on the first lookup) and
+GET /stats (request count, p50/p99 latency, throughput).
+"""
+import argparse
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from etv_pipeline import load_pipeline, predict_frame
+from player_data import load_results
+
+
+class LatencyLog:
+    """Durations of the last `window` calls plus running totals, for p50/p99 latency and throughput."""
+
+    def __init__(self, window=10000):
+        self.durations = collections.deque(maxlen=window)
+        self.requests, self.rows, self.busy = 0, 0, 0.0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def record(self, seconds, rows=1):
+        with self.lock:
+            self.durations.append(seconds)
+            self.requests += 1; self.rows += rows; self.busy += seconds
+
+    def summary(self):
+        with self.lock:
+            durations = np.array(self.durations) * 1000
+            requests, rows, busy = self.requests, self.rows, self.busy
+        p50, p99 = (np.percentile(durations, [50, 99]).tolist() if len(durations) else [float('nan')] * 2)
+        return {'requests': requests, 'rows': rows, 'p50_ms': p50, 'p99_ms': p99,
+                'rows_per_s': rows / busy if busy else 0.0,
+                'requests_per_s': requests / (time.perf_counter() - self.started)}
+
+
+class ETVPredictor:
+    """
+    model_path: bundle written by etv_pipeline.save_pipeline.
+    players: optional results table (load_results) for lookups by player name.
+    """
+
+    def __init__(self, model_path, players=None):
+        self.bundle = load_pipeline(model_path)
+        self.columns = self.bundle['columns']
+        self.players = players
+        self._by_name = None
+        self._name_lock = threading.Lock()
+        self.latency = LatencyLog()
+
+    def predict(self, frame):
+        """Predicted ETV (million €) for each row of frame."""
+        start = time.perf_counter()
+        predictions = predict_frame(self.bundle, frame)
+        self.latency.record(time.perf_counter() - start, len(frame))
+        return predictions
+
+    def predict_records(self, records):
+        if not records: return []  # an empty batch is valid, the pipeline cannot take zero rows
+        return self.predict(pd.DataFrame.from_records(records, columns=self.columns)).tolist()
+
+    def predict_one(self, record):
+        return self.predict_records([record])[0]
+
+    def _player_index(self):
+        with self._name_lock:
+            if self._by_name is None:
+                if self.players is None: raise ValueError("No player table loaded (--players).")
+                predictions = self.predict(self.players)
+                index = collections.defaultdict(list)
+                for name, team, value in zip(self.players['player'].astype(str), self.players['team'], predictions):
+                    index[name.lower()].append({'player': name, 'team': team, 'ETV_predicted': float(value)})
+                self._by_name = dict(index)
+        return self._by_name
+
+    def predict_player(self, name):
+        """Predictions for every row of the player table named `name` (one per team played for); [] when unknown."""
+        start = time.perf_counter()
+        rows = self._player_index().get(str(name).strip().lower(), [])
+        self.latency.record(time.perf_counter() - start, len(rows))
+        return rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        predictor = self.server.predictor
+        if url.path == '/stats': return self._send(200, predictor.latency.summary())
+        if url.path == '/health': return self._send(200, {'model': predictor.bundle['model'], 'trained_at': predictor.bundle['trained_at']})
+        if url.path != '/predict': return self._send(404, {'error': 'not found'})
+        name = parse_qs(url.query).get('player', [''])[0]
+        if not name: return self._send(400, {'error': "missing ?player="})
+        try:
+            rows = predictor.predict_player(name)
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        self._send(200 if rows else 404, {'player': name, 'predictions': rows})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/predict': return self._send(404, {'error': 'not found'})
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            if isinstance(payload, dict) and 'records' in payload: payload = payload['records']
+            if isinstance(payload, dict): return self._send(200, {'prediction': self.server.predictor.predict_one(payload)})
+            if not isinstance(payload, list): raise ValueError("expected a record, a list of records or {\"records\": [...]}")
+            self._send(200, {'predictions': self.server.predictor.predict_records(payload)})
+        except (ValueError, TypeError, KeyError) as e:  # malformed JSON, records or values
+            self._send(400, {'error': f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class PredictionServer:
+    """Serves an ETVPredictor over HTTP from a background thread. Use as a context manager."""
+
+    def __init__(self, predictor, host='127.0.0.1', port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.predictor = predictor
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown(); self.httpd.server_close()
+
+
+def benchmark(predictor, frame, requests=1000, batch_size=None):
+    """Single-record latency over `requests` calls (p50/p99) and the rows/s of predicting the frame in batches."""
+    records = frame.reindex(columns=predictor.columns).to_dict('records')
+    single = LatencyLog(window=requests)
+    for i in range(requests):
+        start = time.perf_counter()
+        predictor.predict_one(records[i % len(records)])
+        single.record(time.perf_counter() - start)
+    batch = LatencyLog()
+    batch_size = batch_size or len(frame)
+    for start_row in range(0, len(frame), batch_size):
+        part = frame.iloc[start_row:start_row + batch_size]
+        start = time.perf_counter()
+        predictor.predict(part)
+        batch.record(time.perf_counter() - start, len(part))
+    return {'single': single.summary(), 'batch': batch.summary()}
+
+
+def _print_summary(label, s):
+    print(f"{label}: {s['requests']} calls, p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms, {s['rows_per_s']:.0f} rows/s")
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+
+    parser = argparse.ArgumentParser(prog=prog, description="Predict estimated transfer values with the saved EX4-p2 pipeline.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('predict', 'serve', 'bench'):
+        p = sub.add_parser(name)
+        p.add_argument('--model', default=data_path('etv_pipeline.joblib'))
+        p.add_argument('--players', default=None, help="Results table (results.csv) for lookups by player name.")
+    predict_p, serve_p, bench_p = sub.choices['predict'], sub.choices['serve'], sub.choices['bench']
+    predict_p.add_argument('--input', default=None, help="CSV of players (results.csv columns) to predict in one batch.")
+    predict_p.add_argument('--output', default=None, help="Write the input with an ETV_predicted column here.")
+    predict_p.add_argument('--player', action='append', default=[], help="Player name to look up in --players (repeatable).")
+    serve_p.add_argument('--host', default='127.0.0.1')
+    serve_p.add_argument('--port', type=int, default=8765)
+    bench_p.add_argument('--input', required=True)
+    bench_p.add_argument('--requests', type=int, default=1000)
+    bench_p.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    predictor = ETVPredictor(args.model, load_results(args.players) if args.players else None)
+    print(f"Loaded {predictor.bundle['model']} pipeline ({len(predictor.columns)} input columns) in {time.perf_counter() - start:.2f}s")
+
+    if args.command == 'predict':
+        if args.input:
+            frame = load_results(args.input)
+            frame['ETV_predicted'] = predictor.predict(frame)
+            if args.output: frame.to_csv(args.output, index=False, encoding='utf-8-sig'); print(f"Wrote {len(frame)} predictions to {args.output}")
+            else: print(frame[[c for c in ('player', 'team', 'ETV_predicted') if c in frame.columns]].to_string(index=False))
+        for name in args.player:
+            rows = predictor.predict_player(name)
+            if not rows: print(f"{name}: not in the player table")
+            for row in rows: print(f"{row['player']} ({row['team']}): {row['ETV_predicted']:.2f} M€")
+        _print_summary("predict", predictor.latency.summary())
+    elif args.command == 'serve':
+        with PredictionServer(predictor, args.host, args.port) as server:
+            print(f"Serving on {server.url} (POST /predict, GET /predict?player=, GET /stats). Ctrl+C to stop.")
+            try:
+                server.thread.join()
+            except KeyboardInterrupt:
+                pass
+    else:
+        results = benchmark(predictor, load_results(args.input), args.requests, args.batch_size)
+        _print_summary("single record", results['single'])
+        _print_summary("batch", results['batch'])
+
+
+if __name__ == "__main__":
+    main()
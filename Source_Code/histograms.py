@@ -0,0 +1,191 @@
+"""
+Batch rendering of the per-statistic histograms (all players and every team).
+
+Bin counts are computed up front: one pass per statistic bins every player against edges shared by all teams and
+counts them per team with a single bincount. Rendering only draws those counts, on Agg figures created without
+pyplot, so jobs can be spread over a process pool. A manifest in the output directory keeps the hash of each
+image's input; images whose counts, edges and labels have not changed are not redrawn.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = 'histograms.manifest.json'
+RENDER_VERSION = 1   # bump when the drawing code changes so every image is redrawn
+ALL_PLAYERS_STYLE = {'color': 'skyblue', 'bins': 20}
+TEAM_STYLE = {'color': 'mediumseagreen', 'bins': 15}
+
+
+def sanitize_stat(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def sanitize_team(name):
+    return re.sub(r'_+', '_', re.sub(r'[\n<>:"/\\|?*()\s]', '_', str(name)).strip('_'))
+
+
+def binned_counts(values, codes, n_groups, edges):
+    """Histogram counts of values per group code (n_groups x bins); the last bin includes its right edge."""
+    n_bins = len(edges) - 1
+    bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, n_bins - 1)
+    codes = np.asarray(codes, dtype=np.int64)
+    return np.bincount(codes * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+
+def histogram_jobs(df, stats, output_dir, group_col='team', small_multiples=False):
+    """
+    Render jobs (plain dicts of counts, edges and labels) for every statistic: the all-players histogram and
+    either one image per team or, with small_multiples, every team of a statistic in one figure.
+    """
+    teams = pd.Categorical(df[group_col].astype(str))
+    team_names = list(teams.categories)
+    jobs = []
+    for stat in stats:
+        values = pd.to_numeric(df[stat], errors='coerce').to_numpy(dtype='float64')
+        valid = ~np.isnan(values)
+        if not valid.any(): continue
+        stat_file = sanitize_stat(stat)
+        all_edges = np.histogram_bin_edges(values[valid], ALL_PLAYERS_STYLE['bins'])
+        jobs.append({'kind': 'single', 'path': os.path.join(output_dir, f'all_players_{stat_file}.png'),
+                     'title': f'Distribution of {stat} - All Players', 'xlabel': stat, 'color': ALL_PLAYERS_STYLE['color'],
+                     'edges': all_edges, 'counts': binned_counts(values[valid], np.zeros(valid.sum(), dtype=int), 1, all_edges)[0]})
+
+        team_edges = np.histogram_bin_edges(values[valid], TEAM_STYLE['bins'])
+        team_counts = binned_counts(values[valid], teams.codes[valid], len(team_names), team_edges)
+        present = [i for i in range(len(team_names)) if team_counts[i].any()]
+        if small_multiples:
+            jobs.append({'kind': 'grid', 'path': os.path.join(output_dir, f'teams_{stat_file}.png'),
+                         'title': f'Distribution of {stat} by team', 'xlabel': stat, 'color': TEAM_STYLE['color'],
+                         'edges': team_edges, 'counts': team_counts[present], 'labels': [team_names[i] for i in present]})
+            continue
+        for i in present:
+            jobs.append({'kind': 'single', 'path': os.path.join(output_dir, f'{sanitize_team(team_names[i])}_{stat_file}.png'),
+                         'title': f'Distribution of {stat} - Team: {team_names[i]}', 'xlabel': stat, 'color': TEAM_STYLE['color'],
+                         'edges': team_edges, 'counts': team_counts[i]})
+    return jobs
+
+
+def job_digest(job):
+    h = hashlib.sha256(str(RENDER_VERSION).encode())
+    for key in sorted(job):
+        value = job[key]
+        h.update(key.encode())
+        h.update(np.asarray(value).tobytes() if isinstance(value, np.ndarray) else json.dumps(value).encode())
+    return h.hexdigest()
+
+
+def _draw(ax, job, counts, title, fontsize):
+    edges = job['edges']
+    ax.hist(edges[:-1], bins=edges, weights=counts, color=job['color'], edgecolor='black', alpha=0.75)
+    ax.set_title(title, fontsize=fontsize)
+    ax.grid(axis='y', alpha=0.7)
+
+
+def render_job(job):
+    """Draw one job to its PNG. Uses Figure + Agg canvas directly, so it needs no display and no pyplot state."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if job['kind'] == 'grid':
+        n = len(job['labels'])
+        cols = min(5, n)
+        rows = -(-n // cols)
+        fig = Figure(figsize=(4 * cols, 3 * rows))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(rows, cols, sharex=True, sharey=True, squeeze=False).ravel()
+        for ax, label, counts in zip(axes, job['labels'], job['counts']): _draw(ax, job, counts, label, 10)
+        for ax in axes[n:]: ax.set_visible(False)
+        fig.suptitle(job['title'], fontsize=15)
+        fig.supxlabel(job['xlabel'], fontsize=12)
+        fig.supylabel('Frequency', fontsize=12)
+    else:
+        fig = Figure(figsize=(12, 7))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        _draw(ax, job, job['counts'], job['title'], 15)
+        ax.set_xlabel(job['xlabel'], fontsize=12)
+        ax.set_ylabel('Frequency', fontsize=12)
+    fig.tight_layout()
+    fig.savefig(job['path'])
+    return job['path']
+
+
+def _render_batch(jobs):
+    return [render_job(job) for job in jobs]
+
+
+def render_histograms(jobs, workers=None, force=False):
+    """
+    Render the jobs whose input changed since the last run (all of them with force), over `workers` processes
+    (1 = in this process). Returns (rendered paths, number skipped).
+    """
+    if not jobs: return [], 0
+    output_dir = os.path.dirname(jobs[0]['path'])
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f: manifest = json.load(f)
+    except (FileNotFoundError, ValueError): manifest = {}
+
+    digests = {job['path']: job_digest(job) for job in jobs}
+    todo = [job for job in jobs if force or manifest.get(os.path.basename(job['path'])) != digests[job['path']] or not os.path.exists(job['path'])]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(todo) < 2:
+        rendered = _render_batch(todo)
+    else:
+        # A few batches per worker: enough to balance the load without paying pickling/IPC per image.
+        n_batches = min(len(todo), workers * 4)
+        batches = [todo[i::n_batches] for i in range(n_batches)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = [path for paths in pool.map(_render_batch, batches) for path in paths]
+
+    for path in rendered: manifest[os.path.basename(path)] = digests[path]
+    with open(manifest_path, 'w', encoding='utf-8') as f: json.dump(manifest, f, indent=1, sort_keys=True)
+    return rendered, len(jobs) - len(todo)
+
+
+def benchmark_workers(jobs, worker_counts=(1, 2, 4, 8)):
+    """Wall-clock time of a forced render of all jobs for each worker count."""
+    timings = {}
+    for workers in worker_counts:
+        start = time.perf_counter()
+        render_histograms(jobs, workers=workers, force=True)
+        timings[workers] = time.perf_counter() - start
+    return timings
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from player_data import load_results
+
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__)
+    parser.add_argument('csv_path', nargs='?', default=data_path('results.csv'), help="results.csv written by EX1.")
+    parser.add_argument('output_dir', nargs='?', default=data_path('team_analysis'))
+    parser.add_argument('--stats', default='Exp_xG,GnS_SCA90,Shoot_G/Sh,Defen_Tkl,Defen_Blocks,Defen_Int')
+    parser.add_argument('--workers', type=int, default=None, help="Render processes (default: one per CPU).")
+    parser.add_argument('--small-multiples', action='store_true', help="One figure with every team per statistic.")
+    parser.add_argument('--force', action='store_true', help="Redraw images even when their input is unchanged.")
+    parser.add_argument('--benchmark', help="Comma-separated worker counts to time a full render with, e.g. 1,2,4,8.")
+    args = parser.parse_args(argv)
+
+    df = load_results(args.csv_path)
+    jobs = histogram_jobs(df, [s for s in args.stats.split(',') if s in df.columns], args.output_dir, small_multiples=args.small_multiples)
+    if args.benchmark:
+        timings = benchmark_workers(jobs, [int(w) for w in args.benchmark.split(',')])
+        base = timings[min(timings)]
+        print(f"{len(jobs)} images")
+        for workers, seconds in timings.items(): print(f"  {workers:>3} workers: {seconds:6.2f}s  (x{base / seconds:.2f})")
+    else:
+        rendered, skipped = render_histograms(jobs, args.workers, args.force)
+        print(f"Rendered {len(rendered)} images, {skipped} unchanged, in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Model selection for the ETV valuation model (EX4-p2, step 3).
+
+cross_validate_models() fits every model once per fold and scores all metrics (RMSE, MAE, R2) from the same
+predictions; the preprocessor (for EX4-p2, preprocessing plus feature selection) is fitted once per fold, on that
+fold's training part only, and its output shared by every model. halving_search() runs a successive-halving random
+search per candidate model: many configurations on a small sample, only the best ones on more data. Both run under one parallelism budget: n_jobs (model, fold) fits in parallel, each fit single
+threaded (the models' own n_jobs and the BLAS/OpenMP pools are set to 1), so nothing oversubscribes the cores.
+Both return a report with the number of fits performed and the time spent per candidate.
+"""
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
+
+METRICS = {
+    'rmse': lambda y, p: float(np.sqrt(mean_squared_error(y, p))),
+    'mae': mean_absolute_error,
+    'r2': r2_score,
+}
+
+
+def default_models(random_state=42):
+    return {
+        'Ridge': Ridge(random_state=random_state),
+        'RandomForest': RandomForestRegressor(n_estimators=100, random_state=random_state),
+        'GradientBoosting': GradientBoostingRegressor(n_estimators=100, random_state=random_state),
+    }
+
+
+def default_search_spaces(random_state=42):
+    """Candidate models and the hyperparameter distributions halving_search samples from."""
+    return {
+        'Ridge': (Ridge(random_state=random_state), {'alpha': loguniform(1e-2, 1e3)}),
+        'RandomForest': (RandomForestRegressor(random_state=random_state), {
+            'n_estimators': randint(50, 300), 'max_depth': [None, 4, 8, 16], 'min_samples_leaf': randint(1, 8),
+            'max_features': [1.0, 'sqrt', 0.5]}),
+        'GradientBoosting': (GradientBoostingRegressor(random_state=random_state), {
+            'n_estimators': randint(50, 300), 'learning_rate': loguniform(0.01, 0.3), 'max_depth': randint(2, 6),
+            'subsample': uniform(0.6, 0.4), 'min_samples_leaf': randint(1, 10)}),
+    }
+
+
+def single_threaded(estimator):
+    """Clone of estimator with every n_jobs parameter (including nested ones) set to 1."""
+    estimator = clone(estimator)
+    nested = {key: 1 for key in estimator.get_params() if key == 'n_jobs' or key.endswith('__n_jobs')}
+    return estimator.set_params(**nested) if nested else estimator
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, 'iloc') else data[idx]
+
+
+def _split(X, y, train, valid, preprocessor):
+    X_tr, X_va, y_tr, y_va = _take(X, train), _take(X, valid), _take(y, train), _take(y, valid)
+    if preprocessor is not None:
+        with threadpool_limits(limits=1):
+            prep = single_threaded(preprocessor).fit(X_tr, y_tr)
+            X_tr, X_va = prep.transform(X_tr), prep.transform(X_va)
+    return X_tr, np.asarray(y_tr), X_va, np.asarray(y_va)
+
+
+def fold_data(X, y, cv=5, preprocessor=None, n_jobs=None):
+    """
+    (X_train, y_train, X_valid, y_valid) per fold of KFold(cv), with the preprocessor fitted on each train part
+    (the folds in parallel with n_jobs, each single threaded).
+    """
+    splitter = cv if hasattr(cv, 'split') else KFold(n_splits=cv)
+    return Parallel(n_jobs=n_jobs)(delayed(_split)(X, y, train, valid, preprocessor) for train, valid in splitter.split(X, y))
+
+
+def _fit_and_score(name, estimator, fold, X_tr, y_tr, X_va, y_va):
+    start = time.perf_counter()
+    with threadpool_limits(limits=1):
+        predictions = estimator.fit(X_tr, y_tr).predict(X_va)
+    scores = {metric: score(y_va, predictions) for metric, score in METRICS.items()}
+    return {'model': name, 'fold': fold, 'seconds': time.perf_counter() - start, **scores}
+
+
+def cross_validate_models(models, X, y, cv=5, preprocessor=None, n_jobs=-1):
+    """
+    Cross-validated RMSE, MAE and R2 of each model from one fit per fold.
+    Returns (report, per-fold scores): report has the mean/std of each metric, the fits performed and the summed
+    fit time per model, plus the wall-clock of the whole run in report.attrs['wall_seconds'].
+    """
+    start = time.perf_counter()
+    folds = fold_data(X, y, cv, preprocessor, n_jobs=n_jobs)
+    tasks = [delayed(_fit_and_score)(name, single_threaded(model), i, *fold)
+             for name, model in models.items() for i, fold in enumerate(folds)]
+    per_fold = pd.DataFrame(Parallel(n_jobs=n_jobs)(tasks))
+    grouped = per_fold.groupby('model', sort=False)
+    report = pd.DataFrame({f'{metric}_{stat}': grouped[metric].agg(stat) for metric in METRICS for stat in ('mean', 'std')})
+    # std over folds as np.std (ddof=0), like cross_val_score(...).std()
+    for metric in METRICS: report[f'{metric}_std'] = grouped[metric].agg(lambda s: float(np.std(s)))
+    report['fits'] = grouped.size()
+    report['fit_seconds'] = grouped['seconds'].sum()
+    report.attrs['wall_seconds'] = time.perf_counter() - start
+    return report, per_fold
+
+
+def halving_search(candidates, X, y, cv=5, preprocessor=None, n_jobs=-1, factor=3, n_candidates=18,
+                   random_state=42, scoring='neg_root_mean_squared_error'):
+    """
+    HalvingRandomSearchCV over each candidate's distributions (candidates: name -> (estimator, distributions)).
+    With a preprocessor, it is put in front of the model in a Pipeline whose fitted preprocessor is cached
+    (joblib Memory, shared by the candidates), so configurations evaluated on the same data share one
+    preprocessor fit; the best estimators returned are then the model steps, to be compared with the same
+    preprocessor by cross_validate_models.
+    n_candidates: configurations sampled in the first round; each round keeps the best 1/factor of them on factor
+        times more rows, sized so the last round uses every row.
+    Returns (report with best CV RMSE, fits, wall-clock and best params per candidate, {name: best estimator}).
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingRandomSearchCV
+
+    rows, best = [], {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, (estimator, distributions) in candidates.items():
+            if preprocessor is not None:
+                estimator = Pipeline([('prep', preprocessor), ('model', estimator)], memory=Memory(cache_dir, verbose=0))
+                distributions = {f'model__{key}': value for key, value in distributions.items()}
+            search = HalvingRandomSearchCV(single_threaded(estimator), distributions, n_candidates=n_candidates, factor=factor, cv=cv,
+                                           min_resources='exhaust', scoring=scoring, n_jobs=n_jobs, random_state=random_state)
+            start = time.perf_counter()
+            with threadpool_limits(limits=1):
+                search.fit(X, y)
+            n_splits = cv if isinstance(cv, int) else cv.get_n_splits()
+            rows.append({'model': name, 'best_rmse': -search.best_score_,
+                         'configurations': int(search.n_candidates_[0]), 'final_rows': int(search.n_resources_[-1]),
+                         'fits': int(sum(search.n_candidates_)) * n_splits + 1,
+                         'wall_seconds': time.perf_counter() - start, 'best_params': search.best_params_})
+            best[name] = search.best_estimator_.named_steps['model'] if preprocessor is not None else search.best_estimator_
+    return pd.DataFrame(rows).set_index('model'), best
+
+
+def format_report(report):
+    columns = [c for c in report.columns if c != 'best_params']
+    text = report[columns].round(4).to_string()
+    if 'wall_seconds' in report.attrs: text += f"\nTotal wall-clock: {report.attrs['wall_seconds']:.1f}s"
+    return text
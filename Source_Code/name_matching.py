@@ -0,0 +1,219 @@
+"""
+Matching scraped player names to the names of another source (ETV_list.csv), without comparing every pair.
+
+Names go through cheap stages first: exact lowercase name, accent-folded name, then the folded name with its
+tokens sorted ("son heung-min" / "heung-min son"), each a dict lookup. Only the names left over are looked up in a
+character n-gram TF-IDF index, whose sparse product touches just the target names sharing n-grams with the query,
+and optionally re-ranked by sentence-embedding cosine. Embeddings are kept in an on-disk cache keyed by name, so a
+name is encoded once across runs.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger()
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+# Letters NFKD does not decompose into a base letter + accent.
+_FOLD_TABLE = str.maketrans({'ø': 'o', 'đ': 'd', 'ð': 'd', 'ł': 'l', 'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'ı': 'i', 'þ': 'th'})
+
+
+def standardize_player_name(name_series):
+    split_name = name_series.astype(str).str.split('    ').str[0]
+    return split_name.str.lower()
+
+
+def fold_name(name):
+    """Lowercase, accent-free, punctuation as spaces: 'Martin Ødegaard' -> 'martin odegaard'."""
+    name = unicodedata.normalize('NFKD', str(name).lower().translate(_FOLD_TABLE))
+    name = ''.join(' ' if not (c.isalnum() or unicodedata.combining(c)) else c for c in name if not unicodedata.combining(c))
+    return ' '.join(name.split())
+
+
+def token_key(name):
+    return ' '.join(sorted(fold_name(name).split()))
+
+
+class EmbeddingCache:
+    """
+    Sentence embeddings of names, persisted to one .npz file per model. The model (sentence_transformers) is only
+    imported and loaded when a name is missing from the cache.
+    """
+
+    def __init__(self, path, model_name=DEFAULT_MODEL):
+        self.path = path
+        self.model_name = model_name
+        self._model = None
+        self.index, self.vectors = {}, None
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                if str(data['model']) == model_name:
+                    self.index = {name: i for i, name in enumerate(data['names'].tolist())}
+                    self.vectors = data['vectors']
+                else: logger.info(f"Embedding cache {path} was built with {data['model']}, starting empty.")
+
+    def _encoder(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, names):
+        """Unit-normalized embeddings of names (rows in the given order)."""
+        missing = list(dict.fromkeys(n for n in names if n not in self.index))
+        if missing:
+            fresh = np.asarray(self._encoder().encode(missing), dtype='float32')
+            fresh /= np.maximum(np.linalg.norm(fresh, axis=1, keepdims=True), 1e-12)
+            start = len(self.index)
+            self.index.update({name: start + i for i, name in enumerate(missing)})
+            self.vectors = fresh if self.vectors is None else np.vstack([self.vectors, fresh])
+            self.save()
+            logger.info(f"Encoded {len(missing)} new names ({len(self.index)} cached).")
+        return self.vectors[[self.index[n] for n in names]] if names else np.empty((0, 0), dtype='float32')
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.npz')
+        os.close(fd)
+        names = sorted(self.index, key=self.index.get)
+        np.savez(tmp, model=np.array(self.model_name), names=np.array(names, dtype=str), vectors=self.vectors)
+        os.replace(tmp, self.path)
+
+
+class NameMatcher:
+    """Index over the target names; match() finds the best target for each query name."""
+
+    def __init__(self, names, n_candidates=10, ngram_range=(3, 3), max_df=1.0):
+        """max_df: drop n-grams found in more than this share of the names (they only add candidate pairs)."""
+        self.names = [str(n) for n in names]
+        self.n_candidates = n_candidates
+        self.lookups = []
+        for stage, key in (('exact', str.lower), ('normalized', fold_name), ('token', token_key)):
+            table = {}
+            for i, name in enumerate(self.names): table.setdefault(key(name), i)
+            self.lookups.append((stage, key, table))
+        self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=ngram_range, max_df=max_df, sublinear_tf=True)
+        self.matrix = self.vectorizer.fit_transform([fold_name(n) for n in self.names]).T.tocsr()
+
+    def candidates(self, queries):
+        """For each query, (target indices, n-gram cosine) of its n_candidates best targets, best first."""
+        if not queries: return []
+        scores = (self.vectorizer.transform([fold_name(q) for q in queries]) @ self.matrix).tocsr()
+        out = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            idx, val = scores.indices[start:end], scores.data[start:end]
+            if len(val) > self.n_candidates:
+                keep = np.argpartition(-val, self.n_candidates - 1)[:self.n_candidates]
+                idx, val = idx[keep], val[keep]
+            order = np.lexsort((idx, -val))
+            out.append((idx[order], val[order]))
+        return out
+
+    def match(self, queries, embeddings=None):
+        """
+        Best target for each query: frame with query, target (index), target_name, score and method
+        ('exact' / 'normalized' / 'token' score 1.0; 'ngram' n-gram cosine; 'embedding' embedding cosine when an
+        EmbeddingCache is given to re-rank the n-gram candidates). Queries without any shared n-gram get no target.
+        """
+        queries = [str(q) for q in queries]
+        result = [None] * len(queries)
+        pending = list(range(len(queries)))
+        for stage, key, table in self.lookups:
+            left = []
+            for i in pending:
+                target = table.get(key(queries[i]))
+                if target is None: left.append(i)
+                else: result[i] = (target, 1.0, stage)
+            pending = left
+
+        found = self.candidates([queries[i] for i in pending])
+        if embeddings is not None and pending:
+            names = [queries[i] for i in pending] + list(dict.fromkeys(self.names[t] for idx, _ in found for t in idx))
+            vectors = dict(zip(names, embeddings.encode(names)))
+        for i, (idx, val) in zip(pending, found):
+            if not len(idx): result[i] = (-1, np.nan, 'none'); continue
+            if embeddings is None: result[i] = (int(idx[0]), float(val[0]), 'ngram'); continue
+            cosines = np.array([float(vectors[queries[i]] @ vectors[self.names[t]]) for t in idx])
+            best = int(np.argmax(cosines))
+            result[i] = (int(idx[best]), cosines[best], 'embedding')
+
+        target, score, method = zip(*result) if result else ((), (), ())
+        return pd.DataFrame({'query': queries, 'target': target,
+                             'target_name': [self.names[t] if t >= 0 else None for t in target],
+                             'score': score, 'method': method})
+
+
+def read_csv_safe(filepath, required_cols=None, loader=pd.read_csv):
+    df = loader(filepath)
+    if required_cols:
+        missing_cols = [col for col in required_cols if col not in df.columns]
+        if missing_cols:
+            print(f"Error: Missing required columns in '{filepath}': {missing_cols}")
+            print(f"Columns found: {df.columns.tolist()}")
+            sys.exit(1)
+    return df
+
+
+def match_etv_list(df_results, df_etv, embeddings=None, min_minutes=900):
+    """
+    Best ETV_list.csv entry for every player with more than min_minutes played (the EX4-p1-results-bertcos.csv
+    layout). Exact / accent-folded / token-order lookups first; only the rest go through the n-gram index,
+    re-ranked with the embeddings when given.
+    """
+    df_results = df_results.dropna(subset=['Pltime_minutes'])
+    players_filtered = df_results[df_results['Pltime_minutes'].astype(int) > min_minutes].copy()
+    print(f"\nFiltered {len(players_filtered)} players with minutes played > {min_minutes}.")
+    player_names = standardize_player_name(players_filtered['player']).tolist()
+    etv_names = df_etv['Player Name'].str.lower()
+
+    matcher = NameMatcher(etv_names.tolist())
+    try:
+        matches = matcher.match(player_names, embeddings)
+    except ImportError:
+        print("sentence_transformers is not installed, matching without the embedding re-rank.")
+        matches = matcher.match(player_names)
+
+    found = matches['target'].to_numpy() >= 0
+    etv_values = df_etv['ETV'].to_numpy()
+    return pd.DataFrame({
+        'player': player_names,
+        'best_etv_match': matches['target_name'],
+        'cosine_similarity': matches['score'],
+        'Player Name': players_filtered['player'].to_numpy(),
+        'ETV': [etv_values[t] if ok else None for t, ok in zip(matches['target'], found)],
+        'match_method': matches['method'],
+    })
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from player_data import load_results
+
+    parser = argparse.ArgumentParser(prog=prog, description="Match the scraped players to their ETV_list.csv transfer values.")
+    parser.add_argument('--results', default=data_path('results.csv'), help="results.csv written by EX1.")
+    parser.add_argument('--etv', default=data_path('ETV_list.csv'), help="ETV_list.csv written by EX4-p1-scrape_data.")
+    parser.add_argument('--output', default=data_path('EX4-p1-results-bertcos.csv'))
+    parser.add_argument('--no-rerank', action='store_true', help="Skip the sentence-embedding re-rank (offline, no model download).")
+    parser.add_argument('--embedding-cache', default=data_path('name_embeddings.npz'))
+    parser.add_argument('--quiet', action='store_true', help="Do not print every match.")
+    args = parser.parse_args(argv)
+
+    df_results = read_csv_safe(args.results, required_cols=['player', 'Pltime_minutes'], loader=load_results)
+    df_etv = read_csv_safe(args.etv, required_cols=['Player Name', 'ETV'])
+    df_best_matches = match_etv_list(df_results, df_etv, None if args.no_rerank else EmbeddingCache(args.embedding_cache))
+    if not args.quiet:
+        for row in df_best_matches.itertuples(index=False):
+            print(f"Player: {row.player} -> Best match in ETV_list: {row.best_etv_match} ({row.match_method}, similarity: {row.cosine_similarity:.3f})")
+    print(df_best_matches['match_method'].value_counts().rename_axis('method').to_string())
+
+    df_best_matches.to_csv(args.output, index=False, encoding='utf-8')
+    print("Complete writing data to CSV file!")
@@ -0,0 +1,123 @@
+"""
+Content-addressed on-disk cache for fetched HTML pages, shared by the fbref and footballtransfers scrapers.
+
+Bodies are stored gzip-compressed under objects/<sha256 of body>, so identical pages are kept once; index.json maps
+each URL to the body hash and the time it was fetched. Entries older than the TTL are treated as missing (except in
+offline replay) and the oldest entries are evicted once the cache grows past max_bytes. A body no entry refers to
+any more (page fetched again with new content, evicted, expired) is deleted, and opening the cache sweeps the ones
+an interrupted run left behind.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger()
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f: f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+
+class PageCache:
+    def __init__(self, cache_dir, ttl=24 * 3600, max_bytes=512 * 1024 * 1024):
+        """
+        ttl: seconds a page stays fresh (None = never expires).
+        max_bytes: compressed size budget; the least recently fetched pages are evicted beyond it (None = unbounded).
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self._index_path = os.path.join(cache_dir, 'index.json')
+        self.index = self._load_index()
+        with self._lock: self._sweep_unreferenced_locked()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding='utf-8') as f: return json.load(f)
+        except FileNotFoundError: return {}
+        except ValueError:
+            logger.warning(f"Page cache index {self._index_path} is corrupt, starting empty."); return {}
+
+    def _save_index(self):
+        _atomic_write(self._index_path, json.dumps(self.index).encode('utf-8'))
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest + '.html.gz')
+
+    def is_fresh(self, url):
+        entry = self.index.get(url)
+        return bool(entry) and (self.ttl is None or time.time() - entry['fetched_at'] <= self.ttl)
+
+    def get(self, url, allow_expired=False):
+        """Cached body of url, or None when missing (or expired, unless allow_expired)."""
+        entry = self.index.get(url)
+        if not entry or not (allow_expired or self.is_fresh(url)): return None
+        try:
+            with gzip.open(self._object_path(entry['sha256']), 'rb') as f: return f.read().decode('utf-8')
+        except (OSError, EOFError):
+            logger.warning(f"Page cache object for {url} is missing or damaged.")
+            with self._lock: self.index.pop(url, None)
+            return None
+
+    def put(self, url, html):
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _atomic_write(path, gzip.compress(data, compresslevel=6))
+            previous = self.index.get(url)
+            self.index[url] = {'sha256': digest, 'fetched_at': time.time(), 'size': os.path.getsize(path)}
+            if previous and previous['sha256'] != digest: self._release_locked(previous['sha256'])
+            self._evict_locked()
+            self._save_index()
+
+    def _evict_locked(self):
+        if self.max_bytes is None: return
+        sizes = {e['sha256']: e['size'] for e in self.index.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes: return
+        for url, entry in sorted(self.index.items(), key=lambda kv: kv[1]['fetched_at']):
+            if total <= self.max_bytes: break
+            del self.index[url]
+            if self._release_locked(entry['sha256']): total -= sizes[entry['sha256']]
+            logger.debug(f"Evicted {url} from page cache.")
+
+    def _release_locked(self, digest):
+        """Delete the object digest unless an entry still refers to it; True when deleted."""
+        if any(e['sha256'] == digest for e in self.index.values()): return False
+        try: os.remove(self._object_path(digest))
+        except OSError: pass
+        return True
+
+    def _sweep_unreferenced_locked(self):
+        live = {e['sha256'] for e in self.index.values()}
+        objects_dir = os.path.join(self.cache_dir, 'objects')
+        for sub in os.listdir(objects_dir):
+            if not os.path.isdir(os.path.join(objects_dir, sub)): continue
+            for name in os.listdir(os.path.join(objects_dir, sub)):
+                if name.split('.')[0] not in live: os.remove(os.path.join(objects_dir, sub, name))
+
+    def purge_expired(self):
+        """Drop every expired entry and any object no longer referenced."""
+        if self.ttl is None: return 0
+        with self._lock:
+            expired = [url for url in self.index if not self.is_fresh(url)]
+            for url in expired: del self.index[url]
+            self._sweep_unreferenced_locked()
+            self._save_index()
+        return len(expired)
@@ -0,0 +1,103 @@
+"""
+Fetching and parsing of pages as a producer/consumer pipeline. Page parsing is CPU-bound and holds the GIL, so
+done in the fetching thread it stalls the fetch of the next page; here:
+- fetcher threads (mostly waiting on the network, a browser or the page cache) put each page, as raw bytes with
+  the rest of its parse arguments, into a bounded queue;
+- a dispatcher thread hands the pages to a pool of parser processes, with at most `in_flight` of them submitted
+  and not yet taken by the consumer;
+- the consumer gets (item, parse result) in completion order.
+A full queue blocks the fetchers and a full pool blocks the dispatcher, so at most queue_size + in_flight pages
+(plus one per fetcher) are held whatever the speed of each side: with parsers keeping up, the crawl runs at the
+pace of the fetches, and a replay from the page cache parses on every core.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger()
+
+_DONE = object()
+
+
+def parse_pool(parsers=None):
+    """
+    Process pool of `parsers` processes (default: one per core), started with 'spawn' (no copy of the parent's
+    threads, browsers or sockets; and the same behaviour as on Windows) and warmed up in the background.
+    """
+    parsers = parsers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(parsers, mp_context=multiprocessing.get_context('spawn'))
+    for _ in range(parsers): pool.submit(os.getpid)  # a process is started per task while none is idle
+    return pool
+
+
+def _put(q, entry, stop):
+    while not stop.is_set():
+        try: q.put(entry, timeout=0.1); return True
+        except queue.Full: continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try: return q.get(timeout=0.1)
+        except queue.Empty: continue
+    return _DONE
+
+
+def fetch_parse_pipeline(items, fetch, parse, fetchers=1, parsers=None, pool=None, queue_size=None, in_flight=None):
+    """
+    Yield (item, result) for every item, in completion order.
+    fetch(item): the arguments of parse for item (the raw page among them), or None when there is nothing to parse
+        (result None). Runs in `fetchers` threads; an exception is logged and counts as None.
+    parse: picklable function run in the processes of pool (default: a parse_pool(parsers), shut down at the end).
+    queue_size: fetched pages waiting for the dispatcher (default: 2 per parser); in_flight: pages submitted to the
+        parsers and not yet consumed (default: 2 per parser, so a parser has the next page ready when it is done).
+    An exception raised by parse is raised here; leaving the loop early stops the fetchers and the dispatcher.
+    """
+    items = list(items)
+    parsers = parsers or os.cpu_count() or 1
+    own_pool = pool is None
+    if own_pool: pool = parse_pool(parsers)
+    pages = queue.Queue(maxsize=queue_size or 2 * parsers)
+    results = queue.Queue()  # holds at most in_flight parsed pages: a slot is freed when one is consumed
+    slots = threading.Semaphore(in_flight or 2 * parsers)
+    stop, next_item, lock = threading.Event(), iter(items), threading.Lock()
+
+    def fetch_loop():
+        while not stop.is_set():
+            with lock: item = next(next_item, _DONE)
+            if item is _DONE: return
+            try: args = fetch(item)
+            except Exception as e:
+                logger.error(f"Fetching {item} failed: {type(e).__name__}: {e}", exc_info=True); args = None
+            if not _put(pages, (item, args), stop): return
+
+    def dispatch():
+        try:
+            for _ in items:
+                entry = _get(pages, stop)
+                if entry is _DONE: return
+                item, args = entry
+                if args is None: results.put((item, None)); continue
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set(): return
+                pool.submit(parse, *args).add_done_callback(lambda future, item=item: results.put((item, future)))
+        except BaseException as e: results.put((_DONE, e))
+
+    threads = [threading.Thread(target=fetch_loop, name=f'fetcher-{i}', daemon=True) for i in range(max(1, min(fetchers, len(items))))]
+    threads.append(threading.Thread(target=dispatch, name='parse-dispatcher', daemon=True))
+    for thread in threads: thread.start()
+    try:
+        for _ in items:
+            item, future = results.get()
+            if item is _DONE: raise future
+            if future is None: yield item, None; continue
+            slots.release()
+            yield item, future.result()
+    finally:
+        stop.set()
+        for thread in threads: thread.join()
+        if own_pool: pool.shutdown(cancel_futures=True)
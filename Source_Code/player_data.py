@@ -0,0 +1,126 @@
+"""
+Typed loading of the scraped player table. The scraper writes results.parquet next to results.csv with the
+schema from stat_schema; load_results reads it (or falls back to the CSV) so the analysis scripts get numeric
+columns directly instead of re-parsing every column with pd.to_numeric.
+"""
+import glob
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from stat_schema import numeric_columns, results_dtypes
+
+logger = logging.getLogger()
+
+
+def parquet_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def to_typed_frame(df, float_dtype='float32'):
+    """Cast a results frame (as built by the scraper or read from the CSV) to the declared schema."""
+    dtypes = results_dtypes(float_dtype)
+    out = {}
+    for col in df.columns:
+        dtype = dtypes.get(col)
+        if dtype is None: out[col] = df[col]
+        elif dtype == 'Int16': out[col] = pd.to_numeric(df[col], errors='coerce').round().astype('Int16')
+        elif dtype in ('float32', 'float64'): out[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        else: out[col] = df[col].astype(dtype)
+    return pd.DataFrame(out, index=df.index)
+
+
+def write_results_parquet(df, path):
+    """Write the typed columnar copy of a results frame; returns False when pyarrow is not installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.warning("pyarrow is not installed, skipping the parquet copy of the results.")
+        return False
+    to_typed_frame(df).to_parquet(path, index=False)
+    return True
+
+
+def _widen_float32(series):
+    # float32 -> shortest decimal repr -> float64 gives back exactly the value that was written to the CSV.
+    values = series.to_numpy()
+    return pd.Series(values.astype(str).astype(np.float64), index=series.index, name=series.name)
+
+
+def widen_float32(df):
+    """The frame with its float32 columns as the float64 of their decimal form (what a CSV round trip gives)."""
+    wide = [col for col in df.columns if df[col].dtype == np.float32]
+    if not wide: return df
+    df = df.copy()
+    for col in wide: df[col] = _widen_float32(df[col])
+    return df
+
+
+def _csv_dtypes(float_dtype):
+    # The CSV stores ages as "35.0", so they are parsed as floats (and narrowed afterwards by load_results).
+    return {col: (float_dtype if dtype == 'Int16' else dtype) for col, dtype in results_dtypes(float_dtype).items()}
+
+
+def load_results(csv_path, float_dtype='float32', columns=None):
+    """
+    Player table with typed columns. Reads the parquet copy when it is at least as new as the CSV,
+    otherwise parses the CSV straight into the schema.
+    float_dtype: 'float64' gives exactly the values and dtypes of the CSV (Req_Age as float too),
+        for scripts whose output prints the numbers.
+    """
+    pq_path = parquet_path_for(csv_path)
+    use_parquet = os.path.exists(pq_path) and (not os.path.exists(csv_path) or os.path.getmtime(pq_path) >= os.path.getmtime(csv_path))
+    if use_parquet:
+        try:
+            df = pd.read_parquet(pq_path, columns=columns)
+        except ImportError:
+            use_parquet = False
+    if use_parquet:
+        if float_dtype == 'float64':
+            for col in df.columns:
+                if df[col].dtype == np.float32: df[col] = _widen_float32(df[col])
+            if 'Req_Age' in df.columns: df['Req_Age'] = df['Req_Age'].astype('float64')
+        return df
+
+    df = pd.read_csv(csv_path, encoding='utf-8-sig', na_values=['N/a'], usecols=columns, dtype=_csv_dtypes(float_dtype))
+    if 'Req_Age' in df.columns and float_dtype != 'float64': df['Req_Age'] = df['Req_Age'].round().astype('Int16')
+    return df
+
+
+def stat_features(df):
+    """EX3's feature matrix: every numeric stat column (float64) of the players with a match played, missing stats as 0."""
+    numeric = set(numeric_columns())
+    X = df[[col for col in df.columns if col in numeric]]
+    return X[X['Pltime_matches_played'].fillna(0) != 0].astype('float64').fillna(0)
+
+
+def result_tables(paths=(), partitions_dir=None):
+    """
+    (path, extra columns) of several results tables: the results.csv files in paths (a 'source' column when there
+    are several) and every partition a crawl queue wrote under partitions_dir ('competition' and 'season' columns),
+    so the same player in two seasons or leagues stays two rows.
+    """
+    from crawl_queue import partition_output_path
+    tables = [(path, {'source': path} if len(paths) > 1 else {}) for path in paths]
+    if partitions_dir:
+        for path in sorted(glob.glob(partition_output_path(partitions_dir, '*', '*'))):
+            season_dir = os.path.dirname(path)
+            tables.append((path, {'competition': os.path.basename(os.path.dirname(season_dir)), 'season': os.path.basename(season_dir)}))
+    if not tables: raise ValueError("No results table given.")
+    return tables
+
+
+def load_player_set(paths=(), partitions_dir=None, float_dtype='float32'):
+    """The players of the result_tables(paths, partitions_dir) in one frame."""
+    frames = [load_results(path, float_dtype).assign(**extra) for path, extra in result_tables(paths, partitions_dir)]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def iter_result_chunks(paths=(), partitions_dir=None, chunksize=50_000, float_dtype='float32'):
+    """The players of the result_tables(paths, partitions_dir) as typed frames of at most chunksize rows, read from
+    the CSVs chunk by chunk, so tables larger than memory can be streamed."""
+    for path, extra in result_tables(paths, partitions_dir):
+        for chunk in pd.read_csv(path, encoding='utf-8-sig', na_values=['N/a'], dtype=_csv_dtypes(float_dtype), chunksize=chunksize):
+            yield chunk.assign(**extra)
@@ -0,0 +1,171 @@
+"""
+Compact in-memory form of the scraped player rows. Instead of one dict per player per stat table with "N/a"
+strings for the missing values, a PlayerStatStore holds:
+- a (player, team) -> row index;
+- one float32 matrix, NaN-filled when allocated, with a column per numeric field of STAT_DEFINITIONS (STORE_COLUMNS);
+- the repeated text fields (team, Req_Nation, Req_Position) as codes into per-store lists of interned strings.
+The row extraction of EX1 writes straight into it, and to_frame() wraps the matrix in a DataFrame without copying it.
+A player costs the 4-byte cells of its row, a few bytes of codes and its name.
+"""
+import base64
+import sys
+
+import numpy as np
+import pandas as pd
+
+from stat_schema import CATEGORICAL_COLUMNS, CORE_COLUMNS, numeric_columns
+
+# Numeric columns in results.csv order (the core ones, then the others sorted), so to_frame() needs no reordering.
+STORE_COLUMNS = [c for c in CORE_COLUMNS if c in numeric_columns()] + sorted(c for c in numeric_columns() if c not in CORE_COLUMNS)
+COLUMN_INDEX = {col: i for i, col in enumerate(STORE_COLUMNS)}
+TEXT_INDEX = {col: j for j, col in enumerate(CATEGORICAL_COLUMNS)}
+MISSING = "N/a"
+
+
+def as_store_frame(df):
+    """df with the dtypes of PlayerStatStore.to_frame(): the text fields as categoricals, the numeric ones as float32."""
+    out = {}
+    for col in df.columns:
+        if col in TEXT_INDEX and not isinstance(df[col].dtype, pd.CategoricalDtype): out[col] = df[col].astype('category')
+        elif col in COLUMN_INDEX and df[col].dtype != np.float32: out[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+        else: out[col] = df[col]
+    return pd.DataFrame(out, index=df.index)
+
+
+class PlayerStatStore:
+    def __init__(self, capacity=32):
+        # Column-major, so each column is contiguous and is the DataFrame block as is.
+        self.values = np.full((len(STORE_COLUMNS), capacity), np.nan, dtype=np.float32)
+        self.codes = np.full((capacity, len(CATEGORICAL_COLUMNS)), -1, dtype=np.int16)
+        self.players = []
+        self.categories = {col: [] for col in CATEGORICAL_COLUMNS}
+        self._category_codes = {col: {} for col in CATEGORICAL_COLUMNS}
+        # Columns written at least once: the others are left out of the frame, as they were absent from the row dicts.
+        self.seen = np.zeros(len(STORE_COLUMNS), dtype=bool)
+        self.text_seen = np.zeros(len(CATEGORICAL_COLUMNS), dtype=bool)
+        self._index = {}
+
+    def __len__(self):
+        return len(self.players)
+
+    @property
+    def capacity(self):
+        return self.values.shape[1]
+
+    def _grow(self, capacity):
+        values = np.full((len(STORE_COLUMNS), capacity), np.nan, dtype=np.float32)
+        values[:, :len(self)] = self.values[:, :len(self)]
+        codes = np.full((capacity, len(CATEGORICAL_COLUMNS)), -1, dtype=np.int16)
+        codes[:len(self)] = self.codes[:len(self)]
+        self.values, self.codes = values, codes
+
+    def _code(self, col, text):
+        codes = self._category_codes[col]
+        code = codes.get(text)
+        if code is None:
+            code = codes[text] = len(self.categories[col])
+            self.categories[col].append(sys.intern(text))
+        return code
+
+    def row(self, player, team):
+        """Row of (player, team), appended (all NaN) the first time the pair is seen."""
+        key = (player, team)
+        i = self._index.get(key)
+        if i is not None: return i
+        i = self._index[key] = len(self)
+        if i == self.capacity: self._grow(2 * self.capacity)
+        self.players.append(player)
+        self.set_text(i, 'team', team)
+        return i
+
+    def set(self, i, col, value):
+        j = COLUMN_INDEX[col]
+        self.values[j, i] = value
+        self.seen[j] = True
+
+    def write(self, i, columns, values):
+        """values (floats, NaN when missing) into the STORE_COLUMNS positions `columns` (an index array) of row i."""
+        self.values[columns, i] = values
+        self.seen[columns] = True
+
+    def set_text(self, i, col, text):
+        j = TEXT_INDEX[col]
+        self.codes[i, j] = -1 if text is None else self._code(col, text)
+        self.text_seen[j] = True
+
+    def extend(self, other):
+        """Append the rows of another store (rows are not merged: a (player, team) in both appears twice)."""
+        n, m = len(self), len(other)
+        if n + m > self.capacity: self._grow(max(n + m, 2 * self.capacity))
+        self.values[:, n:n + m] = other.values[:, :m]
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            remap = np.array([self._code(col, text) for text in other.categories[col]] + [-1], dtype=np.int16)
+            self.codes[n:n + m, j] = remap[other.codes[:m, j]]  # code -1 picks the trailing -1
+        for k, (player, code) in enumerate(zip(other.players, other.codes[:m, TEXT_INDEX['team']])):
+            self._index[(player, other.categories['team'][code])] = n + k
+        self.players.extend(other.players)
+        self.seen |= other.seen
+        self.text_seen |= other.text_seen
+        return self
+
+    @classmethod
+    def concat(cls, stores):
+        stores = [s for s in stores if s]
+        out = cls(capacity=max(1, sum(len(s) for s in stores)))
+        for store in stores: out.extend(store)
+        return out
+
+    def to_frame(self):
+        """
+        DataFrame of the rows: player, the text columns as categoricals, then the numeric columns as float32 views of
+        the matrix (a copy is only made when some columns were never written and have to be left out).
+        """
+        n = len(self)
+        values = self.values[:, :n] if self.seen.all() else self.values[self.seen, :n]
+        df = pd.DataFrame(values.T, columns=[c for c, s in zip(STORE_COLUMNS, self.seen) if s], copy=False)
+        df.insert(0, 'player', pd.Series(self.players, dtype=object))
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            if self.text_seen[j]: df.insert(int(self.text_seen[:j + 1].sum()), col, pd.Categorical.from_codes(self.codes[:n, j], self.categories[col]))
+        return df
+
+    def to_json(self):
+        """JSON-serializable form (the seen columns' float32 bytes in base64), read back by from_json."""
+        n = len(self)
+        return {
+            'players': self.players,
+            'columns': [c for c, s in zip(STORE_COLUMNS, self.seen) if s],
+            'values': base64.b64encode(np.ascontiguousarray(self.values[self.seen, :n]).tobytes()).decode('ascii'),
+            'categories': {col: self.categories[col] for j, col in enumerate(CATEGORICAL_COLUMNS) if self.text_seen[j]},
+            'codes': {col: self.codes[:n, j].tolist() for j, col in enumerate(CATEGORICAL_COLUMNS) if self.text_seen[j]},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """Store of a to_json() dict, or of a list of row dicts (the form partial outputs and queues had before)."""
+        if isinstance(data, list): return cls.from_rows(data)
+        n = len(data['players'])
+        store = cls(capacity=max(1, n))
+        store.players = list(data['players'])
+        columns = np.array([COLUMN_INDEX[c] for c in data['columns']], dtype=np.intp)
+        store.values[columns, :n] = np.frombuffer(base64.b64decode(data['values']), dtype=np.float32).reshape(len(columns), n)
+        store.seen[columns] = True
+        for col, categories in data['categories'].items():
+            j = TEXT_INDEX[col]
+            store.categories[col] = [sys.intern(text) for text in categories]
+            store._category_codes[col] = {text: code for code, text in enumerate(store.categories[col])}
+            store.codes[:n, j] = data['codes'][col]
+            store.text_seen[j] = True
+        teams = store.categories['team']
+        store._index = {(player, teams[code]): i for i, (player, code) in enumerate(zip(store.players, store.codes[:n, TEXT_INDEX['team']]))}
+        return store
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Store of row dicts with "N/a" for the missing values, merged by (player, team) like the scraper merged them."""
+        store = cls(capacity=max(1, len(rows)))
+        for data in rows:
+            i = store.row(data['player'], data['team'])
+            for col, value in data.items():
+                if col in COLUMN_INDEX: store.set(i, col, np.nan if value in (MISSING, '', None) else float(value))
+                elif col in TEXT_INDEX and col != 'team': store.set_text(i, col, None if value in (MISSING, '', None) else value)
+        return store
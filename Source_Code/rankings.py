@@ -0,0 +1,163 @@
+"""
+Top-k / bottom-k leaderboards for every statistic at once, overall or per group (team, position...).
+
+The statistics are taken as one float matrix; np.partition finds each column's k-th value in a single call and
+only the few rows on the right side of it are ordered, instead of a full nlargest/nsmallest sort per column.
+Ties are broken by row order, as nlargest/nsmallest(keep='first') do, so the leaderboards are the same.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from stat_schema import TEXT_COLUMNS
+
+DIRECTIONS = ('highest', 'lowest')
+# The statistics of top_3.txt (EX2-p1).
+TOP3_STATISTICS = [
+    'Req_Age', 'Pltime_matches_played', 'Pltime_starts', 'Pltime_minutes',
+    'Perf_goals', 'Perf_assists', 'Perf_yellow_cards', 'Perf_red_cards',
+    'Exp_xG', 'Exp_xAG',
+    'Prog_PrgC', 'Prog_PrgP', 'Prog_PrgR',
+    'per90_Gls', 'per90_Ast', 'per90_xG', 'per90_xGA',
+    'GK_GA90', 'GK_Save%', 'GK_CS%', 'GK_PK_Save%',
+    'Shoot_SoT%', 'Shoot_SoT/90', 'Shoot_G/Sh', 'Shoot_Dist',
+    'Pass_Cmp', 'Pass_Cmp%', 'Pass_TotDist', 'Pass_cpt_short', 'Pass_cpt_medium', 'Pass_cpt_long',
+    'Pass_KP', 'Pass_1/3', 'Pass_PPA', 'Pass_CrsPA', 'Pass_PrgP',
+    'GnS_SCA', 'GnS_SCA90', 'GnS_GCA', 'GnS_GCA90',
+    'Defen_Tkl', 'Defen_TklW', 'Defen_Att', 'Defen_Lost', 'Defen_Blocks', 'Defen_Sh', 'Defen_Pass', 'Defen_Int',
+    'Poss_touches', 'Poss_Def_Pen', 'Poss_Def_3rd', 'Poss_Mid_3rd', 'Poss_Att_3rd', 'Poss_Att_Pen',
+    'Poss_Att', 'Poss_Succ%', 'Poss_Tkld%', 'Poss_Carries', 'Poss_PrgDist', 'Poss_PrgC', 'Poss_1/3', 'Poss_CPA',
+    'Poss_Mis', 'Poss_Dis', 'Poss_Rec', 'Poss_PrgR',
+    'Misc_Fls', 'Misc_Fld', 'Misc_Off', 'Misc_Crs', 'Misc_Recov', 'Misc_Won', 'Misc_Lost', 'Misc_Won%',
+]
+
+
+def extreme_rows(values, k, largest=True):
+    """
+    Row positions of the k largest (or smallest) values of every column of a 2-D array, best first, ties in row
+    order. Returns one array of positions per column.
+    """
+    n_rows, n_cols = values.shape
+    if n_rows == 0 or k <= 0: return [np.empty(0, dtype=int) for _ in range(n_cols)]
+    keys = -values if largest else values.copy()
+    valid = ~np.isnan(keys)
+    keys[~valid] = np.inf
+    kth = min(k, n_rows) - 1
+    # The k-th best value of every column; anything better or equal is a candidate.
+    thresholds = np.partition(keys, kth, axis=0)[kth]
+    picked = []
+    for j in range(n_cols):
+        rows = np.flatnonzero(valid[:, j] & (keys[:, j] <= thresholds[j]))
+        rows = rows[np.lexsort((rows, keys[rows, j]))][:k]
+        # Like nlargest/nsmallest, a column with fewer than k values is padded with its NaN rows in row order.
+        if rows.size < k: rows = np.concatenate([rows, np.flatnonzero(~valid[:, j])[:k - rows.size]])
+        picked.append(rows)
+    return picked
+
+
+class Rankings:
+    """Leaderboards in long form: one row per (group, stat, direction, rank)."""
+
+    def __init__(self, frame, stats, k, by=None, label_col='player'):
+        self.frame = frame
+        self.stats = stats
+        self.k = k
+        self.by = by
+        self.label_col = label_col
+        self._boards = None
+
+    def groups(self):
+        return list(dict.fromkeys(self.frame[self.by])) if self.by else [None]
+
+    def leaderboard(self, stat, direction='highest', group=None):
+        """[(player, value), ...] best first."""
+        if self._boards is None:
+            self._boards = {}
+            group_values = self.frame[self.by] if self.by else [None] * len(self.frame)
+            for g, s, d, label, value in zip(group_values, self.frame['stat'], self.frame['direction'], self.frame[self.label_col], self.frame['value']):
+                self._boards.setdefault((g, s, d), []).append((label, value))
+        return self._boards.get((group, stat, direction), [])
+
+    def to_text(self):
+        """The top_3.txt layout, one block per statistic (per group when grouped)."""
+        lines = []
+        for group in self.groups():
+            if self.by: lines.append(f"{self.by}: {group}\n\n")
+            for stat in self.stats:
+                lines.append(f"Statistic: {stat}\n")
+                for direction in DIRECTIONS:
+                    lines.append(f"Top {self.k} {direction.capitalize()}:\n")
+                    lines.extend(f"  {player}: {value}\n" for player, value in self.leaderboard(stat, direction, group))
+                lines.append("\n")
+        return ''.join(lines)
+
+    def write_text(self, path):
+        with open(path, 'w', encoding='utf-8') as f: f.write(self.to_text())
+
+
+def _block_records(values, positions, labels, stats, k, group=None):
+    picked = {direction: extreme_rows(values, k, largest=direction == 'highest') for direction in DIRECTIONS}
+    records = []
+    for j, stat in enumerate(stats):
+        for direction in DIRECTIONS:
+            for rank, row in enumerate(picked[direction][j], 1):
+                records.append((group, stat, direction, rank, labels[positions[row]], values[row, j].item()))
+    return records
+
+
+def rank_stats(df, stats=None, k=3, by=None, split=None, label_col='player'):
+    """
+    Top and bottom k of every statistic, overall or within each value of `by` (e.g. 'team', 'Req_Position').
+    stats: columns to rank (default: every non-text column); names not in df are skipped.
+    split: separator of multi-valued group keys (e.g. ',' for Req_Position "DF,MF"), so such a player is ranked
+        in each of their groups.
+    """
+    stats = [s for s in (stats or [c for c in df.columns if c not in TEXT_COLUMNS]) if s in df.columns]
+    values = np.column_stack([pd.to_numeric(df[s], errors='coerce').to_numpy(dtype='float64') for s in stats]) if stats else np.empty((len(df), 0))
+    labels = df[label_col].to_numpy()
+
+    if by is None:
+        records = _block_records(values, np.arange(len(df)), labels, stats, k)
+    else:
+        keys = df[by].astype(str)
+        if split:
+            parts = keys.str.split(split)
+            positions = np.repeat(np.arange(len(df)), parts.str.len().to_numpy())
+            keys = np.array([p.strip() for ps in parts for p in ps], dtype=object)
+        else:
+            positions, keys = np.arange(len(df)), keys.to_numpy()
+        # One stable sort by group keeps the original row order inside each group for tie-breaking.
+        order = np.argsort(keys, kind='stable')
+        names, starts = np.unique(keys[order], return_index=True)
+        bounds = list(starts) + [len(order)]
+        records = []
+        for name, start, end in zip(names, bounds[:-1], bounds[1:]):
+            block = positions[order[start:end]]
+            records.extend(_block_records(values[block], block, labels, stats, k, group=name))
+
+    frame = pd.DataFrame(records, columns=[by or 'group', 'stat', 'direction', 'rank', label_col, 'value'])
+    if by is None: frame = frame.drop(columns='group')
+    return Rankings(frame, stats, k, by, label_col)
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from player_data import load_results
+
+    parser = argparse.ArgumentParser(prog=prog, description="Top and bottom k players of every statistic (top_3.txt).")
+    parser.add_argument('--input', default=data_path('results.csv'), help="results.csv written by EX1.")
+    parser.add_argument('--output', default=data_path('top_3.txt'))
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--by', default=None, help="Rank within each value of this column (team, Req_Position...).")
+    parser.add_argument('--stats', default=None, help="Comma separated statistics (default: those of EX2-p1).")
+    args = parser.parse_args(argv)
+
+    data = load_results(args.input, float_dtype='float64')
+    stats = args.stats.split(',') if args.stats else TOP3_STATISTICS
+    rank_stats(data, stats, k=args.k, by=args.by, split=',' if args.by == 'Req_Position' else None).write_text(args.output)
+    print(f"Top/bottom {args.k} of {len(stats)} statistics for {len(data)} players written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Instrumentation of a scraping run: a timing span per URL and stage (fetch, page load, table wait, parse, compile,
+assembly...), counters (retries, bytes fetched, rows per table) and the time spent deliberately sleeping, by reason.
+Everything is kept in memory (thread-safe, the scraper's workers share one RunMetrics) and written at the end as a
+JSON report plus a summary table. With profile=True, the code run under profiled() is profiled with cProfile
+(one profiler per thread, merged when the report is written). The spans and counters recorded in another process
+(the page parser processes) are brought in with export() there and merge() here.
+"""
+import collections
+import contextlib
+import cProfile
+import io
+import json
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+
+import pandas as pd
+
+
+class RunMetrics:
+    def __init__(self, profile=False):
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.counters = collections.Counter()
+        self.url_counters = collections.defaultdict(collections.Counter)
+        self.table_rows = collections.Counter()
+        self.sleeps = collections.Counter()
+        self.profile = profile
+        self._profilers = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage, url=None, **fields):
+        """Time the block as one span of `stage`; extra fields (table=..., attempt=...) are kept with it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'stage': stage, 'url': url, 'start': round(start - self.started, 6),
+                      'seconds': time.perf_counter() - start, 'thread': threading.current_thread().name, **fields}
+            with self._lock: self.spans.append(record)
+
+    def export(self):
+        """Spans and counters in picklable form, for merge() into the metrics of another process."""
+        with self._lock:
+            return {'started_at': self.started_at, 'process': multiprocessing.current_process().name, 'spans': list(self.spans),
+                    'counters': dict(self.counters), 'url_counters': {url: dict(c) for url, c in self.url_counters.items()},
+                    'table_rows': dict(self.table_rows)}
+
+    def merge(self, data):
+        """Add an export() of another RunMetrics; its spans are placed on this run's clock and named after their process."""
+        offset = data['started_at'] - self.started_at
+        spans = [{**span, 'start': round(span['start'] + offset, 6), 'thread': f"{data['process']}/{span['thread']}"} for span in data['spans']]
+        with self._lock:
+            self.spans.extend(spans)
+            self.counters.update(data['counters'])
+            for url, counters in data['url_counters'].items(): self.url_counters[url].update(counters)
+            self.table_rows.update(data['table_rows'])
+
+    def count(self, name, value=1, url=None):
+        with self._lock:
+            self.counters[name] += value
+            if url: self.url_counters[url][name] += value
+
+    def rows(self, table, n, url=None):
+        with self._lock: self.table_rows[table] += n
+        self.count('rows', n, url)
+
+    def slept(self, seconds, reason):
+        if seconds <= 0: return
+        with self._lock:
+            self.sleeps[reason] += seconds
+            self.counters['sleep_seconds'] += seconds
+
+    @contextlib.contextmanager
+    def profiled(self):
+        if not self.profile:
+            yield; return
+        profiler = getattr(self._local, 'profiler', None)
+        if profiler is None:
+            profiler = self._local.profiler = cProfile.Profile()
+            with self._lock: self._profilers.append(profiler)
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def profile_stats(self):
+        if not self._profilers: return None
+        stats = pstats.Stats(self._profilers[0])
+        for profiler in self._profilers[1:]: stats.add(profiler)
+        return stats
+
+    def summary(self):
+        """One row per stage: calls, total/mean/max seconds and share of the run's wall-clock."""
+        if not self.spans: return pd.DataFrame(columns=['calls', 'total_s', 'mean_ms', 'max_ms', 'share'])
+        spans = pd.DataFrame(self.spans)
+        grouped = spans.groupby('stage', sort=False)['seconds']
+        table = pd.DataFrame({'calls': grouped.size(), 'total_s': grouped.sum(), 'mean_ms': grouped.mean() * 1000,
+                              'max_ms': grouped.max() * 1000})
+        table['share'] = table['total_s'] / max(time.perf_counter() - self.started, 1e-9)
+        return table.sort_values('total_s', ascending=False)
+
+    def format_summary(self):
+        table = self.summary()
+        lines = [f"Run metrics ({time.perf_counter() - self.started:.1f}s wall-clock; stage shares overlap with workers > 1):",
+                 table.round({'total_s': 2, 'mean_ms': 1, 'max_ms': 1, 'share': 3}).to_string() if not table.empty else "  no spans"]
+        counters = {k: v for k, v in self.counters.items() if k != 'sleep_seconds'}
+        if counters: lines.append("Counters: " + ', '.join(f"{k}={v}" for k, v in sorted(counters.items())))
+        if self.sleeps:
+            lines.append(f"Sleeping: {self.counters['sleep_seconds']:.1f}s (" +
+                         ', '.join(f"{k} {v:.1f}s" for k, v in self.sleeps.most_common()) + ")")
+        if self.table_rows: lines.append("Rows per table: " + ', '.join(f"{k}={v}" for k, v in self.table_rows.items()))
+        return '\n'.join(lines)
+
+    def report(self, top_functions=25):
+        summary = self.summary()
+        report = {'wall_seconds': time.perf_counter() - self.started,
+                  'stages': summary.reset_index().rename(columns={'index': 'stage'}).to_dict('records'),
+                  'counters': dict(self.counters), 'sleep_seconds_by_reason': dict(self.sleeps),
+                  'rows_per_table': dict(self.table_rows), 'per_url': {url: dict(c) for url, c in self.url_counters.items()},
+                  'spans': self.spans}
+        stats = self.profile_stats()
+        if stats is not None:
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(top_functions)
+            report['profile'] = out.getvalue()
+        return report
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f: json.dump(self.report(), f, indent=1, default=str)
+        stats = self.profile_stats()
+        if stats is not None: stats.dump_stats(os.path.splitext(path)[0] + '.prof')
+        return path
@@ -0,0 +1,238 @@
+"""
+"Who plays like player X?": nearest neighbours of players in EX3's standardized (optionally PCA-reduced) stat
+space, over one results table or many (several seasons / leagues), persisted with joblib.
+
+    python similarity_index.py build [results.csv ...] [--partitions OUT_DIR] [--components 0.9]
+    python similarity_index.py query "Bukayo Saka" [--k 10] [--position FW] [--team Arsenal] [--min-minutes 900]
+    python similarity_index.py refresh [results.csv ...] [--partitions OUT_DIR]
+
+The scaler and the PCA are fitted by build. refresh keeps the vectors of the players whose stats did not change
+(compared by a hash of their row), transforms only the new and changed ones with the fitted scaler / PCA and drops the
+players no longer in the tables. The search is exact: the float32 vectors and their squared norms are kept, so the
+distances of a batch of queries to every player (or to the players passing the filters, selected first) are one
+matrix product, a few milliseconds per query for 100k players.
+"""
+import argparse
+import collections
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+from player_data import stat_features
+
+# Columns telling two rows of the same player apart (those present in the tables), and the ones shown with results.
+KEY_COLUMNS = ['player', 'team', 'competition', 'season', 'source']
+INFO_COLUMNS = ['player', 'team', 'Req_Position', 'Pltime_minutes', 'competition', 'season']
+# Queries whose distances to every indexed player are computed in one matrix product.
+SEARCH_CHUNK = 64
+
+
+def row_hashes(X):
+    return pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+
+class SimilarityIndex:
+    def __init__(self, n_components=None, random_state=0):
+        """n_components: PCA components (an int, or the share of variance to keep, e.g. 0.9); None keeps every stat."""
+        self.n_components = n_components
+        self.random_state = random_state
+
+    def _split(self, df):
+        X = stat_features(df)
+        info = df.loc[X.index, [c for c in dict.fromkeys(KEY_COLUMNS + INFO_COLUMNS) if c in df.columns]].reset_index(drop=True)
+        for col in info.columns:
+            if col != 'Pltime_minutes': info[col] = info[col].astype(object)
+        return info, X.reset_index(drop=True)
+
+    def _transform(self, X):
+        Z = self.scaler.transform(X.reindex(columns=self.columns, fill_value=0))
+        return np.ascontiguousarray(self.pca.transform(Z) if self.pca is not None else Z, dtype=np.float32)
+
+    def fit(self, df):
+        """Fit the scaler (and PCA) on the players of df and index them."""
+        info, X = self._split(df)
+        self.columns = list(X.columns)
+        self.scaler = StandardScaler().fit(X)
+        self.pca = None
+        if self.n_components: self.pca = PCA(self.n_components, svd_solver='full', random_state=self.random_state).fit(self.scaler.transform(X))
+        self._set_rows(info, self._transform(X), row_hashes(X))
+        return self
+
+    def _set_rows(self, info, vectors, hashes):
+        self.info, self.vectors, self.hashes = info, vectors, hashes
+        self.key_columns = [c for c in KEY_COLUMNS if c in info.columns]
+        self._build()
+
+    def _build(self):
+        self._sq_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self._by_key = {key: i for i, key in enumerate(self.info[self.key_columns].itertuples(index=False, name=None))}
+        by_name = collections.defaultdict(list)
+        for i, name in enumerate(self.info['player'].astype(str)): by_name[name.strip().lower()].append(i)
+        self._by_name = dict(by_name)
+        # Filter lookups: position -> rows playing it, and the lower-cased teams.
+        positions = self.info['Req_Position'].fillna('').astype(str) if 'Req_Position' in self.info.columns else pd.Series('', index=self.info.index)
+        codes, values = pd.factorize(positions)
+        position_rows = collections.defaultdict(lambda: np.zeros(len(self.info), dtype=bool))
+        for code, value in enumerate(values):
+            for position in filter(None, value.upper().split(',')): position_rows[position] |= codes == code
+        self._position_rows = dict(position_rows)
+        self._teams = self.info['team'].astype(str).str.lower().to_numpy()
+        self._minutes = self.info['Pltime_minutes'].fillna(0).to_numpy() if 'Pltime_minutes' in self.info.columns else np.zeros(len(self.info))
+
+    def refresh(self, df):
+        """
+        Bring the index up to date with df without refitting the scaler / PCA: unchanged players keep their vectors,
+        new and changed ones are transformed, missing ones dropped. Returns the counts of each.
+        """
+        info, X = self._split(df)
+        if [c for c in KEY_COLUMNS if c in info.columns] != self.key_columns:
+            raise ValueError(f"The tables have key columns {list(info.columns)}, the index {self.key_columns}; build it again.")
+        hashes = row_hashes(X.reindex(columns=self.columns, fill_value=0))
+        old = np.array([self._by_key.get(key, -1) for key in info[self.key_columns].itertuples(index=False, name=None)], dtype=np.intp)
+        kept = (old >= 0) & (self.hashes[np.maximum(old, 0)] == hashes)
+        vectors = np.empty((len(info), self.vectors.shape[1]), dtype=np.float32)
+        vectors[kept] = self.vectors[old[kept]]
+        if not kept.all(): vectors[~kept] = self._transform(X[~kept])
+        counts = {'kept': int(kept.sum()), 'updated': int(((old >= 0) & ~kept).sum()), 'added': int((old < 0).sum()),
+                  'removed': len(self.info) - int((old >= 0).sum())}
+        self._set_rows(info, vectors, hashes)
+        return counts
+
+    def lookup(self, name, team=None):
+        """Rows of the players called name (case-insensitive), optionally of one team only."""
+        rows = self._by_name.get(str(name).strip().lower(), [])
+        if team is not None: rows = [i for i in rows if str(self.info.at[i, 'team']).lower() == str(team).lower()]
+        return rows
+
+    def filter_mask(self, position=None, team=None, min_minutes=None, competition=None, season=None):
+        """Rows passing the filters (None when there is no filter). position matches any of a row's positions ('MF' in 'DF,MF')."""
+        mask = np.ones(len(self.info), dtype=bool)
+        if position: mask &= self._position_rows.get(position.upper(), False)
+        if team: mask &= self._teams == team.lower()
+        if min_minutes: mask &= self._minutes >= min_minutes
+        for col, value in (('competition', competition), ('season', season)):
+            if value and col in self.info.columns: mask &= (self.info[col] == value).to_numpy()
+        return None if mask.all() else mask
+
+    def _search(self, rows, k, mask):
+        """(distances, indices) of the k nearest rows passing mask for each of rows, the rows themselves excluded."""
+        rows = np.asarray(rows, dtype=np.intp)
+        candidates = np.arange(len(self.vectors)) if mask is None else np.flatnonzero(mask)
+        vectors = self.vectors if mask is None else self.vectors[candidates]
+        sq_norms = self._sq_norms if mask is None else self._sq_norms[candidates]
+        distances, indices = [], []
+        for start in range(0, len(rows), SEARCH_CHUNK):
+            chunk = rows[start:start + SEARCH_CHUNK]
+            queries = self.vectors[chunk]
+            # |v - q|^2 = |v|^2 - 2 v.q + |q|^2, one matrix product for the whole chunk.
+            dist = queries @ vectors.T
+            dist *= -2
+            dist += sq_norms[None, :]
+            dist += self._sq_norms[chunk][:, None]
+            # One more than k, in case the query player itself is among them.
+            kk = min(k + 1, len(candidates))
+            if kk == 0: distances += [np.empty(0)] * len(chunk); indices += [np.empty(0, dtype=np.intp)] * len(chunk); continue
+            nearest = np.argpartition(dist, kk - 1, axis=1)[:, :kk]
+            nearest_dist = np.take_along_axis(dist, nearest, axis=1)
+            order = np.argsort(nearest_dist, axis=1)
+            nearest, nearest_dist = np.take_along_axis(nearest, order, axis=1), np.take_along_axis(nearest_dist, order, axis=1)
+            for row, d, i in zip(chunk, nearest_dist, nearest):
+                others = candidates[i] != row
+                distances.append(np.sqrt(np.maximum(d[others][:k], 0))); indices.append(candidates[i][others][:k])
+        return distances, indices
+
+    def neighbors(self, rows, k=10, **filters):
+        """The k most similar players of each of rows (indices into info), as one frame with the query player first."""
+        if not len(rows): return pd.DataFrame()
+        distances, indices = self._search(list(rows), k, self.filter_mask(**filters))
+        counts = [len(idx) for idx in indices]
+        query_rows = np.repeat(rows, counts)
+        frame = self.info.iloc[np.concatenate(indices)].reset_index(drop=True)
+        frame.insert(0, 'query_team', self.info['team'].to_numpy()[query_rows])
+        frame.insert(0, 'query', self.info['player'].to_numpy()[query_rows])
+        frame['rank'] = np.concatenate([np.arange(1, n + 1) for n in counts])
+        frame['distance'] = np.concatenate(distances)
+        return frame
+
+    def query(self, name, k=10, of_team=None, **filters):
+        """Players most similar to name (every row of that name, or its row of of_team); an empty frame if unknown."""
+        return self.neighbors(self.lookup(name, of_team), k, **filters)
+
+    def query_many(self, names, k=10, **filters):
+        """query of several players in one search (unknown names are skipped)."""
+        return self.neighbors([i for name in names for i in self.lookup(name)], k, **filters)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        state = {key: value for key, value in self.__dict__.items() if not key.startswith('_')}
+        joblib.dump({'index': state, 'sklearn_version': sklearn.__version__}, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """The saved index; the lookups are rebuilt from the stored rows."""
+        bundle = joblib.load(path)
+        index = cls.__new__(cls)
+        index.__dict__.update(bundle['index'])
+        index._build()
+        return index
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from player_data import load_player_set
+
+    parser = argparse.ArgumentParser(prog=prog, description="Nearest-neighbour search of players with similar stats (EX3 features).")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('build', 'refresh', 'query'):
+        p = sub.add_parser(name)
+        p.add_argument('--index', default=data_path('similarity_index.joblib'))
+    for p in (sub.choices['build'], sub.choices['refresh']):
+        p.add_argument('results', nargs='*', help="results.csv files (default: the data directory's, unless --partitions is given).")
+        p.add_argument('--partitions', default=None, help="Output directory of a crawl queue: every competition/season it wrote.")
+    sub.choices['build'].add_argument('--components', type=float, default=None,
+                                      help="PCA components (>= 1) or share of variance to keep (< 1); default: no PCA.")
+    query_p = sub.choices['query']
+    query_p.add_argument('player', nargs='+')
+    query_p.add_argument('--k', type=int, default=10)
+    query_p.add_argument('--of-team', default=None, help="Only the query player's row of this team.")
+    query_p.add_argument('--position', default=None)
+    query_p.add_argument('--team', default=None)
+    query_p.add_argument('--min-minutes', type=float, default=None)
+    query_p.add_argument('--competition', default=None)
+    query_p.add_argument('--season', default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command in ('build', 'refresh'):
+        paths = args.results or ([] if args.partitions else [data_path('results.csv')])
+        df = load_player_set(paths, args.partitions)
+        if args.command == 'build':
+            components = args.components if args.components is None or args.components < 1 else int(args.components)
+            index = SimilarityIndex(components).fit(df)
+            print(f"Indexed {len(index.info)} players, {index.vectors.shape[1]} dimensions, in {time.perf_counter() - start:.2f}s")
+        else:
+            index = SimilarityIndex.load(args.index)
+            counts = index.refresh(df)
+            print(f"Refreshed in {time.perf_counter() - start:.2f}s: " + ', '.join(f"{n} {what}" for what, n in counts.items()))
+        index.save(args.index)
+        return
+
+    index = SimilarityIndex.load(args.index)
+    loaded = time.perf_counter()
+    filters = {'position': args.position, 'team': args.team, 'min_minutes': args.min_minutes, 'competition': args.competition, 'season': args.season}
+    result = index.neighbors(index.lookup(args.player[0], args.of_team), args.k, **filters) if len(args.player) == 1 else \
+        index.query_many(args.player, args.k, **filters)
+    if result.empty: print(f"No player called {' / '.join(args.player)} in the index."); return 1
+    print(result.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\nIndex loaded in {loaded - start:.2f}s, query answered in {(time.perf_counter() - loaded) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
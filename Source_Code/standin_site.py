@@ -0,0 +1,419 @@
+"""
+Local stand-in for fbref.com: generates fbref-shaped league and squad pages and serves them over HTTP,
+so the scraper can be exercised and timed without touching the real site. Optionally also serves
+footballtransfers-shaped player value pages for EX4-p1-scrape_data. ServerLimits makes it rate limit (429 with
+Retry-After) and fail like a loaded site, to exercise the crawl scheduler.
+"""
+import collections
+import hashlib
+import html
+import logging
+import random
+import re
+import tempfile
+import threading
+import time
+import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from EX1 import FootballDataScraper, COMPETITIONS, league_path, table_identifiers
+
+logger = logging.getLogger()
+
+TEAM_NAMES = [
+    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Chelsea', 'Crystal Palace', 'Everton',
+    'Fulham', 'Ipswich Town', 'Leicester City', 'Liverpool', 'Manchester City', 'Manchester Utd',
+    'Newcastle Utd', "Nott'ham Forest", 'Southampton', 'Tottenham', 'West Ham', 'Wolves',
+]
+NATIONS = ['eng ENG', 'fr FRA', 'es ESP', 'br BRA', 'pt POR', 'de GER', 'nl NED', 'ar ARG', 'be BEL', 'no NOR']
+POSITIONS = ['GK', 'DF', 'MF', 'FW', 'DF,MF', 'MF,FW', 'FW,MF']
+FIRST_NAMES = ['Aaron', 'Ben', 'Callum', 'Dan', 'Eddie', 'Fabio', 'Gabriel', 'Harry', 'Ivan', 'Jack', 'Kai', 'Luis',
+               'Mason', 'Nico', 'Ollie', 'Pedro', 'Rico', 'Sam', 'Tom', 'Victor', 'Will', 'Yves', 'Zeki']
+LAST_NAMES = ['Adams', 'Barnes', 'Costa', 'Dias', 'Evans', 'Fernandes', 'Gomez', 'Hughes', 'Iwobi', 'James', 'Kane',
+              'Lopes', 'Mitchell', 'Nunez', 'Owen', 'Palmer', 'Quansah', 'Rice', 'Saka', 'Tielemans', 'Walker']
+PCT_HINTS = ('pct', 'per90', 'per_shot', 'distance')
+
+
+def team_slug(team):
+    return re.sub(r'[^A-Za-z0-9]+', '-', team).strip('-')
+
+
+def _stat_value(attr, rng):
+    if rng.random() < 0.04: return ''
+    if any(h in attr for h in PCT_HINTS): return f"{rng.uniform(0, 100):.1f}" if 'pct' in attr else f"{rng.uniform(0, 3):.2f}"
+    if attr == 'passes_total_distance': return f"{rng.randint(0, 30000):,}"
+    if attr == 'minutes': return f"{rng.randint(0, 3420):,}"
+    return str(rng.randint(0, 120))
+
+
+def make_players(team, n_players, rng):
+    players = []
+    for i in range(n_players):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {team_slug(team)[:3]}{i}"
+        players.append({'player': name, 'nationality': rng.choice(NATIONS), 'position': rng.choice(POSITIONS),
+                         'age': f"{rng.randint(17, 37)}-{rng.randint(0, 364):03d}"})
+    return players
+
+
+def _table_attrs(category):
+    groups = FootballDataScraper.TABLE_CATEGORY_TO_STATS_GROUPS[category]
+    attrs = []
+    for group in groups:
+        if group == 'basic': attrs += ['nationality', 'position', 'age']; continue
+        for defs in FootballDataScraper.STAT_DEFINITIONS[group].values():
+            if defs['attr'] not in attrs: attrs.append(defs['attr'])
+    return attrs
+
+
+def render_stat_table(category, table_id, players, rng):
+    attrs = _table_attrs(category)
+    head = ''.join(f'<th data-stat="{a}">{a}</th>' for a in ['player'] + attrs)
+    rows = []
+    for i, p in enumerate(players):
+        if category == 'keeper' and p['position'] != 'GK': continue
+        if i and i % 12 == 0: rows.append(f'<tr class="thead">{head}</tr>')
+        cells = ''.join(f'<td data-stat="{a}">{html.escape(p[a] if a in p else _stat_value(a, rng))}</td>' for a in attrs)
+        rows.append(f'<tr><th data-stat="player" scope="row"><a href="/en/players/x/{team_slug(p["player"])}">'
+                    f'{html.escape(p["player"])}</a></th>{cells}</tr>')
+    return (f'<table class="stats_table" id="{table_id}"><thead><tr>{head}</tr></thead><tbody>{"".join(rows)}</tbody>'
+            f'<tfoot><tr><th data-stat="player">Squad Total</th></tr></tfoot></table>')
+
+
+# fbref ships every table except the first one inside an HTML comment and uncomments it with JS.
+UNCOMMENT_JS = """<script>
+document.querySelectorAll('div.placeholder').forEach(function (d) {
+  d.childNodes.forEach(function (n) { if (n.nodeType === 8) { d.innerHTML = n.data; } });
+});
+</script>"""
+
+
+def render_team_page(team, players, seed=0, season='2024-2025', table_ids=None, competition_name='Premier League'):
+    rng = random.Random(f"{seed}-{team}")
+    blocks = []
+    for i, (category, table_id) in enumerate((table_ids or FootballDataScraper.TABLE_IDENTIFIERS_FBREF).items()):
+        table = render_stat_table(category, table_id, players, rng)
+        blocks.append(f'<div class="table_wrapper" id="all_{table_id}">' +
+                      (table if i == 0 else f'<div class="placeholder"><!--\n{table}\n--></div>') + '</div>')
+    return (f'<html><head><title>{html.escape(team)} Stats, {competition_name} | FBref.com</title></head><body>'
+            f'<h1><span>{season}</span> <span>{html.escape(team)} Stats</span></h1>{"".join(blocks)}'
+            f'{UNCOMMENT_JS}</body></html>')
+
+
+def render_league_page(teams, season='2024-2025', team_paths=None, competition_name='Premier League'):
+    team_paths = team_paths or [f'/en/squads/{i:08x}/{team_slug(t)}-Stats' for i, t in enumerate(teams)]
+    rows = ''.join(f'<tr><th data-stat="rank">{i + 1}</th><td data-stat="team"><a href="{path}">{html.escape(t)}</a></td></tr>'
+                   for i, (t, path) in enumerate(zip(teams, team_paths)))
+    return (f'<html><head><title>{season} {competition_name} Stats | FBref.com</title></head><body>'
+            f'<table class="stats_table" id="results{season}91_overall"><tbody>{rows}</tbody></table>'
+            f'<table id="stats_squads_standard_for"><tbody></tbody></table></body></html>')
+
+
+TRANSFERS_PATH = '/en/players/uk-premier-league'
+
+
+def _etv_text(rng):
+    value = rng.choice([rng.uniform(0.1, 0.99), rng.uniform(1, 200), rng.uniform(1, 200)])
+    return f"€{value * 1000:.0f}k" if value < 1 else f"€{value:.1f}M"
+
+
+def render_transfers_page(rows, page):
+    """footballtransfers-shaped player list: name in td.td-player span.d-none, ETV in the last cell of each row."""
+    body = ''.join(
+        f'<tr><td class="td-rank">{(page - 1) * len(rows) + i + 1}</td>'
+        f'<td class="td-player"><div class="player-info"><a href="/en/players/{team_slug(name).lower()}">'
+        f'<span class="d-none">{html.escape(name)}</span><span class="d-md-none">{html.escape(name.split()[-1])}</span></a></div></td>'
+        f'<td class="td-team"><span>{html.escape(team)}</span></td><td class="td-age">{age}</td>'
+        f'<td class="text-center"><span class="player-tag">{etv}</span></td></tr>'
+        for i, (name, team, age, etv) in enumerate(rows))
+    return (f'<html><head><title>Premier League players | FootballTransfers</title></head><body>'
+            f'<div class="table-responsive"><table class="table"><thead><tr><th>#</th><th>Player</th><th>Team</th>'
+            f'<th>Age</th><th>ETV</th></tr></thead><tbody id="player-table-body">{body}</tbody></table></div>'
+            f'<nav class="pagination"><a href="{TRANSFERS_PATH}/{page + 1}">Next</a></nav></body></html>')
+
+
+class StandinSite:
+    """
+    In-memory fbref-shaped site: league page at /en/comps/9/Premier-League-Stats plus one page per squad.
+    partitions: (competition, season) pairs to serve instead, each with its league page at EX1.league_path(), its
+        squads under /en/squads/<id>/<season>/ and the competition's stat table ids (None = current Premier League).
+    transfer_pages: also serve that many footballtransfers player value pages at TRANSFERS_PATH, /2, /3...
+    """
+
+    def __init__(self, n_teams=20, players_per_team=25, seed=0, transfer_pages=0, players_per_transfer_page=25, partitions=None):
+        rng = random.Random(seed)
+        base = len(TEAM_NAMES)
+        self.teams = [TEAM_NAMES[i % base] + (f" {i // base + 1}" if i >= base else '') for i in range(n_teams)]
+        self.pages = {}
+        for p, (competition, season) in enumerate(partitions or [('premier-league', None)]):
+            name = COMPETITIONS[competition][1].replace('-', ' ')
+            paths = [f'/en/squads/{p * n_teams + i:08x}/' + (f'{season}/' if season else '') + f'{team_slug(team)}-Stats'
+                     for i, team in enumerate(self.teams)]
+            self.pages[league_path(competition, season)] = render_league_page(self.teams, season or '2024-2025', paths, name)
+            for team, path in zip(self.teams, paths):
+                self.pages[path] = render_team_page(team, make_players(team, players_per_team, rng), seed, season or '2024-2025',
+                                                    table_identifiers(competition), name)
+        self.transfer_rows = []
+        for page in range(1, transfer_pages + 1):
+            rows = [(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}-{page}{i}", rng.choice(self.teams or TEAM_NAMES),
+                     rng.randint(17, 37), _etv_text(rng)) for i in range(players_per_transfer_page)]
+            self.transfer_rows.extend(rows)
+            self.pages[TRANSFERS_PATH if page == 1 else f'{TRANSFERS_PATH}/{page}'] = render_transfers_page(rows, page)
+
+
+class ServerLimits:
+    """
+    Throttling of the stand-in, as a real site under load does it: requests beyond `rate` per second (bursts of
+    `burst`) are answered 429 with a Retry-After of `retry_after` seconds; error_rate: share of the other requests
+    answered 500; down: path prefix (e.g. '/en/squads/') whose requests all fail with 500.
+    """
+
+    def __init__(self, rate=None, burst=1, retry_after=1, error_rate=0.0, down=None, seed=0):
+        self.rate, self.burst, self.retry_after = rate, burst, retry_after
+        self.error_rate, self.down = error_rate, down
+        self.rng = random.Random(seed)
+        self.tokens, self.updated = float(burst), time.monotonic()
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+
+    def check(self, path):
+        """(status, Retry-After or None) for a rejected request, None when it is served."""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.down and path.startswith(self.down):
+                self.stats['errors'] += 1; return 500, None
+            if self.rate:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens < 1:
+                    self.stats['throttled'] += 1; return 429, self.retry_after
+                self.tokens -= 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats['errors'] += 1; return 500, None
+            self.stats['served'] += 1
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        rejected = self.server.limits.check(path) if self.server.limits else None
+        if rejected:
+            status, retry_after = rejected
+            self.send_response(status)
+            if retry_after is not None: self.send_header('Retry-After', str(retry_after))
+            self.send_header('Content-Length', '0'); self.end_headers(); return
+        body = self.server.site.pages.get(path)
+        if self.server.latency: time.sleep(self.server.latency)
+        if body is None:
+            self.send_response(404); self.send_header('Content-Length', '0'); self.end_headers(); return
+        data = body.encode('utf-8')
+        etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:  # conditional GET of an unchanged page
+            self.send_response(304); self.send_header('ETag', etag); self.send_header('Content-Length', '0'); self.end_headers(); return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        logger.debug("standin: " + fmt % args)
+
+
+class StandinServer:
+    """Serves a StandinSite on 127.0.0.1 from a background thread. Use as a context manager."""
+
+    def __init__(self, site=None, latency=0.0, port=0, limits=None):
+        """limits: optional ServerLimits (rate limiting with 429 / Retry-After, errors, a failing section)."""
+        self.site = site or StandinSite()
+        self.limits = limits
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.site, self.httpd.latency, self.httpd.limits = self.site, latency, limits
+        self.thread = None
+
+    @property
+    def root_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def league_url(self):
+        return self.root_url + '/en/comps/9/Premier-League-Stats'
+
+    @property
+    def transfers_url(self):
+        return self.root_url + TRANSFERS_PATH
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown(); self.httpd.server_close()
+
+
+def run_pool_benchmark(pool_sizes=(1, 2, 4, 8), n_teams=20, latency=0.2, delay_scale=0.1, max_rps=None, **scraper_kwargs):
+    """Crawl the stand-in with each pool size and report wall-clock and speedup over the first size."""
+    results = []
+    with StandinServer(StandinSite(n_teams=n_teams), latency=latency) as server, tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for size in pool_sizes:
+            scraper = FootballDataScraper(workers=size, max_rps=max_rps, league_url=server.league_url, root_url=server.root_url,
+                                          output_path=os.path.join(tmp, f'results_{size}.csv'), delay_scale=delay_scale, **scraper_kwargs)
+            start = time.perf_counter()
+            df = scraper.execute_scraping()
+            elapsed = time.perf_counter() - start
+            if reference is None: reference = df
+            same = df is not None and reference is not None and df.equals(reference)
+            results.append({'workers': size, 'seconds': round(elapsed, 3), 'rows': 0 if df is None else len(df), 'identical': same})
+    base = results[0]['seconds'] if results else None
+    for r in results: r['speedup'] = round(base / r['seconds'], 2) if r['seconds'] else None
+    return results
+
+
+def run_throttle_benchmark(n_teams=10, server_rate=2.0, retry_after=1, workers=2, latency=0.02):
+    """
+    Crawl (http backend) a stand-in that allows server_rate requests/s and answers 429 + Retry-After beyond it:
+    unpaced, paced at the server's rate, and starting at twice that rate (the scheduler halves it when the 429s repeat).
+    A last run has every squad page failing, to show the circuit breaker giving up on the host.
+    Returns per run the wall-clock, the requests the server saw (throttled, errors) and whether the rows match an
+    unthrottled crawl.
+    """
+    site = StandinSite(n_teams=n_teams)
+    runs = [('unthrottled reference', {}, {}),
+            ('unpaced', {'delay_scale': 0}, {'rate': server_rate, 'retry_after': retry_after}),
+            ('paced at server rate', {'max_rps': server_rate}, {'rate': server_rate, 'retry_after': retry_after}),
+            ('adaptive from 2x rate', {'max_rps': 2 * server_rate}, {'rate': server_rate, 'retry_after': retry_after}),
+            ('squad pages down', {'delay_scale': 0.05, 'max_rps': 50}, {'down': '/en/squads/'})]
+    results, reference = [], None
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, scraper_kwargs, limit_kwargs in runs:
+            limits = ServerLimits(**limit_kwargs)
+            with StandinServer(site, latency=latency, limits=limits) as server:
+                kwargs = {'delay_scale': 0, **scraper_kwargs}
+                scraper = FootballDataScraper(workers=workers, backend='http', league_url=server.league_url, root_url=server.root_url,
+                                              output_path=os.path.join(tmp, f'results_{len(results)}.csv'), **kwargs)
+                start = time.perf_counter()
+                df = scraper.execute_scraping(resume=False)
+                elapsed = time.perf_counter() - start
+            if reference is None: reference = df
+            results.append({'run': label, 'seconds': round(elapsed, 2), 'requests': limits.stats['requests'],
+                            'throttled': limits.stats['throttled'], 'errors': limits.stats['errors'],
+                            'circuit_rejections': scraper.metrics.counters['circuit_rejections'],
+                            'rows': 0 if df is None else len(df), 'identical': df is not None and df.equals(reference)})
+    return results
+
+
+def run_pipeline_benchmark(parse_workers=(0, 2), n_teams=20, latency=0.2, workers=1):
+    """
+    Crawl the stand-in (http backend, no pacing) with each number of parser processes, then replay the same pages
+    offline from the page cache the first crawl filled: wall-clock, the time spent fetching and whether the rows match
+    the first run. With parser processes, a crawl should take about its fetch time; a replay scales with the cores.
+    """
+    from page_cache import PageCache
+    results, reference = [], None
+    with StandinServer(StandinSite(n_teams=n_teams), latency=latency) as server, tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'page_cache')
+        runs = [('crawl', n, False) for n in parse_workers] + [('offline replay', n, True) for n in parse_workers]
+        for i, (label, n, offline) in enumerate(runs):
+            scraper = FootballDataScraper(workers=workers, backend='http', league_url=server.league_url, root_url=server.root_url,
+                                          output_path=os.path.join(tmp, f'results_{i}.csv'), delay_scale=0, parse_workers=n,
+                                          cache=PageCache(cache_dir, ttl=None if offline else 0, max_bytes=None), offline=offline)
+            start = time.perf_counter()
+            df = scraper.execute_scraping(resume=False)
+            elapsed = time.perf_counter() - start
+            if reference is None: reference = df
+            fetch = sum(span['seconds'] for span in scraper.metrics.spans if span['stage'] in ('fetch', 'cache_lookup'))
+            results.append({'run': label, 'parse_workers': n, 'seconds': round(elapsed, 2), 'fetch_seconds': round(fetch, 2),
+                            'rows': 0 if df is None else len(df), 'identical': df is not None and df.equals(reference)})
+    return results
+
+
+def process_tree_rss_kb(pid=None):
+    """Resident memory (kB) of a process plus all its descendants, e.g. the scraper and its Chrome children (Linux)."""
+    pid = pid or os.getpid()
+    parents, rss = {}, {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit(): continue
+        try:
+            with open(f'/proc/{entry}/status') as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line)
+            parents[int(entry)] = int(fields['PPid'])
+            rss[int(entry)] = int(fields.get('VmRSS', '0 kB').split()[0])
+        except (OSError, KeyError, ValueError): continue
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(child for child, parent in parents.items() if parent == current)
+    return total
+
+
+def compare_backends(backends=('http', 'browser'), n_teams=10, latency=0.05):
+    """Fetch and locate the stat tables of every stand-in squad page with each backend; report latency and RSS."""
+    import statistics
+    results = []
+    with StandinServer(StandinSite(n_teams=n_teams), latency=latency) as server:
+        urls = [server.root_url + path for path in server.site.pages if '/squads/' in path]
+        for backend in backends:
+            rss_before = process_tree_rss_kb()
+            scraper = FootballDataScraper(backend=backend, league_url=server.league_url, root_url=server.root_url, delay_scale=0)
+            timings, tables = [], 0
+            try:
+                for url in urls:
+                    start = time.perf_counter()
+                    page = scraper.fetch_page_content(url)
+                    tables += len(scraper.locate_stat_tables(page)) if page else 0
+                    timings.append(time.perf_counter() - start)
+                rss_peak = process_tree_rss_kb()
+            finally:
+                scraper.close()
+            results.append({'backend': backend, 'pages': len(urls), 'tables': tables,
+                            'median_ms': round(statistics.median(timings) * 1000, 1),
+                            'max_ms': round(max(timings) * 1000, 1),
+                            'rss_mb': round(rss_peak / 1024, 1), 'rss_delta_mb': round((rss_peak - rss_before) / 1024, 1)})
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--compare-backends', action='store_true', help="Compare per-page latency and RSS of the fetch backends.")
+    parser.add_argument('--throttle-benchmark', action='store_true', help="Crawl a rate-limited stand-in with the crawl scheduler.")
+    parser.add_argument('--pipeline-benchmark', action='store_true', help="Crawl and replay with and without parser processes.")
+    parser.add_argument('--parse-workers', default='0,2', help="Comma separated parser process counts of the pipeline benchmark.")
+    parser.add_argument('--backend', choices=['browser', 'http'], default='browser', help="Backend used by the pool benchmark.")
+    parser.add_argument('--pool-sizes', default='1,2,4,8', help="Comma separated worker counts to benchmark.")
+    parser.add_argument('--teams', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2, help="Simulated server latency per request (s).")
+    parser.add_argument('--delay-scale', type=float, default=0.1, help="Multiplier on the scraper politeness sleeps.")
+    parser.add_argument('--max-rps', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.throttle_benchmark:
+        for row in run_throttle_benchmark(n_teams=args.teams, latency=args.latency):
+            print(f"{row['run']:>22}: {row['seconds']:>7.2f}s  requests={row['requests']:<4} 429s={row['throttled']:<4} "
+                  f"errors={row['errors']:<4} skipped={row['circuit_rejections']:<4} rows={row['rows']} identical={row['identical']}")
+        raise SystemExit(0)
+
+    if args.pipeline_benchmark:
+        counts = [int(x) for x in args.parse_workers.split(',') if x]
+        for row in run_pipeline_benchmark(counts, n_teams=args.teams, latency=args.latency):
+            print(f"{row['run']:>14}, parse_workers={row['parse_workers']:<2}: {row['seconds']:>7.2f}s  fetching {row['fetch_seconds']:>6.2f}s  "
+                  f"rows={row['rows']} identical={row['identical']}")
+        raise SystemExit(0)
+
+    if args.compare_backends:
+        for row in compare_backends(n_teams=args.teams, latency=args.latency):
+            print(f"{row['backend']:>8}: {row['pages']} pages, {row['tables']} tables, median {row['median_ms']} ms/page, "
+                  f"max {row['max_ms']} ms, RSS {row['rss_mb']} MB (+{row['rss_delta_mb']} MB)")
+        raise SystemExit(0)
+
+    sizes = [int(x) for x in args.pool_sizes.split(',') if x]
+    for row in run_pool_benchmark(sizes, args.teams, args.latency, args.delay_scale, args.max_rps, backend=args.backend):
+        print(f"workers={row['workers']:>2}  {row['seconds']:>8.2f}s  speedup x{row['speedup']:<5}  rows={row['rows']}  identical={row['identical']}")
@@ -0,0 +1,96 @@
+"""
+Column schema of results.csv, shared by the scraper that produces it and the analysis scripts that read it.
+STAT_DEFINITIONS maps each output column to the fbref data-stat attribute it is scraped from.
+"""
+
+STAT_DEFINITIONS = {
+    'basic': {
+        'Req_Nation': {'attr': 'nationality', 'numeric': False},
+        'Req_Position': {'attr': 'position', 'numeric': False},
+    },
+    'playing_time': {
+        'Pltime_matches_played': {'attr': 'games', 'numeric': True},
+        'Pltime_starts': {'attr': 'games_starts', 'numeric': True},
+        'Pltime_minutes': {'attr': 'minutes', 'numeric': True},
+    },
+    'performance': {
+        'Perf_goals': {'attr': 'goals', 'numeric': True}, 'Perf_assists': {'attr': 'assists', 'numeric': True},
+        'Perf_yellow_cards': {'attr': 'cards_yellow', 'numeric': True}, 'Perf_red_cards': {'attr': 'cards_red', 'numeric': True},
+    },
+    'expected': {
+        'Exp_xG': {'attr': 'xg', 'numeric': True}, 'Exp_xAG': {'attr': 'xg_assist', 'numeric': True},
+    },
+    'progression': {
+        'Prog_PrgC': {'attr': 'progressive_carries', 'numeric': True}, 'Prog_PrgP': {'attr': 'progressive_passes', 'numeric': True},
+        'Prog_PrgR': {'attr': 'progressive_passes_received', 'numeric': True},
+    },
+    'per_90': {
+        'per90_Gls': {'attr': 'goals_per90', 'numeric': True}, 'per90_Ast': {'attr': 'assists_per90', 'numeric': True},
+        'per90_xG': {'attr': 'xg_per90', 'numeric': True}, 'per90_xGA': {'attr': 'xg_assist_per90', 'numeric': True},
+    },
+    'goalkeeping': {
+        'GK_GA90': {'attr': 'gk_goals_against_per90', 'numeric': True}, 'GK_Save%': {'attr': 'gk_save_pct', 'numeric': True},
+        'GK_CS%': {'attr': 'gk_clean_sheets_pct', 'numeric': True}, 'GK_PK_Save%': {'attr': 'gk_pens_save_pct', 'numeric': True},
+    },
+    'shooting': {
+        'Shoot_SoT%': {'attr': 'shots_on_target_pct', 'numeric': True}, 'Shoot_SoT/90': {'attr': 'shots_on_target_per90', 'numeric': True},
+        'Shoot_G/Sh': {'attr': 'goals_per_shot', 'numeric': True}, 'Shoot_Dist': {'attr': 'average_shot_distance', 'numeric': True},
+    },
+    'passing': {
+        'Pass_Cmp': {'attr': 'passes_completed', 'numeric': True}, 'Pass_Cmp%': {'attr': 'passes_pct', 'numeric': True},
+        'Pass_TotDist': {'attr': 'passes_total_distance', 'numeric': True}, 'Pass_cpt_short': {'attr': 'passes_pct_short', 'numeric': True},
+        'Pass_cpt_medium': {'attr': 'passes_pct_medium', 'numeric': True}, 'Pass_cpt_long': {'attr': 'passes_pct_long', 'numeric': True},
+        'Pass_KP': {'attr': 'assisted_shots', 'numeric': True}, 'Pass_1/3': {'attr': 'passes_into_final_third', 'numeric': True},
+        'Pass_PPA': {'attr': 'passes_into_penalty_area', 'numeric': True}, 'Pass_CrsPA': {'attr': 'crosses_into_penalty_area', 'numeric': True},
+        'Pass_PrgP': {'attr': 'progressive_passes', 'numeric': True}
+    },
+    'goal_shot_creation': {
+        'GnS_SCA': {'attr': 'sca', 'numeric': True}, 'GnS_SCA90': {'attr': 'sca_per90', 'numeric': True},
+        'GnS_GCA': {'attr': 'gca', 'numeric': True}, 'GnS_GCA90': {'attr': 'gca_per90', 'numeric': True},
+    },
+    'defensive': {
+        'Defen_Tkl': {'attr': 'tackles', 'numeric': True}, 'Defen_TklW': {'attr': 'tackles_won', 'numeric': True},
+        'Defen_Att': {'attr': 'challenges_tackles', 'numeric': True}, 'Defen_Lost': {'attr': 'challenges_lost_pct', 'numeric': True}, # Hoặc challenges_lost
+        'Defen_Blocks': {'attr': 'blocks', 'numeric': True}, 'Defen_Sh': {'attr': 'blocked_shots', 'numeric': True},
+        'Defen_Pass': {'attr': 'blocked_passes', 'numeric': True}, 'Defen_Int': {'attr': 'interceptions', 'numeric': True},
+    },
+    'possession': {
+        'Poss_touches': {'attr': 'touches', 'numeric': True}, 'Poss_Def_Pen': {'attr': 'touches_def_pen_area', 'numeric': True},
+        'Poss_Def_3rd': {'attr': 'touches_def_3rd', 'numeric': True}, 'Poss_Mid_3rd': {'attr': 'touches_mid_3rd', 'numeric': True},
+        'Poss_Att_3rd': {'attr': 'touches_att_3rd', 'numeric': True}, 'Poss_Att_Pen': {'attr': 'touches_att_pen_area', 'numeric': True},
+        'Poss_Att': {'attr': 'touches_att_3rd', 'numeric': True}, 'Poss_Succ%': {'attr': 'take_ons_won_pct', 'numeric': True},
+        'Poss_Tkld%': {'attr': 'take_ons_tackled_pct', 'numeric': True}, 'Poss_Carries': {'attr': 'carries', 'numeric': True},
+        'Poss_PrgDist': {'attr': 'carries_progressive_distance', 'numeric': True}, 'Poss_PrgC': {'attr': 'progressive_carries', 'numeric': True}, 
+        'Poss_1/3': {'attr': 'carries_into_final_third', 'numeric': True }, 'Poss_CPA': {'attr': 'carries_into_penalty_area', 'numeric': True}, 
+        'Poss_Mis': {'attr': 'miscontrols', 'numeric': True}, 'Poss_Dis': {'attr': 'dispossessed', 'numeric': True}, 
+        'Poss_Rec': {'attr': 'passes_received', 'numeric': True}, 'Poss_PrgR': {'attr': 'progressive_passes_received', 'numeric': True}
+    },
+    'miscellaneous': {
+        'Misc_Fls': {'attr': 'fouls', 'numeric': True}, 'Misc_Fld': {'attr': 'fouled', 'numeric': True},
+        'Misc_Off': {'attr': 'offsides', 'numeric': True}, 'Misc_Crs': {'attr': 'crosses', 'numeric': True},
+        'Misc_Recov': {'attr': 'ball_recoveries', 'numeric': True}, 'Misc_Won': {'attr': 'aerials_won', 'numeric': True},
+        'Misc_Lost': {'attr': 'aerials_lost', 'numeric': True}, 'Misc_Won%': {'attr': 'aerials_won_pct', 'numeric': True},
+    }
+}
+
+TEXT_COLUMNS = ['player', 'team', 'Req_Nation', 'Req_Position']
+CATEGORICAL_COLUMNS = ['team', 'Req_Nation', 'Req_Position']
+CORE_COLUMNS = ['player', 'team', 'Req_Nation', 'Req_Position', 'Req_Age', 'Pltime_matches_played', 'Pltime_starts', 'Pltime_minutes']
+
+
+def numeric_columns():
+    """Req_Age plus every column flagged numeric in STAT_DEFINITIONS, in definition order."""
+    cols = ['Req_Age']
+    for group in STAT_DEFINITIONS.values():
+        cols += [col for col, defs in group.items() if defs['numeric'] and col not in cols]
+    return cols
+
+
+def results_dtypes(float_dtype='float32'):
+    """Storage dtype of every results.csv column: categoricals for the repeated text fields, a nullable
+    small int for the age and float_dtype for the stats."""
+    dtypes = {'player': 'object'}
+    dtypes.update({col: 'category' for col in CATEGORICAL_COLUMNS})
+    dtypes.update({col: float_dtype for col in numeric_columns()})
+    dtypes['Req_Age'] = 'Int16'
+    return dtypes
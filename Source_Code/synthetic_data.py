@@ -0,0 +1,127 @@
+"""
+Synthetic fbref / footballtransfers data at a chosen scale, fully offline.
+
+generate() writes, for scale N (N x the 20 squads of a season, 25 players each):
+    pages/<team>-Stats.html   fbref-shaped squad pages (standin_site: the real stats_*_9 table ids and data-stat cells)
+    results.csv (+ .parquet)  those pages run through FootballDataScraper in offline mode, as EX1 writes them
+    ETV_list.csv              as EX4-p1-scrape_data writes it, for the same players: most names identical,
+                              the rest accented, reordered, misspelt or missing, plus players not in results.csv
+The ETV values follow age, minutes and goals plus noise, so a model has something to learn. A directory already
+generated with the same scale and seed is reused.
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+
+from EX1 import FootballDataScraper
+from page_cache import PageCache
+from player_data import load_results
+from standin_site import StandinSite
+
+_spec = importlib.util.spec_from_file_location('scrape_data', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'EX4-p1-scrape_data.py'))
+scrape_data = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scrape_data)
+
+ROOT_URL = 'http://standin'
+_ACCENTS = str.maketrans({'a': 'á', 'e': 'é', 'i': 'í', 'o': 'ö', 'u': 'ü', 'n': 'ñ'})
+
+
+def _etv_text(value):
+    return f"€{value * 1000:.0f}k" if value < 1 else f"€{value:.1f}M"
+
+
+def etv_name(name, rng):
+    """How the transfer site might spell a player name; None for players it does not list."""
+    roll = rng.random()
+    if roll < 0.60: return name
+    if roll < 0.72:
+        first, rest = name.split(' ', 1)
+        return first.translate(_ACCENTS) + ' ' + rest
+    if roll < 0.84:
+        tokens = name.split()
+        return ' '.join(tokens[1:] + tokens[:1])
+    if roll < 0.95:
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1:]
+    return None
+
+
+def etv_rows(results, rng, extra_share=0.1):
+    """[Player Name, ETV] rows for a results frame, in a shuffled order like a ranked transfer list."""
+    age = results['Req_Age'].astype('float64').fillna(27).to_numpy()
+    minutes = results['Pltime_minutes'].astype('float64').fillna(0).to_numpy()
+    goals = results['Perf_goals'].astype('float64').fillna(0).to_numpy()
+    value = np.clip(90 - 2.5 * np.abs(age - 25) + minutes / 60 + goals / 2, 0.2, None)
+    value *= np.exp(np.array([rng.gauss(0, 0.35) for _ in range(len(value))]))
+    rows = [[etv_name(name, rng), _etv_text(v)] for name, v in zip(results['player'].astype(str), value)]
+    rows = [row for row in rows if row[0]]
+    rows += [[f"Transfer Listed {i}", _etv_text(rng.uniform(0.2, 60))] for i in range(int(len(results) * extra_share))]
+    rng.shuffle(rows)
+    return rows
+
+
+def _scrape_offline(site, results_path):
+    """Run the squad pages through the scraper, as EX1 does on fbref, from a throwaway page cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(tmp, ttl=None, max_bytes=None)
+        for path, html in site.pages.items(): cache.put(ROOT_URL + path, html)
+        scraper = FootballDataScraper(league_url=ROOT_URL + '/en/comps/9/Premier-League-Stats', root_url=ROOT_URL,
+                                      output_path=results_path, cache=cache, offline=True)
+        df = scraper.execute_scraping(resume=False)
+    if df is None or df.empty: raise RuntimeError("The offline scrape of the generated pages produced no rows.")
+    return df
+
+
+def generate(out_dir, scale=1, seed=0, players_per_team=25, force=False):
+    """Write the synthetic dataset (see module docstring) to out_dir; returns the paths and row counts."""
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    spec = {'scale': scale, 'seed': seed, 'players_per_team': players_per_team}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f: manifest = json.load(f)
+        if manifest.get('spec') == spec: return manifest
+
+    pages_dir = os.path.join(out_dir, 'pages')
+    os.makedirs(pages_dir, exist_ok=True)
+    for name in os.listdir(pages_dir):
+        if name.endswith('.html'): os.remove(os.path.join(pages_dir, name))
+    site = StandinSite(n_teams=20 * scale, players_per_team=players_per_team, seed=seed)
+    for path, html in site.pages.items():
+        if '/squads/' not in path: continue
+        with open(os.path.join(pages_dir, path.rsplit('/', 1)[-1] + '.html'), 'w', encoding='utf-8') as f: f.write(html)
+
+    results_path = os.path.join(out_dir, 'results.csv')
+    _scrape_offline(site, results_path)
+    results = load_results(results_path, float_dtype='float64')
+
+    etv_path = os.path.join(out_dir, 'ETV_list.csv')
+    rows = etv_rows(results, random.Random(seed))
+    with open(etv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(scrape_data.CSV_HEADER)
+        writer.writerows(scrape_data.with_numeric_etv(rows))
+
+    manifest = {'spec': spec, 'teams': len(site.teams), 'pages_dir': pages_dir, 'results': results_path, 'etv': etv_path,
+                'players': len(results), 'etv_rows': len(rows)}
+    with open(manifest_path, 'w', encoding='utf-8') as f: json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def team_page_paths(manifest):
+    return sorted(os.path.join(manifest['pages_dir'], name) for name in os.listdir(manifest['pages_dir']) if name.endswith('.html'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--scale', type=int, default=1, help="Multiple of one season's players (1, 10, 100...).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--force', action='store_true', help="Regenerate even if out_dir holds the same dataset.")
+    args = parser.parse_args()
+    m = generate(args.out_dir, args.scale, args.seed, force=args.force)
+    print(f"{m['teams']} team pages, {m['players']} players in {m['results']}, {m['etv_rows']} ETV rows in {m['etv']}")
@@ -0,0 +1,267 @@
+"""
+Per-team aggregation of the player table: median, mean and standard deviation of every statistic for all
+players and for each team (the results2.csv layout), plus the team leading each statistic.
+
+summarize() does it in one grouped pass over an in-memory frame. StreamingTeamStats does the same from chunks
+(several seasons or leagues that do not fit in memory): means and variances are merged exactly, medians come
+from a mergeable quantile sketch and are exact as long as a group holds fewer values than the sketch capacity.
+"""
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from stat_schema import TEXT_COLUMNS
+
+SUMMARY_KEY = 'Teams_or_players'
+STAT_NAMES = (('Median', 'median'), ('Mean', 'mean'), ('Std', 'std'))
+
+
+def summary_column_base(col):
+    return col.replace('%', 'Pct').replace('/', 'Per')
+
+
+def summary_columns(stat_cols):
+    return [SUMMARY_KEY] + [f"{label}_{summary_column_base(col)}" for col in stat_cols for label, _ in STAT_NAMES]
+
+
+def numeric_stats_frame(df, stat_cols=None):
+    """float64 frame of the statistic columns: every non-text column with at least one numeric value."""
+    candidates = stat_cols or [c for c in df.columns if c not in TEXT_COLUMNS]
+    numeric = {}
+    for col in candidates:
+        series = df[col] if pd.api.types.is_numeric_dtype(df[col]) else pd.to_numeric(df[col], errors='coerce')
+        series = series.astype('float64')
+        if stat_cols or series.notna().any(): numeric[col] = series
+    return pd.DataFrame(numeric, index=df.index)
+
+
+def _layout(all_stats, team_stats, stat_cols):
+    """all_stats: one row of median/mean/std per column; team_stats: same with one row per team."""
+    def flatten(frame):
+        return frame.loc[:, [(col, stat) for col in stat_cols for _, stat in STAT_NAMES]].to_numpy()
+
+    rows = np.vstack([flatten(all_stats), flatten(team_stats)])
+    result = pd.DataFrame(rows, columns=summary_columns(stat_cols)[1:])
+    result.insert(0, SUMMARY_KEY, ['All'] + [str(t) for t in team_stats.index])
+    return result
+
+
+def block_stats(values):
+    """
+    Median, mean and sample std of each column of a 2-D float block. Mirrors pandas' Series reductions
+    (zero-filled pairwise sum over a contiguous column, then the two-pass variance), so the rounded figures come
+    out exactly as the per-team Series loop produced them; groupby's compensated sums differ in the last bits.
+    """
+    mask = np.isnan(values)
+    count = (~mask).sum(axis=0)
+    filled = np.where(mask, 0.0, values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / count
+        squares = np.where(mask, 0.0, (mean - values) ** 2)
+        std = np.sqrt(squares.sum(axis=0) / (count - 1))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns: NaN median, like Series.median()
+        median = np.nanmedian(values, axis=0) if values.shape[0] else np.full(values.shape[1], np.nan)
+    mean[count == 0] = np.nan
+    std[count < 2] = np.nan
+    return {'median': median, 'mean': mean, 'std': std}
+
+
+def grouped_block_stats(numeric, groups):
+    """block_stats for all rows and for every group: one stable sort, then a contiguous slice per group."""
+    keys = groups.to_numpy()
+    order = np.argsort(keys, kind='stable')
+    values = np.asfortranarray(numeric.to_numpy(dtype='float64')[order])
+    names, starts = np.unique(keys[order], return_index=True)
+    bounds = list(starts) + [len(keys)]
+    stats = {'All': block_stats(np.asfortranarray(numeric.to_numpy(dtype='float64')))}
+    for name, start, end in zip(names, bounds[:-1], bounds[1:]): stats[name] = block_stats(values[start:end])
+    return stats
+
+
+def _stats_frame(stats, stat_cols):
+    """{group: block_stats} -> frame indexed by group with (column, stat) columns."""
+    index = pd.MultiIndex.from_product([stat_cols, [stat for _, stat in STAT_NAMES]])
+    rows = [np.column_stack([s[stat] for _, stat in STAT_NAMES]).ravel() for s in stats.values()]
+    return pd.DataFrame(rows, index=list(stats), columns=index)
+
+
+def summarize(df, stat_cols=None, group_col='team', decimals=4):
+    """Median, mean and std of every statistic for 'All' players and each team, in one grouped pass."""
+    numeric = numeric_stats_frame(df, stat_cols)
+    stat_cols = list(numeric.columns)
+    frame = _stats_frame(grouped_block_stats(numeric, df[group_col].astype(str)), stat_cols)
+    result = _layout(frame.iloc[:1], frame.iloc[1:], stat_cols)
+    return result.round(decimals) if decimals is not None else result
+
+
+def team_leaders(df, stat_cols=None, group_col='team'):
+    """Team with the highest mean for each statistic, as a frame indexed by statistic (team, value)."""
+    numeric = numeric_stats_frame(df, stat_cols)
+    stats = grouped_block_stats(numeric, df[group_col].astype(str))
+    stats.pop('All')
+    means = pd.DataFrame({team: s['mean'] for team, s in stats.items()}, index=numeric.columns).T
+    means = means.loc[:, means.notna().any()]
+    return pd.DataFrame({'team': means.idxmax(), 'value': means.max()})
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantiles (a simplified KLL sketch). Values live in levels; an item on level h stands
+    for 2**h inputs. A level over capacity is sorted and every other item promoted, so memory stays
+    O(capacity * log(n / capacity)) and two sketches merge by concatenating their levels.
+    """
+
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self._offset = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels): self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size > self.capacity:
+                items = np.sort(items)
+                if items.size % 2: items, keep = items[:-1], items[-1:]
+                else: keep = np.empty(0)
+                self._offset ^= 1
+                if h + 1 == len(self.levels): self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[self._offset::2]])
+                self.levels[h] = keep
+            h += 1
+
+    @property
+    def count(self):
+        return sum(items.size << h for h, items in enumerate(self.levels))
+
+    def quantile(self, q):
+        if all(items.size == 0 for items in self.levels): return np.nan
+        if all(items.size == 0 for items in self.levels[1:]): return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.size, 1 << h, dtype='float64') for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        # Each item's weight is centred on its value; interpolate between the centres like np.quantile does.
+        centres = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return float(np.interp(q, centres, values))
+
+
+class StreamingTeamStats:
+    """
+    summarize() over data fed in chunks. Counts, means and M2 (sum of squared deviations) per group and column
+    are combined with Chan's parallel update, medians through one QuantileSketch per group and column.
+    Partial results from separate processes or files combine with merge().
+    """
+
+    def __init__(self, stat_cols, group_col='team', sketch_capacity=512):
+        self.stat_cols = list(stat_cols)
+        self.group_col = group_col
+        self.sketch_capacity = sketch_capacity
+        self.moments = {}    # group -> (count, mean, m2) arrays over stat_cols
+        self.sketches = {}   # group -> [QuantileSketch per stat column]
+
+    def _combine(self, group, count, mean, m2):
+        if group not in self.moments:
+            self.moments[group] = (count, np.where(count > 0, mean, 0.0), np.where(count > 0, m2, 0.0)); return
+        n_a, mean_a, m2_a = self.moments[group]
+        mean, m2 = np.where(count > 0, mean, 0.0), np.where(count > 0, m2, 0.0)
+        n = n_a + count
+        delta = mean - mean_a
+        with np.errstate(invalid='ignore', divide='ignore'):
+            new_mean = np.where(n > 0, mean_a + delta * count / n, 0.0)
+            new_m2 = np.where(n > 0, m2_a + m2 + delta ** 2 * n_a * count / n, 0.0)
+        self.moments[group] = (n, new_mean, new_m2)
+
+    def _sketches_for(self, group):
+        if group not in self.sketches: self.sketches[group] = [QuantileSketch(self.sketch_capacity) for _ in self.stat_cols]
+        return self.sketches[group]
+
+    def update(self, chunk):
+        numeric = numeric_stats_frame(chunk, self.stat_cols)
+        groups = chunk[self.group_col].astype(str)
+        parts = [('All', numeric)] + [(team, part) for team, part in numeric.groupby(groups, sort=False)]
+        for group, part in parts:
+            values = part.to_numpy()
+            mask = np.isnan(values)
+            count = (~mask).sum(axis=0).astype('float64')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(mask, 0.0, values).sum(axis=0) / count
+            mean[count == 0] = 0.0
+            m2 = np.where(mask, 0.0, (values - mean) ** 2).sum(axis=0)
+            self._combine(group, count, mean, m2)
+            for sketch, column in zip(self._sketches_for(group), values.T): sketch.update(column)
+        return self
+
+    def merge(self, other):
+        for group, (count, mean, m2) in other.moments.items(): self._combine(group, count, mean, m2)
+        for group, sketches in other.sketches.items():
+            for mine, theirs in zip(self._sketches_for(group), sketches): mine.merge(theirs)
+        return self
+
+    def result(self, decimals=4):
+        def stats_of(group):
+            count, mean, m2 = self.moments[group]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return {'median': np.array([s.quantile(0.5) for s in self.sketches[group]]),
+                        'mean': np.where(count > 0, mean, np.nan),
+                        'std': np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)}
+
+        # Like summarize(), columns without a single value anywhere are left out.
+        stat_cols = [col for col, n in zip(self.stat_cols, self.moments['All'][0]) if n > 0]
+        groups = ['All'] + sorted(g for g in self.moments if g != 'All')
+        frame = _stats_frame({g: stats_of(g) for g in groups}, self.stat_cols)
+        result = _layout(frame.iloc[:1], frame.iloc[1:], stat_cols)
+        return result.round(decimals) if decimals is not None else result
+
+
+def summarize_csv_in_chunks(csv_path, chunksize=50_000, stat_cols=None, group_col='team'):
+    """StreamingTeamStats over a results CSV too large to load at once."""
+    stream = None
+    for chunk in pd.read_csv(csv_path, encoding='utf-8-sig', na_values=['N/a'], chunksize=chunksize):
+        if stream is None:
+            stream = StreamingTeamStats(stat_cols or [c for c in chunk.columns if c not in TEXT_COLUMNS], group_col)
+        stream.update(chunk)
+    return stream
+
+
+def main(argv=None, prog=None):
+    from data_paths import data_path
+    from player_data import load_results
+
+    parser = argparse.ArgumentParser(prog=prog, description="Median, mean and std of every statistic, overall and per team (results2.csv).")
+    parser.add_argument('--input', default=data_path('results.csv'), help="results.csv written by EX1.")
+    parser.add_argument('--output', default=data_path('results2.csv'))
+    parser.add_argument('--chunksize', type=int, default=None, help="Stream the CSV in chunks of this many rows (large inputs).")
+    parser.add_argument('--leaders', action='store_true', help="Also print the team with the highest mean of each statistic.")
+    args = parser.parse_args(argv)
+
+    if args.chunksize:
+        result = summarize_csv_in_chunks(args.input, args.chunksize).result()
+    else:
+        df = load_results(args.input, float_dtype='float64')
+        result = summarize(df)
+        if args.leaders: print(team_leaders(df).to_string())
+    result.to_csv(args.output, index=False, encoding='utf-8-sig')
+    print(f"Statistics for 'All' players and {len(result) - 1} teams written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+The EX4-p2 training set: the players matched to an ETV by EX4-p1 (EX4-p1-results-bertcos.csv) joined to their
+stats in results.csv, with the ETV in millions of euros as target.
+
+- ETVs ('€12.5M', '€800k', '€1,200K', '€1.2b', or plain euros) are parsed column-wise by one regular expression
+  instead of a Python function per row (the ETV scraper fills its ETV_numeric column with the same parser);
+- the join looks every matched name up in a dict from the folded name (name_matching.fold_name) to the results
+  rows, built once;
+- the feature types come from stat_schema rather than from trying pd.to_numeric on a sample of each column;
+- the prepared X, y and feature lists are cached with joblib under a key made of the hashes of the input files,
+  so training again on unchanged inputs reads one file instead of preparing the set.
+"""
+import hashlib
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from name_matching import fold_name
+from stat_schema import CATEGORICAL_COLUMNS, numeric_columns
+
+# Part of the cache key: bump it when the preparation below changes what it produces.
+PREPARATION_VERSION = 2
+_ETV_PATTERN = r'(?i)^\s*€?\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?)\s*([MKB]?)\s*$'
+
+
+def parse_etv_series(etv):
+    """'€12.5M' / '€800k' / '€1,200K' / '€1.2b' / '€950000' -> millions of euros, NaN when missing or unreadable."""
+    parts = etv.astype('string').str.replace(',', '', regex=False).str.extract(_ETV_PATTERN)
+    number, suffix = pd.to_numeric(parts[0]).to_numpy(dtype=np.float64), parts[1].fillna('').str.upper().to_numpy(dtype=object)
+    value = np.select([suffix == 'M', suffix == 'K', suffix == 'B'], [number, number / 1000.0, number * 1000.0], number / 1_000_000.0)
+    return pd.Series(value, index=etv.index, name=etv.name)
+
+
+def name_index(names):
+    """Folded name -> positions of the rows with that name."""
+    index = {}
+    for i, key in enumerate(pd.Series(names).map(fold_name)): index.setdefault(key, []).append(i)
+    return index
+
+
+def join_by_name(df_matches, df_results, left_on='Player Name', right_on='player'):
+    """
+    Inner join of the two frames on the folded names, rows in pd.merge's order (matches order, then results order
+    among the results rows of a name). right_on is left out of the output, as the two name columns agree.
+    """
+    index = name_index(df_results[right_on])
+    left, right = [], []
+    for i, key in enumerate(df_matches[left_on].map(fold_name)):
+        rows = index.get(key)
+        if rows: left += [i] * len(rows); right += rows
+    joined = df_matches.iloc[left].reset_index(drop=True)
+    stats = df_results.drop(columns=[right_on]).iloc[right].reset_index(drop=True)
+    return pd.concat([joined, stats.drop(columns=[c for c in stats.columns if c in joined.columns])], axis=1)
+
+
+def training_data(df_results, df_matches):
+    """X, y of EX4-p2 step 1: the matched players joined to results.csv, ETV in M€ (players without one dropped)."""
+    merged = join_by_name(df_matches[['Player Name', 'ETV']], df_results)
+    y = parse_etv_series(merged['ETV']).rename('ETV_numeric')
+    keep = y.notna().to_numpy()
+    return merged.drop(columns=['Player Name', 'ETV'])[keep], y[keep]
+
+
+def schema_feature_types(X):
+    """(numeric, categorical) feature lists from stat_schema; columns it does not declare are typed by their dtype."""
+    declared_numeric, declared_categorical = set(numeric_columns()), set(CATEGORICAL_COLUMNS)
+    numeric = [c for c in X.columns if c in declared_numeric or (c not in declared_categorical and pd.api.types.is_numeric_dtype(X[c]))]
+    return sorted(numeric), sorted(c for c in X.columns if c not in numeric)
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''): digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(results_path, matches_path):
+    """Hash of the inputs: both files (and the parquet copy load_results may read instead of the CSV) and PREPARATION_VERSION."""
+    from player_data import parquet_path_for
+    digest = hashlib.sha256(str(PREPARATION_VERSION).encode())
+    for path in (results_path, parquet_path_for(results_path), matches_path):
+        digest.update(file_digest(path).encode() if os.path.exists(path) else b'-')
+    return digest.hexdigest()[:32]
+
+
+def training_set(results_path, matches_path, cache_dir=None):
+    """
+    {'X', 'y', 'numeric', 'categorical', 'cached'} of the two input files, read from cache_dir when they were
+    prepared before (cache_dir None: always prepared, nothing written).
+    """
+    path = os.path.join(cache_dir, f'training_{cache_key(results_path, matches_path)}.joblib') if cache_dir else None
+    if path and os.path.exists(path): return {**joblib.load(path), 'cached': True}
+
+    from player_data import load_results
+    X, y = training_data(load_results(results_path), pd.read_csv(matches_path))
+    numeric, categorical = schema_feature_types(X)
+    data = {'X': X, 'y': y, 'numeric': numeric, 'categorical': categorical}
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        joblib.dump(data, path + '.tmp')
+        os.replace(path + '.tmp', path)
+    return {**data, 'cached': False}
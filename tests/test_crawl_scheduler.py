@@ -0,0 +1,48 @@
+from crawl_scheduler import CrawlScheduler
+
+URL = 'https://example.org/page'
+
+
+class FakeClock:
+    def __init__(self): self.now = 0.0
+    def __call__(self): return self.now
+    def sleep(self, seconds): self.now += max(seconds, 1e-6)  # a real sleep always lets some time pass
+
+
+def _scheduler(rate=None, **kwargs):
+    clock = FakeClock()
+    return CrawlScheduler(rate=rate, backoff_base=0, clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+def test_single_429_pauses_without_slowing_down():
+    scheduler, clock = _scheduler(rate=4.0)
+    scheduler.acquire(URL)
+    assert scheduler.failure(URL, retry_after=2, throttled=True) == 2
+    assert scheduler.acquire(URL) == 2 and scheduler.host_rate(URL) == 4.0
+
+
+def test_repeated_429s_halve_the_rate_and_successes_restore_it():
+    scheduler, clock = _scheduler(rate=4.0, recovery_successes=1)
+    for _ in range(2):
+        scheduler.acquire(URL); scheduler.failure(URL, retry_after=1, throttled=True)
+    assert scheduler.host_rate(URL) == 2.0
+    for _ in range(8): scheduler.acquire(URL); scheduler.success(URL)
+    assert scheduler.host_rate(URL) == 4.0
+
+
+def test_429s_outside_the_window_only_pause():
+    scheduler, clock = _scheduler(rate=4.0, throttle_window=10)
+    scheduler.acquire(URL); scheduler.failure(URL, retry_after=1, throttled=True)
+    clock.now += 60
+    scheduler.acquire(URL); scheduler.failure(URL, retry_after=1, throttled=True)
+    assert scheduler.host_rate(URL) == 4.0
+
+
+def test_unpaced_host_goes_back_to_unpaced():
+    scheduler, clock = _scheduler(recovery_successes=1)
+    for _ in range(2):
+        for _ in range(10): scheduler.acquire(URL); clock.now += 0.1
+        scheduler.failure(URL, retry_after=1, throttled=True)
+    assert scheduler.host_rate(URL) is not None
+    for _ in range(20): scheduler.acquire(URL); scheduler.success(URL)
+    assert scheduler.host_rate(URL) is None
@@ -0,0 +1,41 @@
+import os
+
+from page_cache import PageCache
+
+
+def _objects(cache_dir):
+    objects_dir = os.path.join(cache_dir, 'objects')
+    return [os.path.join(objects_dir, sub, name) for sub in os.listdir(objects_dir) for name in os.listdir(os.path.join(objects_dir, sub))]
+
+
+def test_recaching_a_url_keeps_only_its_latest_body(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=None)
+    for version in range(5): cache.put('https://example.org/page', f'<html>version {version}</html>')
+    objects = _objects(str(tmp_path))
+    assert len(objects) == 1 and len(cache.index) == 1
+    assert sum(os.path.getsize(path) for path in objects) == cache.index['https://example.org/page']['size']
+    assert cache.get('https://example.org/page') == '<html>version 4</html>'
+
+
+def test_shared_body_is_kept_while_another_url_uses_it(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=None)
+    cache.put('https://example.org/a', '<html>same</html>')
+    cache.put('https://example.org/b', '<html>same</html>')
+    cache.put('https://example.org/a', '<html>new</html>')
+    assert len(_objects(str(tmp_path))) == 2
+    assert cache.get('https://example.org/b') == '<html>same</html>'
+
+
+def test_size_budget_holds_on_disk(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=None, max_bytes=2000)
+    for i in range(50): cache.put(f'https://example.org/{i % 3}', os.urandom(400).hex())
+    assert sum(os.path.getsize(path) for path in _objects(str(tmp_path))) <= 2000
+
+
+def test_opening_sweeps_unreferenced_objects(tmp_path):
+    PageCache(str(tmp_path), ttl=None).put('https://example.org/a', '<html>a</html>')
+    orphan = os.path.join(str(tmp_path), 'objects', 'ff', 'ff' + '0' * 62 + '.html.gz')
+    os.makedirs(os.path.dirname(orphan), exist_ok=True)
+    with open(orphan, 'wb') as f: f.write(b'left over')
+    cache = PageCache(str(tmp_path), ttl=None)
+    assert _objects(str(tmp_path)) == [cache._object_path(cache.index['https://example.org/a']['sha256'])]
@@ -0,0 +1,14 @@
+import math
+
+import pandas as pd
+
+from valuation_data import parse_etv_series
+
+
+def test_parse_etv_series_suffixes_case_and_separators():
+    etv = pd.Series(['€12.5M', '€1.5m', '€800k', '€950K', '€1,200k', '€1.2B', '€1.2b', '€950000', '€2,500,000'])
+    assert parse_etv_series(etv).tolist() == [12.5, 1.5, 0.8, 0.95, 1.2, 1200.0, 1200.0, 0.95, 2.5]
+
+
+def test_parse_etv_series_unreadable_values_are_nan():
+    assert all(math.isnan(v) for v in parse_etv_series(pd.Series(['', None, 'Unknown', '€'])))